@@ -0,0 +1,118 @@
+"""
+Commit latency and read concurrency with SQLite default connection settings (rollback journal,
+synchronous=FULL) compared to the APP_CONFIG['database'] connection profile (WAL, synchronous=NORMAL, ...).
+
+Run from the repository root:
+    python -m benchmarks.connection_profile
+"""
+import json
+import logging
+import os
+import statistics
+import sqlite3
+import tempfile
+import threading
+import time
+from database.database import Database
+from misc import APP_CONFIG
+
+PROFILES = {
+    'default': {},
+    'configured': APP_CONFIG['database'],
+}
+
+
+def _summary(latencies):
+    latencies = sorted(latencies)
+    if not latencies:
+        return {'count': 0}
+    return {
+        'count': len(latencies),
+        'mean_ms': round(statistics.mean(latencies) * 1000, 3),
+        'p50_ms': round(latencies[len(latencies) // 2] * 1000, 3),
+        'p95_ms': round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 3),
+        'max_ms': round(latencies[-1] * 1000, 3),
+    }
+
+
+def commit_latency(path, profile, commits=200):
+    """
+    Insert rows one by one, committing each of them.
+    :return: Latency summary of insert + commit.
+    """
+    database = Database(path, profile)
+    latencies = []
+    for i in range(commits):
+        start = time.perf_counter()
+        database.execute("INSERT INTO customers (last_name, phone) VALUES (?, ?)", (f"commit{i}", str(i)))
+        database.connection.commit()
+        latencies.append(time.perf_counter() - start)
+    database.close()
+    return _summary(latencies)
+
+
+def read_concurrency(path, profile, duration=2.0, readers=2, rows_per_commit=200):
+    """
+    Run readers listing the customers table while a writer keeps committing batches of rows.
+    :return: Summary of read latencies and the number of reads which failed on a lock.
+    """
+    stop = threading.Event()
+    latencies = []
+    errors = []
+    writes = []
+
+    def writer():
+        database = Database(path, profile)
+        batch = 0
+        while not stop.is_set():
+            database.execute_many(
+                "INSERT INTO customers (last_name, phone) VALUES (?, ?)",
+                [(f"writer{batch}", str(i)) for i in range(rows_per_commit)]
+            )
+            database.connection.commit()
+            batch += 1
+        writes.append(batch)
+        database.close()
+
+    def reader():
+        database = Database(path, profile)
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                database.fetch_all("SELECT id, last_name, phone FROM customers ORDER BY id DESC LIMIT 100")
+                latencies.append(time.perf_counter() - start)
+            except sqlite3.OperationalError:
+                errors.append(time.perf_counter() - start)
+        database.close()
+
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    result = _summary(latencies)
+    result['reads_per_second'] = round(len(latencies) / duration, 1)
+    result['lock_errors'] = len(errors)
+    result['write_commits'] = sum(writes)
+    return result
+
+
+def run():
+    results = {}
+    for name, profile in PROFILES.items():
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'benchmark.db')
+            results[name] = {
+                'profile': profile,
+                'commit_latency': commit_latency(path, profile),
+                'read_concurrency': read_concurrency(path, profile),
+            }
+    return results
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.ERROR)
+    print(json.dumps(run(), indent=2))
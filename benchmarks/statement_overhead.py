@@ -0,0 +1,115 @@
+"""
+Per-query overhead of the DBProcessor lookups before the statement registry (one shared cursor,
+SQL built per call, dictionaries built from cursor.description) compared to the named statements
+executed on short-lived cursors with the sqlite3.Row row factory.
+The registry is a refactor, not an optimization: a lookup costs a few microseconds more for its own cursor,
+updates take about the same time. The query instrumentation is off while measuring, so only the two
+patterns are compared.
+
+Run from the repository root:
+    python -m benchmarks.statement_overhead [queries]
+"""
+import json
+import logging
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from database.database import Database
+from database.instrumentation import STATS
+from database.statements import STATEMENTS, update_statement
+
+
+def populate(database, rows):
+    database.execute_many(
+        "INSERT INTO customers (id, first_name, last_name, phone, email) VALUES (?, ?, ?, ?, ?)",
+        [(i, f"first{i}", f"last{i}", f"{500000000 + i}", f"c{i}@example.com") for i in range(1, rows + 1)]
+    )
+    database.execute_many(
+        "INSERT INTO cars (id, customer_id, brand_id, model_id, color_id, year, vin) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [(i, i, i % 33 + 1, i % 300 + 1, i % 22 + 1, 2000 + i % 24, f"VIN{i:014d}") for i in range(1, rows + 1)]
+    )
+    database.connection.commit()
+
+
+def shared_cursor(database, rows):
+    """
+    Lookups as done before the statement registry.
+    :return: Dictionary name -> function(item_id)
+    """
+    cursor = database.connection.cursor()
+
+    def item_by_id(item_id, table='customers', columns='*'):
+        cursor.execute(f"SELECT {columns} FROM {table} WHERE {table}.id = ?", (item_id,))
+        return {description[0]: data for description, data in zip(cursor.description, cursor.fetchone())}
+
+    def item_by_identity(item_id):
+        cursor.execute("SELECT id FROM customers WHERE last_name = ? AND phone = ?",
+                       (f"last{item_id}", f"{500000000 + item_id}"))
+        return cursor.fetchone()
+
+    def update(item_id):
+        data = {'first_name': f"first{item_id}", 'email': f"c{item_id}@example.com"}
+        cursor.execute(f"UPDATE customers SET {', '.join(f'{column} = ?' for column in data)} WHERE id = ?",
+                       (*data.values(), item_id))
+
+    return {'item_by_id': item_by_id, 'item_by_identity': item_by_identity, 'update': update}
+
+
+def statements(database, rows):
+    """
+    Lookups with the named statements, as DBProcessor does now.
+    :return: Dictionary name -> function(item_id)
+    """
+    def item_by_id(item_id):
+        row = database.fetch_one(STATEMENTS['customers_by_id'], (item_id,), row_factory=sqlite3.Row)
+        return dict(row)
+
+    def item_by_identity(item_id):
+        return database.fetch_one(STATEMENTS['customer_by_identity'], (f"last{item_id}", f"{500000000 + item_id}"))
+
+    def update(item_id):
+        data = {'first_name': f"first{item_id}", 'email': f"c{item_id}@example.com"}
+        database.execute(update_statement('customers', tuple(data)), (*data.values(), item_id))
+
+    return {'item_by_id': item_by_id, 'item_by_identity': item_by_identity, 'update': update}
+
+
+def measure(function, rows, queries):
+    """
+    :return: Median per-query latency of 5 runs in microseconds.
+    """
+    runs = []
+    for _ in range(5):
+        start = time.perf_counter()
+        for i in range(queries):
+            function(i % rows + 1)
+        runs.append((time.perf_counter() - start) / queries)
+    return round(statistics.median(runs) * 1_000_000, 2)
+
+
+def run(queries=20000, rows=1000):
+    results = {'queries': queries}
+    # Database records every query in STATS, the shared cursor pattern bypasses it
+    enabled, STATS.enabled = STATS.enabled, False
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            database = Database(os.path.join(tmp, 'benchmark.db'))
+            populate(database, rows)
+            for name, lookups in (('shared_cursor', shared_cursor), ('statements', statements)):
+                results[name] = {
+                    lookup: measure(function, rows, queries) for lookup, function in lookups(database, rows).items()
+                }
+                database.connection.rollback()
+            database.close()
+    finally:
+        STATS.enabled = enabled
+    results['unit'] = 'median us per query'
+    return results
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.ERROR)
+    print(json.dumps(run(*map(int, sys.argv[1:2])), indent=2))
@@ -0,0 +1,217 @@
+"""
+Latency of the core DBProcessor operations and of the database side of Treeview.populate_treeview
+on synthetic databases of the given sizes, see benchmarks/synthetic.py. Results are printed as JSON,
+saved with --output they can be compared with the results of another commit with --compare.
+
+Run from the repository root:
+    python -m benchmarks.suite [--sizes small medium large] [--repeat 50] [--output results.json]
+    python -m benchmarks.suite --compare baseline.json [--tolerance 0.25]
+"""
+import argparse
+import datetime
+import importlib
+import json
+import logging
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import time
+from types import SimpleNamespace
+from benchmarks.synthetic import SIZES, generate, scratch_directory
+from database.database_model import DBProcessor
+from database.query import Filter
+from database.instrumentation import STATS
+from misc import APP_CONFIG
+
+# Benchmarks of single optimizations which can be added to the results with --with
+EXTRA_BENCHMARKS = ('ticket_listing', 'statement_overhead', 'validation', 'connection_profile', 'window_pool')
+
+
+def measure(function, repeat):
+    """
+    :param function: Callable without arguments, called repeat times.
+    :param repeat: Number of calls.
+    :return: Dictionary with median, p95 and max latency in milliseconds.
+    """
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return {
+        'p50_ms': round(statistics.median(latencies) * 1000, 3),
+        'p95_ms': round(latencies[max(int(len(latencies) * 0.95) - 1, 0)] * 1000, 3),
+        'max_ms': round(latencies[-1] * 1000, 3),
+    }
+
+
+def populate_treeview(database, table, page_size):
+    """
+    Work of Treeview.populate_treeview and Treeview._on_populated without the widget: the first page
+    is fetched as the worker thread does and turned into treeview item options.
+    """
+    from gui_elements import Treeview
+    # Stand-in for the treeview, _row_options only uses its name
+    treeview = SimpleNamespace(name=table)
+    _, rows = database.get_versioned_items(table, limit=page_size)
+    return [Treeview._row_options(treeview, row) for row in rows]
+
+
+def operations(database, tickets, counter):
+    """
+    :param database: DBProcessor object of a synthetic database.
+    :param tickets: Number of tickets in the database.
+    :param counter: Callable returning a new number on every call, keeps inserted rows unique.
+    :return: Dictionary name -> callable.
+    """
+    page_size = APP_CONFIG['treeview']['page_size']
+    customer = database.get_item_from_id('customers', tickets // 6 or 1)
+    existing = {key: customer[key] for key in ('first_name', 'last_name', 'phone', 'email')}
+    missing = dict(existing, phone='000000000')
+    ticket_ids = list(range(max(tickets // 2 - 100, 1), tickets // 2 + 100))
+
+    def add_customer():
+        number = counter()
+        return database.add_item_to_table('customers', {'first_name': 'benchmark', 'last_name': f"added{number}",
+                                                        'phone': f"{100000000 + number}", 'email': ''})
+
+    def add_ticket():
+        return database.add_item_to_table('tickets', {'customer_id': customer['id'], 'car_id': 1,
+                                                      'notes': f"benchmark {counter()}", 'status': 1})
+
+    return {
+        'get_all_items.tickets_first_page': lambda: database.get_all_items('tickets', limit=page_size),
+        'get_all_items.tickets_middle_page': lambda: database.get_all_items('tickets', after_id=tickets // 2,
+                                                                            limit=page_size),
+        'get_all_items.tickets_by_customer': lambda: database.get_all_items('tickets', limit=page_size,
+                                                                            order_by='customer'),
+        'get_all_items.tickets_open_filtered': lambda: database.get_all_items(
+            'tickets', where=Filter().equals('tickets.status', 1).starts_with(
+                ('tickets.customer_last_name',), 'kow'), limit=page_size),
+        'get_all_items.customers_first_page': lambda: database.get_all_items('customers', limit=page_size),
+        'get_all_items.cars_first_page': lambda: database.get_all_items('cars', limit=page_size),
+        'get_all_items.cars_by_brand': lambda: database.get_all_items('cars', limit=page_size, order_by='brand_name'),
+        'get_all_items.cars_by_year_middle_page': lambda: database.get_all_items(
+            'cars', after_id=tickets // 6, limit=page_size, order_by='year'),
+        'get_all_items.customers_by_first_name': lambda: database.get_all_items(
+            'customers', limit=page_size, order_by='customer_first_name'),
+        'check_if_customer_exists.existing': lambda: database.check_if_customer_exists(existing),
+        'check_if_customer_exists.missing': lambda: database.check_if_customer_exists(missing),
+        'get_item_from_name.brands': lambda: database.get_item_from_name('brands', 'Toyota'),
+        'get_item_from_name.models': lambda: database.get_item_from_name('models', 'Yaris'),
+        'get_item_from_name.colors': lambda: database.get_item_from_name('colors', 'black'),
+        'add_item_to_table.customers': add_customer,
+        'add_item_to_table.tickets': add_ticket,
+        'update_customer': lambda: database.update_customer(dict(existing, id=customer['id'])),
+        'update_ticket': lambda: database.update_ticket({'id': tickets // 2, 'customer_id': customer['id'],
+                                                         'car_id': 1, 'notes': f"updated {counter()}",
+                                                         'status': 1}),
+        'update_items.tickets_200': lambda: database.update_items('tickets', ticket_ids,
+                                                                  {'notes': f"bulk {counter()}"}),
+        'set_tickets_status.200': lambda: database.set_tickets_status(ticket_ids, counter() % 2),
+        'search.customer': lambda: database.search('kowal'),
+        'populate_treeview.tickets': lambda: populate_treeview(database, 'tickets', page_size),
+        'populate_treeview.tickets_not_virtual': lambda: populate_treeview(database, 'tickets', None),
+    }
+
+
+def run_size(tickets, repeat):
+    """
+    Generate a database with the given number of tickets and time the operations on it.
+    :return: Dictionary with the generated rows and the latencies of the operations.
+    """
+    numbers = iter(range(1, 10 ** 9))
+    with scratch_directory():
+        result = {'database': generate(tickets)}
+        database = DBProcessor(prune=False)
+        # The instrumentation stays on as in the application, its statistics are not part of the results
+        STATS.reset()
+        result['operations'] = {}
+        for name, function in operations(database, tickets, lambda: next(numbers)).items():
+            # The whole listing is fetched only a few times, it takes seconds on the large database
+            result['operations'][name] = measure(function, repeat if not name.endswith('not_virtual') else 3)
+        database.close()
+    return result
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'date': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+    }
+
+
+def run(sizes=('small', 'medium'), repeat=50, extra=()):
+    """
+    :param sizes: Names of SIZES or numbers of tickets.
+    :param repeat: Number of calls of every operation.
+    :param extra: Names of EXTRA_BENCHMARKS run with their default arguments.
+    :return: Dictionary with the environment and results per size.
+    """
+    results = {'environment': environment(), 'repeat': repeat, 'sizes': {}}
+    for size in sizes:
+        tickets = SIZES[size] if size in SIZES else int(size)
+        results['sizes'][str(size)] = run_size(tickets, repeat)
+    for name in extra:
+        results.setdefault('benchmarks', {})[name] = importlib.import_module(f"benchmarks.{name}").run()
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    :param results: Results of run().
+    :param baseline: Results of run() on another commit.
+    :param tolerance: Allowed relative slowdown of the median, e.g. 0.25.
+    :return: List of regressions, e.g. [{'size': 'small', 'operation': 'update_ticket', 'baseline_ms': 1.0, ...}]
+    """
+    regressions = []
+    for size, result in results['sizes'].items():
+        before = baseline.get('sizes', {}).get(size, {}).get('operations', {})
+        for name, latency in result['operations'].items():
+            if name not in before:
+                continue
+            # Sub-0.05 ms medians are timer noise
+            if latency['p50_ms'] > max(before[name]['p50_ms'] * (1 + tolerance), 0.05):
+                regressions.append({'size': size, 'operation': name, 'baseline_ms': before[name]['p50_ms'],
+                                    'p50_ms': latency['p50_ms'],
+                                    'ratio': round(latency['p50_ms'] / max(before[name]['p50_ms'], 0.001), 2)})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='benchmarks.suite', description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', nargs='+', default=['small', 'medium'],
+                        help=f"names of sizes ({', '.join(f'{k}={v}' for k, v in SIZES.items())}) or numbers of tickets")
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--with', dest='extra', nargs='+', default=[], choices=EXTRA_BENCHMARKS,
+                        help='also run these benchmarks')
+    parser.add_argument('--output', help='save the results to this JSON file')
+    parser.add_argument('--compare', help='JSON file of earlier results, exit with 1 on a regression')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed relative slowdown of the medians')
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.repeat, args.extra)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as _file:
+            results['regressions'] = compare(results, json.load(_file), args.tolerance)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as _file:
+            json.dump(results, _file, indent=2)
+    print(json.dumps(results, indent=2))
+    return 1 if results.get('regressions') else 0
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.ERROR)
+    sys.exit(main())
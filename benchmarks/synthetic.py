@@ -0,0 +1,133 @@
+"""
+Synthetic databases for the benchmarks: customers, cars and tickets generated from a seed, so the same
+size gives the same database on every run, on top of the brand, model and color rows of database_schema.sql.
+
+Run from the repository root to create database/zortech_database.db in a directory, e.g.:
+    python -m benchmarks.synthetic /tmp/demo [tickets]
+"""
+import datetime
+import logging
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from database.database import Database
+
+# Number of tickets of the benchmark databases
+SIZES = {'small': 1000, 'medium': 50000, 'large': 500000}
+
+FIRST_NAMES = ('jan', 'anna', 'piotr', 'katarzyna', 'tomasz', 'agnieszka', 'paweł', 'magdalena', 'michał',
+               'joanna', 'krzysztof', 'ewa', 'marcin', 'monika', 'łukasz', 'barbara', 'adam', 'zofia', '')
+LAST_NAMES = ('nowak', 'kowalski', 'wiśniewski', 'wójcik', 'kowalczyk', 'kamiński', 'lewandowski', 'zieliński',
+              'szymański', 'woźniak', 'dąbrowski', 'kozłowski', 'jankowski', 'mazur', 'kwiatkowski', 'krawczyk',
+              'piotrowski', 'grabowski', 'nowakowski', 'pawłowski', 'michalski', 'nowicki', 'adamczyk', 'dudek')
+NOTES = ('nabicie klimatyzacji', 'odgrzybianie', 'wymiana filtra kabinowego', 'szczelność układu',
+         'wymiana sprężarki', 'diagnostyka', 'wymiana skraplacza', 'naprawa przewodu', 'AC check', '')
+# VIN characters, I, O and Q are not used
+VIN_CHARACTERS = 'ABCDEFGHJKLMNPRSTUVWXYZ0123456789'
+# Tickets per customer and cars per customer on average
+TICKETS_PER_CUSTOMER = 3
+CARS_PER_CUSTOMER = 1.3
+# Newest fraction of the tickets which are still open
+OPEN_FRACTION = 0.1
+
+
+@contextmanager
+def scratch_directory():
+    """
+    Change to a temporary directory with database/database_schema.sql and the migrations copied from the
+    repository, DBProcessor opens database/zortech_database.db relative to the working directory.
+    E.g. with scratch_directory(): generate(1000); database = DBProcessor()
+    :return:
+    """
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.mkdir(os.path.join(tmp, 'database'))
+        shutil.copy(os.path.join(cwd, 'database', 'database_schema.sql'), os.path.join(tmp, 'database'))
+        shutil.copytree(os.path.join(cwd, 'database', 'migrations'), os.path.join(tmp, 'database', 'migrations'))
+        os.chdir(tmp)
+        try:
+            yield tmp
+        finally:
+            os.chdir(cwd)
+
+
+def _customers(rng, count):
+    for i in range(1, count + 1):
+        first_name = rng.choice(FIRST_NAMES)
+        last_name = rng.choice(LAST_NAMES)
+        email = f"{first_name or last_name}.{last_name}{i}@example.com" if rng.random() < 0.6 else ''
+        yield i, first_name, last_name, email, f"{500000000 + i * 7 % 400000000}"
+
+
+def _cars(rng, count, customers, models, colors):
+    for i in range(1, count + 1):
+        # Every customer has a car, the rest of the cars belong to random customers
+        customer_id = i if i <= customers else rng.randint(1, customers)
+        model_id, brand_id = rng.choice(models)
+        vin = ''.join(rng.choice(VIN_CHARACTERS) for _ in range(17)) if rng.random() < 0.7 else ''
+        yield i, customer_id, brand_id, model_id, rng.choice(colors), rng.randint(1995, 2024), vin
+
+
+def _tickets(rng, count, cars, car_owners):
+    start = datetime.datetime(2022, 1, 1, 8)
+    # Tickets are spread over three years in the order of their IDs
+    step = 3 * 365 * 24 * 3600 / count
+    for i in range(1, count + 1):
+        car_id = rng.randint(1, cars)
+        created = start + datetime.timedelta(seconds=int(i * step))
+        status = 1 if i > count * (1 - OPEN_FRACTION) else 0
+        yield (i, created.strftime('%Y-%m-%d %H:%M:%S'), created.strftime('%Y-%m-%d %H:%M:%S'),
+               car_owners[car_id], car_id, rng.choice(NOTES), status)
+
+
+def generate(tickets=SIZES['small'], path='database/zortech_database.db', seed=0, chunk_size=50000):
+    """
+    Create a database with the given number of tickets and the customers and cars they belong to.
+    The change log filled by the triggers is emptied, as after DBProcessor startup.
+    :param tickets: Number of tickets, e.g. SIZES['medium'].
+    :param path: Path of the new database file, relative to the working directory.
+    :param seed: Seed of the random generator.
+    :param chunk_size: Rows inserted per executemany call.
+    :return: Dictionary with the numbers of generated rows and the seconds it took.
+    """
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    database = Database(path)
+    models = database.fetch_all("SELECT id, brand_id FROM models ORDER BY id")
+    colors = [row[0] for row in database.fetch_all("SELECT id FROM colors ORDER BY id")]
+    customers = max(tickets // TICKETS_PER_CUSTOMER, 1)
+    cars = max(int(customers * CARS_PER_CUSTOMER), 1)
+
+    car_rows = list(_cars(rng, cars, customers, models, colors))
+    car_owners = {row[0]: row[1] for row in car_rows}
+    inserts = (
+        ("INSERT INTO customers (id, first_name, last_name, email, phone) VALUES (?, ?, ?, ?, ?)",
+         _customers(rng, customers)),
+        ("INSERT INTO cars (id, customer_id, brand_id, model_id, color_id, year, vin) VALUES (?, ?, ?, ?, ?, ?, ?)",
+         iter(car_rows)),
+        ("INSERT INTO tickets (id, date_creation, date_modification, customer_id, car_id, notes, status) "
+         "VALUES (?, ?, ?, ?, ?, ?, ?)", _tickets(rng, tickets, cars, car_owners)),
+    )
+    with database.transaction():
+        for sql, rows in inserts:
+            while True:
+                chunk = [row for _, row in zip(range(chunk_size), rows)]
+                if not chunk:
+                    break
+                database.execute_many(sql, chunk)
+        database.execute("DELETE FROM change_log")
+    database.execute("ANALYZE")
+    database.close()
+    return {'tickets': tickets, 'customers': customers, 'cars': cars, 'seed': seed,
+            'seconds': round(time.perf_counter() - start, 3)}
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.ERROR)
+    directory = sys.argv[1]
+    os.makedirs(os.path.join(directory, 'database'), exist_ok=True)
+    print(generate(*map(int, sys.argv[2:3]), path=os.path.join(directory, 'database', 'zortech_database.db')))
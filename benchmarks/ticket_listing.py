@@ -0,0 +1,113 @@
+"""
+Tickets treeview listing read from the ticket_listing table compared to the join of tickets,
+customers, cars, brands and models it replaced.
+
+Run from the repository root:
+    python -m benchmarks.ticket_listing [tickets]
+"""
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from database.database import Database
+from database.database_model import LISTING_QUERIES
+
+# Listing query used before the ticket_listing table
+JOIN_LISTING = (
+    """
+    tickets.id, tickets.date_creation,
+    CASE WHEN customers.first_name IS NOT NULL AND TRIM(customers.first_name) <> '' THEN customers.first_name
+    || ' - ' || customers.last_name ELSE customers.last_name END || ' - ' || customers.phone,
+    brands.name || CASE WHEN models.name IS NOT NULL THEN ' - ' || models.name ELSE '' END, tickets.notes,
+    tickets.status
+    """,
+    """
+    tickets
+    LEFT JOIN customers
+    ON tickets.customer_id = customers.id
+    LEFT JOIN cars
+    ON tickets.car_id = cars.id
+    LEFT JOIN brands
+    ON cars.brand_id = brands.id
+    LEFT JOIN models
+    ON cars.model_id = models.id
+    """,
+    "COALESCE(customers.last_name, '')",
+)
+
+TABLE_LISTING = LISTING_QUERIES['tickets'] + ('tickets.customer_last_name',)
+
+
+def populate(database, tickets):
+    customers = max(tickets // 5, 1)
+    cursor = database.connection.cursor()
+    cursor.executemany(
+        "INSERT INTO customers (id, first_name, last_name, phone, email) VALUES (?, ?, ?, ?, ?)",
+        [(i, f"first{i}", f"last{i % 997}", f"{500000000 + i}", f"c{i}@example.com") for i in range(1, customers + 1)]
+    )
+    cursor.executemany(
+        "INSERT INTO cars (id, customer_id, brand_id, model_id, color_id, year, vin) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [(i, i, i % 33 + 1, i % 300 + 1, i % 22 + 1, 2000 + i % 24, f"VIN{i:014d}") for i in range(1, customers + 1)]
+    )
+    cursor.executemany(
+        "INSERT INTO tickets (id, date_creation, customer_id, car_id, notes, status) VALUES (?, ?, ?, ?, ?, ?)",
+        [(i, f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d} 10:00:00", i % customers + 1, i % customers + 1,
+          f"notes {i}", i % 2) for i in range(1, tickets + 1)]
+    )
+    database.connection.commit()
+
+
+def queries(listing, tickets):
+    """
+    :param listing: Tuple (columns, source, customer sort expression).
+    :param tickets: Number of tickets in the database.
+    :return: Dictionary name -> (query, params)
+    """
+    columns, source, customer = listing
+    return {
+        'first_page': (f"SELECT {columns} FROM {source} ORDER BY tickets.id LIMIT 100", ()),
+        'middle_page': (f"SELECT {columns} FROM {source} WHERE tickets.id > ? ORDER BY tickets.id LIMIT 100",
+                        (tickets // 2,)),
+        'first_page_by_customer': (f"SELECT {columns} FROM {source} ORDER BY {customer}, tickets.id LIMIT 100", ()),
+        'middle_page_by_customer': (
+            f"SELECT {columns} FROM {source} WHERE ({customer}, tickets.id) > "
+            f"(SELECT {customer}, tickets.id FROM {source} WHERE tickets.id = ?) "
+            f"ORDER BY {customer}, tickets.id LIMIT 100",
+            (tickets // 2,)
+        ),
+        'full_listing': (f"SELECT {columns} FROM {source} ORDER BY tickets.id", ()),
+    }
+
+
+def measure(database, query, params, repeat):
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        database.connection.execute(query, params).fetchall()
+        latencies.append(time.perf_counter() - start)
+    return round(statistics.median(latencies) * 1000, 3)
+
+
+def run(tickets=50000, repeat=20):
+    results = {'tickets': tickets}
+    with tempfile.TemporaryDirectory() as tmp:
+        database = Database(os.path.join(tmp, 'benchmark.db'))
+        start = time.perf_counter()
+        populate(database, tickets)
+        results['populate_seconds'] = round(time.perf_counter() - start, 3)
+        for name, listing in (('join', JOIN_LISTING), ('ticket_listing', TABLE_LISTING)):
+            results[name] = {
+                query_name: measure(database, query, params, repeat if query_name != 'full_listing' else 3)
+                for query_name, (query, params) in queries(listing, tickets).items()
+            }
+        database.close()
+    results['unit'] = 'median ms'
+    return results
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.ERROR)
+    print(json.dumps(run(*map(int, sys.argv[1:2])), indent=2))
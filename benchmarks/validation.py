@@ -0,0 +1,73 @@
+"""
+Per-record validation cost of the checks DataWindow did before validation.py (rules rebuilt
+and patterns looked up in the re module cache for every field) compared to the precompiled Validator.
+
+Run from the repository root:
+    python -m benchmarks.validation [records]
+"""
+import json
+import logging
+import re
+import sys
+import time
+from validation import VALIDATOR
+
+
+def records(count):
+    return [{
+        'first_name': f"first{i}", 'last_name': f"Last{chr(97 + i % 26)}", 'phone': f"{500000000 + i}",
+        'email': f"c{i}@example.com" if i % 3 else '', 'brand_name': 'Toyota', 'model_name': 'Yaris',
+        'color_name': 'black', 'year': str(2000 + i % 24), 'vin': f"WVW{i:014d}" if i % 2 else '',
+        'notes': 'notes', 'status': '1',
+    } for i in range(count)]
+
+
+def validate_per_call(value, entry):
+    # DataWindow.validate and DataWindow._validate before validation.py
+    necessary_entries = ['last_name', 'phone', 'brand_name']
+    optional_entries = ['vin', 'year', 'email']
+    if entry not in necessary_entries + optional_entries:
+        return True
+    if entry in optional_entries and (not value or value == ''):
+        return True
+    _type = {
+        'vin': r'^[A-HJ-NPR-Z0-9]{17}$',
+        'email': r'^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$',
+        'year': r'^[0-9]{4}$',
+        'phone': r'^[0-9]{9}$',
+        'brand_name': r'^[a-zA-Z0-9 ]+$',
+        'last_name': r'^[a-zA-Z]{2,}$'
+    }
+    return bool(re.match(_type[entry], value))
+
+
+def per_call(data):
+    return [index for index, record in enumerate(data)
+            if not all([validate_per_call(value, entry) for entry, value in record.items()])]
+
+
+def per_field(data):
+    return [index for index, record in enumerate(data)
+            if not all([VALIDATOR.validate(entry, value) for entry, value in record.items()])]
+
+
+def measure(function, data):
+    start = time.perf_counter()
+    invalid = function(data)
+    seconds = time.perf_counter() - start
+    return {'us_per_record': round(seconds / len(data) * 1_000_000, 3), 'invalid': len(invalid)}
+
+
+def run(count=100000):
+    data = records(count)
+    return {
+        'records': count,
+        'per_call_rules': measure(per_call, data),
+        'validator_per_field': measure(per_field, data),
+        'validate_many': measure(VALIDATOR.validate_many, data),
+    }
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.ERROR)
+    print(json.dumps(run(*map(int, sys.argv[1:2])), indent=2))
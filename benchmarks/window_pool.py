@@ -0,0 +1,94 @@
+"""
+Open latency and memory of edit ticket windows built from scratch on every open compared to
+windows reused from the WindowPool, over many open/close cycles. Needs a display, the benchmark
+is skipped without one.
+
+Run from the repository root:
+    python -m benchmarks.window_pool [cycles]
+"""
+import json
+import logging
+import os
+import resource
+import statistics
+import sys
+import time
+import tkinter as tk
+from benchmarks.synthetic import scratch_directory
+from database.database_model import DBProcessor
+from gui_elements import EditTicketWindow, WindowPool
+
+
+class Parent:
+    # Stand-in for MainGUI with the attributes the data windows use
+    def __init__(self, root, database):
+        self.root = root
+        self.database = database
+        self.windows = WindowPool(self)
+
+    def update_treeviews(self):
+        pass
+
+
+def rss_kib():
+    """
+    :return: Current resident set size in KiB, peak size where /proc is not available.
+    """
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def populate(database):
+    customer_id = database.add_item_to_table(
+        'customers', {'first_name': 'jan', 'last_name': 'kowalski', 'phone': '500000000', 'email': 'j@example.com'})
+    car_id = database.add_item_to_table(
+        'cars', {'customer_id': customer_id, 'brand_id': 1, 'model_id': 1, 'color_id': 1, 'year': 2010,
+                 'vin': 'WVW00000000000001'})
+    return database.add_item_to_table(
+        'tickets', {'customer_id': customer_id, 'car_id': car_id, 'notes': 'notes', 'status': 1})
+
+
+def cycles(root, open_window, ticket_id, count):
+    latencies = []
+    start_rss = rss_kib()
+    for _ in range(count):
+        start = time.perf_counter()
+        window = open_window(ticket_id)
+        root.update()
+        latencies.append(time.perf_counter() - start)
+        window.quit_window()
+        root.update()
+    latencies.sort()
+    return {
+        'open_p50_ms': round(statistics.median(latencies) * 1000, 3),
+        'open_p95_ms': round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 3),
+        'rss_growth_kib': rss_kib() - start_rss,
+    }
+
+
+def run(count=1000):
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        return {'skipped': f"No display: {e}"}
+    results = {'cycles': count}
+    # DBProcessor opens database/zortech_database.db, run it on a scratch database
+    with scratch_directory():
+        database = DBProcessor()
+        parent = Parent(root, database)
+        ticket_id = populate(database)
+        results['rebuilt'] = cycles(root, lambda item_id: EditTicketWindow(parent, item_id), ticket_id, count)
+        results['pooled'] = cycles(root, lambda item_id: parent.windows.open(EditTicketWindow, item_id),
+                                   ticket_id, count)
+        parent.windows.clear()
+        database.close()
+    root.destroy()
+    return results
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.ERROR)
+    print(json.dumps(run(*map(int, sys.argv[1:2])), indent=2))
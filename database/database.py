@@ -1,21 +1,35 @@
+import glob
+import os
 import sqlite3
+import time
+from contextlib import closing, contextmanager
+from database.instrumentation import STATS, query_name
 from misc import Entity
 
+MIGRATIONS_DIR = "database/migrations"
+
+JOURNAL_MODES = ('DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF')
+SYNCHRONOUS_MODES = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+TEMP_STORES = ('DEFAULT', 'FILE', 'MEMORY')
+
 
 class Database(Entity):
-    def __init__(self, db):
+    def __init__(self, db, profile=None):
         super().__init__()
         """
-        Initialize database connection and cursor.
+        Initialize database connection, statements are executed on short-lived cursors.
         E.g. database = Database("database.db")
         :param db:  Path to database file.
+        :param profile: Connection PRAGMAs, default APP_CONFIG['database'].
         """
         # Variables initialization
         self.db = db
+        self.profile = self.app_config.get('database', {}) if profile is None else profile
         self.connection = None
-        self.cursor = None
         self.lang = 'en'
         self.tables = {}
+        self.migration_report = []
+        self.transaction_depth = 0
 
         self._connect_to_database()
 
@@ -25,8 +39,6 @@ class Database(Entity):
         :return:
         """
         try:
-            if self.cursor:
-                self.cursor.close()
             if self.connection:
                 self.connection.close()
             self.logger.info("* Connection to database closed...")
@@ -34,6 +46,36 @@ class Database(Entity):
             self.logger.exception(f"Cannot close connection to database {self.db}, error {e}...")
             raise
 
+    @contextmanager
+    def transaction(self):
+        """
+        Group statements into one atomic commit, rolled back if an exception is raised.
+        Nested transactions join the outermost one.
+        E.g. with database.transaction(): ...
+        :return:
+        """
+        self.transaction_depth += 1
+        try:
+            yield self
+        except BaseException:
+            if self.transaction_depth == 1:
+                self.logger.warning("* Rolling back transaction...")
+                self.connection.rollback()
+            raise
+        else:
+            if self.transaction_depth == 1:
+                self.connection.commit()
+        finally:
+            self.transaction_depth -= 1
+
+    def commit(self):
+        """
+        Commit pending changes, unless they are part of an open transaction.
+        :return:
+        """
+        if not self.transaction_depth:
+            self.connection.commit()
+
     def _create_tables(self):
         """
         Create database tables using database_schema.sql file.
@@ -42,13 +84,89 @@ class Database(Entity):
         self.logger.info("* Creating tables...")
         try:
             with open("database/database_schema.sql", "r") as _schema:
-                self.cursor.executescript(_schema.read())
+                self.connection.executescript(_schema.read())
             self.connection.commit()
             self.logger.info("* Tables created...")
         except sqlite3.Error as e:
             self.logger.exception(f"Cannot create tables, error {e}...")
             raise
 
+    def _get_migrations(self):
+        """
+        List migration scripts from database/migrations directory.
+        File names start with the schema version they upgrade to, e.g. 0001_lookup_indexes.sql
+        :return: List of tuples (version, name, path) sorted by version.
+        """
+        migrations = []
+        for path in glob.glob(os.path.join(MIGRATIONS_DIR, "*.sql")):
+            version, _, name = os.path.splitext(os.path.basename(path))[0].partition('_')
+            migrations.append((int(version), name, path))
+        return sorted(migrations)
+
+    def get_schema_version(self):
+        """
+        Get the schema version stored in PRAGMA user_version.
+        :return:
+        """
+        return self.fetch_one("PRAGMA user_version")[0]
+
+    def _migrate(self):
+        """
+        Upgrade the database schema in place by running every migration newer than PRAGMA user_version.
+        Each migration runs in its own transaction together with the user_version bump.
+        :return: List of tuples (version, name, seconds) of the applied migrations.
+        """
+        current_version = self.get_schema_version()
+        report = []
+        for version, name, path in self._get_migrations():
+            if version <= current_version:
+                continue
+            self.logger.info(f"* Migrating database to version {version} ({name})...")
+            start = time.perf_counter()
+            try:
+                with open(path, "r") as _migration:
+                    self.connection.executescript(
+                        f"BEGIN;\n{_migration.read()}\nPRAGMA user_version = {version};\nCOMMIT;"
+                    )
+            except sqlite3.Error as e:
+                self.connection.rollback()
+                self.logger.exception(f"Cannot migrate database to version {version}, error {e}...")
+                raise
+            elapsed = time.perf_counter() - start
+            self.logger.info(f"* Database migrated to version {version} in {elapsed:.3f}s...")
+            report.append((version, name, elapsed))
+        self.migration_report = report
+        return report
+
+    def _apply_connection_profile(self):
+        """
+        Set connection PRAGMAs from the connection profile, e.g. WAL journaling lets readers
+        work while a write transaction is open.
+        :return:
+        """
+        journal_mode = self.profile.get('journal_mode')
+        if journal_mode:
+            if journal_mode.upper() not in JOURNAL_MODES:
+                raise ValueError(f"Unknown journal mode '{journal_mode}'")
+            # The mode actually set is returned, e.g. 'memory' for an in-memory database
+            mode = self.fetch_one(f"PRAGMA journal_mode = {journal_mode.upper()}")[0]
+            self.logger.info("* Journal mode: %s", mode)
+        synchronous = self.profile.get('synchronous')
+        if synchronous:
+            if synchronous.upper() not in SYNCHRONOUS_MODES:
+                raise ValueError(f"Unknown synchronous mode '{synchronous}'")
+            self.execute(f"PRAGMA synchronous = {synchronous.upper()}")
+        temp_store = self.profile.get('temp_store')
+        if temp_store:
+            if temp_store.upper() not in TEMP_STORES:
+                raise ValueError(f"Unknown temp store '{temp_store}'")
+            self.execute(f"PRAGMA temp_store = {temp_store.upper()}")
+        for pragma in ('cache_size', 'mmap_size', 'busy_timeout'):
+            if self.profile.get(pragma) is not None:
+                self.execute(f"PRAGMA {pragma} = {int(self.profile[pragma])}")
+        if self.profile.get('foreign_keys') is not None:
+            self.execute(f"PRAGMA foreign_keys = {'ON' if self.profile['foreign_keys'] else 'OFF'}")
+
     def _connect_to_database(self):
         """
         Connect to database.
@@ -56,14 +174,15 @@ class Database(Entity):
         """
         self.logger.info(f"* Connecting to database {self.db}...")
         try:
-            self.connection = sqlite3.connect(self.db)
-            self.cursor = self.connection.cursor()
+            # Parameterized queries have a stable text, so a bigger statement cache keeps them prepared
+            self.connection = sqlite3.connect(self.db, cached_statements=self.profile.get('cached_statements', 128))
+            self._apply_connection_profile()
             self.logger.info("* Connection to database initialized...")
             # Check if database exists
-            self.cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-            if not self.cursor.fetchall():
+            if not self.fetch_all("SELECT name FROM sqlite_master WHERE type='table';"):
                 self.logger.warning("Database not exists, creating tables...")
                 self._create_tables()
+            self._migrate()
         except sqlite3.Error as e:
             self.logger.exception(f"Cannot connect to database {self.db}, error {e}...")
             raise
@@ -77,6 +196,101 @@ class Database(Entity):
         if not query:
             self.logger.warning("Query is empty...")
             return None
-        self.logger.debug(f"* Executing query: {query}")
-        self.cursor.execute(query)
-        return self.cursor.fetchall()
+        self.logger.debug("* Executing query: %s", query)
+        return self.fetch_all(query)
+
+    def _cursor(self, row_factory=None):
+        cursor = self.connection.cursor()
+        if row_factory:
+            cursor.row_factory = row_factory
+        return closing(cursor)
+
+    def fetch_all(self, sql, params=(), row_factory=None):
+        """
+        Run a query on a short-lived cursor and fetch all rows.
+        E.g. database.fetch_all(STATEMENTS['brands'])
+        :param sql: Query, usually a named statement from database/statements.py.
+        :param params: Query parameters.
+        :param row_factory: Cursor row factory, e.g. sqlite3.Row, default tuples.
+        :return: List of rows.
+        """
+        start = time.perf_counter()
+        with self._cursor(row_factory) as cursor:
+            rows = cursor.execute(sql, params).fetchall()
+        self._record(sql, params, start, len(rows))
+        return rows
+
+    def fetch_one(self, sql, params=(), row_factory=None):
+        """
+        Run a query on a short-lived cursor and fetch the first row.
+        :param sql: Query.
+        :param params: Query parameters.
+        :param row_factory: Cursor row factory, e.g. sqlite3.Row, default tuples.
+        :return: Row or None.
+        """
+        start = time.perf_counter()
+        with self._cursor(row_factory) as cursor:
+            row = cursor.execute(sql, params).fetchone()
+        self._record(sql, params, start, 0 if row is None else 1)
+        return row
+
+    def execute(self, sql, params=()):
+        """
+        Run a statement on a short-lived cursor, the changes are committed by the caller.
+        :param sql: Statement.
+        :param params: Statement parameters.
+        :return: Tuple (lastrowid, rowcount)
+        """
+        start = time.perf_counter()
+        with self._cursor() as cursor:
+            cursor.execute(sql, params)
+            result = cursor.lastrowid, cursor.rowcount
+        self._record(sql, params, start, max(result[1], 0))
+        return result
+
+    def execute_many(self, sql, seq_of_params):
+        """
+        Run a statement once for every parameter set on a short-lived cursor.
+        :param sql: Statement.
+        :param seq_of_params: Iterable of statement parameters.
+        :return: Number of modified rows.
+        """
+        start = time.perf_counter()
+        with self._cursor() as cursor:
+            cursor.executemany(sql, seq_of_params)
+            rowcount = cursor.rowcount
+        # Query plan of the statement does not depend on the parameters, it is explained without them
+        self._record(sql, None, start, max(rowcount, 0))
+        return rowcount
+
+    def _record(self, sql, params, start, rows):
+        """
+        Record the query in STATS, queries slower than APP_CONFIG['instrumentation']['slow_query_ms']
+        are added to the slow query log with their query plan.
+        :param sql: Query.
+        :param params: Query parameters, None if not known.
+        :param start: time.perf_counter() before the query was run.
+        :param rows: Number of rows returned or modified.
+        :return:
+        """
+        if not STATS.enabled:
+            return
+        seconds = time.perf_counter() - start
+        if STATS.record('queries', query_name(sql), seconds, rows):
+            STATS.slow_query(sql, params, seconds, self.explain(sql, params) if STATS.explain else None)
+
+    def explain(self, sql, params=None):
+        """
+        :param sql: Query.
+        :param params: Query parameters, None binds NULL to all of them.
+        :return: List of the EXPLAIN QUERY PLAN details, e.g. ['SEARCH tickets USING INTEGER PRIMARY KEY (rowid=?)'],
+                 None if the statement cannot be explained.
+        """
+        if params is None:
+            params = (None,) * sql.count('?')
+        try:
+            with self._cursor() as cursor:
+                return [row[-1] for row in cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+        except sqlite3.Error as e:
+            self.logger.debug("Query cannot be explained: %s", e)
+            return None
@@ -1,22 +1,177 @@
 import os
 import inspect
+import json
+from concurrent.futures import Future
+from functools import partial
 from database.database import Database
+from database.executor import DBExecutor
+from database.instrumentation import instrumented
+from database.query import Filter
+from database.statements import STATEMENTS, statement, insert_statement, update_statement, update_many_statement, \
+    select_by_id_statement
+from database.reference_cache import ReferenceCache, REFERENCE_TABLES
 from misc import Entity
 import sqlite3
+from contextlib import contextmanager
+
+
+# Listing columns and source of every treeview table
+LISTING_QUERIES = {
+    # Ready to display tickets kept up to date by triggers, see migrations/0006_ticket_listing.sql
+    'tickets': (
+        "tickets.id, tickets.date_creation, tickets.customer, tickets.car, tickets.notes, tickets.status",
+        "ticket_listing AS tickets"
+    ),
+    # Kept up to date by triggers as well, see migrations/0009_car_listing.sql
+    'cars': (
+        "cars.id, cars.brand, cars.model, cars.color, cars.year, cars.vin, cars.customer",
+        "car_listing AS cars"
+    ),
+    'customers': ("*", "customers"),
+}
+
+# Columns identifying an already existing row, used by the identity map of a transaction
+IDENTITY_KEYS = {
+    'customers': ('last_name', 'phone'),
+    'cars': ('customer_id', 'brand_id'),
+}
+
+# Treeview column -> SQL sort expression, only these columns can be used in ORDER BY.
+# Nullable values are coalesced, NULL would break the (value, id) keyset comparison.
+# Every expression is served by an index, see migrations/0003, 0006, 0009 and 0010.
+SORT_COLUMNS = {
+    'tickets': {
+        'ID': 'tickets.id',
+        'date': 'tickets.date_creation',
+        'customer': 'tickets.customer_last_name',
+        'car': 'tickets.brand_name',
+        'notes': "COALESCE(tickets.notes, '')",
+    },
+    'customers': {
+        'ID': 'customers.id',
+        'customer_first_name': "COALESCE(customers.first_name, '')",
+        'customer_last_name': 'customers.last_name',
+        'email': "COALESCE(customers.email, '')",
+        'phone': 'customers.phone',
+    },
+    'cars': {
+        'ID': 'cars.id',
+        'brand_name': 'cars.brand_name',
+        'model_name': 'cars.model_name',
+        'color_name': 'cars.color_name',
+        'year': 'cars.year_key',
+        'vin': 'cars.vin_key',
+        'customer': 'cars.customer_last_name',
+    },
+}
+
+
+# Kind of a search_index document, stored in the lowest bits of its rowid (item_id * 4 + kind)
+SEARCH_KINDS = {1: 'customers', 2: 'cars', 3: 'tickets'}
+
+
+def build_match_query(text):
+    """
+    Turn text typed by the user into an FTS5 MATCH expression, every word is matched as a prefix.
+    Words are quoted, so FTS5 operators and special characters typed by the user are taken literally.
+    E.g. 'jan 60' -> '"jan"* "60"*'
+    :param text: Searched text.
+    :return: MATCH expression or None if there is nothing to search for.
+    """
+    words = [word.replace('"', '""') for word in text.split()]
+    if not words:
+        return None
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def _async_variant(name):
+    """
+    Create a method queueing the DBProcessor method of the given name on the database worker thread.
+    :param name: Name of the DBProcessor method.
+    :return:
+    """
+    def method(self, *args, callback=None, errback=None, **kwargs):
+        return self.submit(name, *args, callback=callback, errback=errback, **kwargs)
+    method.__name__ = f"{name}_async"
+    method.__doc__ = f"Run {name} on the database worker thread, see DBProcessor.submit."
+    return method
 
 
 """
 Links between the database and the application
 """
+@instrumented
 class DBProcessor(Entity):
-    def __init__(self):
+    def __init__(self, background=False, prune=True, preload=True):
+        """
+        :param background: Start a database worker thread with its own connection for the *_async methods.
+        :param prune: Remove the change log at startup, not done by the worker which shares it with the GUI.
+        :param preload: Load reference data now, otherwise on first use or refresh_reference_data().
+        """
         super().__init__()
         _database_prefix = 'database'
         self.database_name = f'{_database_prefix}/zortech_database.db'
         self.database = Database(self.database_name)
+        self.reference = ReferenceCache(self.database)
+        # {(table, *identity values): id} of rows looked up or inserted in the current transaction
+        self._identity_map = None
+
+        if preload:
+            self.reference.load()
+        if prune:
+            self.prune_change_log()
+        self.executor = DBExecutor(partial(DBProcessor, prune=False, preload=False)) if background else None
+
+    def attach(self, root):
+        """
+        Deliver results of the *_async methods on the Tk mainloop.
+        :param root: tk.Tk object.
+        :return:
+        """
+        if self.executor:
+            self.executor.attach(root)
+
+    def submit(self, function, *args, callback=None, errback=None, **kwargs):
+        """
+        Run a call on the database worker thread, so the Tk mainloop does not wait for SQLite.
+        Without a worker thread the call is made right away.
+        E.g. database.submit('delete_item', 'cars', 5, callback=on_deleted, errback=on_error)
+        :param function: Name of a DBProcessor method, or a callable called as function(db_processor, ...)
+                         with the DBProcessor of the worker thread, it must not touch Tk widgets.
+        :param args: Positional arguments of the call.
+        :param callback: Called on the Tk mainloop with the result.
+        :param errback: Called on the Tk mainloop with the exception, by default the exception is logged.
+        :param kwargs: Keyword arguments of the call.
+        :return: concurrent.futures.Future of the call.
+        """
+        if self.executor:
+            return self.executor.submit(function, *args, callback=callback, errback=errback, **kwargs)
+        future = Future()
+        try:
+            if isinstance(function, str):
+                result = getattr(self, function)(*args, **kwargs)
+            else:
+                result = function(self, *args, **kwargs)
+        except Exception as e:
+            future.set_exception(e)
+            if not errback:
+                raise
+            errback(e)
+        else:
+            future.set_result(result)
+            if callback:
+                callback(result)
+        return future
 
-        self.static_values = None
-        self.get_static_values_from_database()
+    get_all_items_async = _async_variant('get_all_items')
+    get_versioned_items_async = _async_variant('get_versioned_items')
+    get_changed_rows_async = _async_variant('get_changed_rows')
+    prune_change_log_async = _async_variant('prune_change_log')
+    delete_item_async = _async_variant('delete_item')
+    delete_items_async = _async_variant('delete_items')
+    update_items_async = _async_variant('update_items')
+    set_tickets_status_async = _async_variant('set_tickets_status')
+    search_async = _async_variant('search')
 
     def execute_query(self, query):
         """
@@ -27,45 +182,91 @@ class DBProcessor(Entity):
         return self.database.execute_query(query)
 
     def fetch_all(self, table, columns='*', where=None):
-        query = f"SELECT {columns} FROM {table}"
-        if where:
-            query += f" WHERE {where}"
-        return self.execute_query(query)
+        """
+        :param table: Name of the table.
+        :param columns: Selected columns.
+        :param where: Filter object.
+        :return:
+        """
+        return self.fetch_all_join(table, columns, where=where)
 
     def fetch_all_join(self, table, columns='*', join=None, where=None, dictionary=False):
+        """
+        :param table: Name of the table.
+        :param columns: Selected columns.
+        :param join: Joined table with its ON clause, e.g. 'brands ON models.brand_id = brands.id'
+        :param where: Filter object.
+        :param dictionary: Return rows as dictionaries.
+        :return:
+        """
         query = f"SELECT {columns} FROM {table}"
         if join:
             query += f" JOIN {join}"
+        params = []
         if where:
-            query += f" WHERE {where}"
-        self.database.cursor.execute(query)
-        results = self.database.cursor.fetchall()
+            where_sql, params = where.sql()
+            query += f" WHERE {where_sql}"
         if dictionary:
-            results = [{description[0]: data for description, data in
-                        zip(self.database.cursor.description, result)} for result in results]
-
-        return results
+            return [dict(row) for row in self.database.fetch_all(query, params, row_factory=sqlite3.Row)]
+        return self.database.fetch_all(query, params)
 
     def fetch_brands(self):
-        return self.fetch_all('brands',
-                              'id, name')
+        return self.database.fetch_all(STATEMENTS['brands'])
 
     def fetch_colors(self):
-        return self.fetch_all('colors',
-                              'id, name')
+        return self.database.fetch_all(STATEMENTS['colors'])
 
     def fetch_models(self):
-        return self.fetch_all_join('models',
-                                   'models.id, models.name, brand_id',
-                                   'brands',
-                                   'models.brand_id = brands.id'
-                                   )
+        return self.database.fetch_all(STATEMENTS['models'])
 
     def fetch_models_from_brand(self, brand_name):
-        return self.fetch_all_join('models',
-                                   'models.name',
-                                   'brands ON models.brand_id = brands.id',
-                                   f"brands.name = '{brand_name}'")
+        return self.database.fetch_all(STATEMENTS['models_of_brand'], (brand_name,))
+
+    @contextmanager
+    def transaction(self):
+        """
+        Unit of work: inserts and updates made inside are committed once at the end
+        or rolled back together if an exception is raised.
+        Rows looked up or inserted by identity (see IDENTITY_KEYS) are cached until the transaction ends.
+        E.g.
+            with database.transaction():
+                customer.add()
+                car.add()
+        :return:
+        """
+        outermost = self._identity_map is None
+        if outermost:
+            self._identity_map = {}
+        try:
+            with self.database.transaction():
+                yield self
+        finally:
+            if outermost:
+                self._identity_map = None
+
+    def _identity_key(self, table, item_data):
+        if self._identity_map is None or table not in IDENTITY_KEYS:
+            return None
+        if any(column not in item_data for column in IDENTITY_KEYS[table]):
+            return None
+        return (table,) + tuple(item_data[column] for column in IDENTITY_KEYS[table])
+
+    def _find_by_identity(self, table, item_data, query):
+        """
+        Get ID of the row matching IDENTITY_KEYS columns, cached within a transaction.
+        :param table: Name of the table.
+        :param item_data: Dictionary with identity columns.
+        :param query: Query selecting the ID by identity columns.
+        :return: ID or None if not found.
+        """
+        key = self._identity_key(table, item_data)
+        if key and key in self._identity_map:
+            return self._identity_map[key]
+        c_id = self.database.fetch_one(query, tuple(item_data[column] for column in IDENTITY_KEYS[table]))
+        c_id = c_id[0] if c_id else None
+        if key:
+            self._identity_map[key] = c_id
+        return c_id
 
     def check_if_customer_exists(self, customer_data):
         """
@@ -73,11 +274,7 @@ class DBProcessor(Entity):
         :param customer_data:
         :return:
         """
-        query = "SELECT id FROM customers WHERE last_name = ? AND phone = ?"
-        self.logger.debug(f"Running query: {query}")
-        self.database.cursor.execute(query, (customer_data['last_name'], customer_data['phone']))
-        c_id = self.database.cursor.fetchone()
-        return c_id[0] if c_id else None
+        return self._find_by_identity('customers', customer_data, STATEMENTS['customer_by_identity'])
 
     def check_if_car_exists(self, car_data):
         """
@@ -85,87 +282,278 @@ class DBProcessor(Entity):
         :param car_data:
         :return:
         """
-        query = "SELECT id FROM cars WHERE customer_id = ? AND brand_id = ?"
-        self.database.cursor.execute(query, (car_data['customer_id'], car_data['brand_id']))
-        c_id = self.database.cursor.fetchone()
-        return c_id[0] if c_id else None
+        return self._find_by_identity('cars', car_data, STATEMENTS['car_by_identity'])
 
     def get_item_from_id(self, table, item_id, columns='*'):
         """
-        Get item from database.
+        Get item from database, brands, models and colors are served from the reference cache.
         :param item_id: ID of the item.
         :param table: Name of the table.
-        :param columns: Get columns, default all
-        :return:
+        :param columns: Get columns, default all, e.g. 'first_name, last_name'
+        :return: Dictionary of column values.
         """
         if not item_id:
             self.logger.warning(f'Passed value to table \'{table}\' is None', exc_info=False)
             return {'name': ''}
-        query = f"SELECT {columns} FROM {table} WHERE {table}.id = ?"
-        self.database.cursor.execute(query, (item_id,))
-        # Return data with column names as a dictionary
-        return {description[0]: data for description, data in zip(self.database.cursor.description, self.database.cursor.fetchone())}
+        if table in REFERENCE_TABLES and columns == '*':
+            item = self.reference.get_item(table, item_id)
+            if item:
+                return item
+        if columns == '*':
+            query = statement(f'{table}_by_id')
+        else:
+            query = select_by_id_statement(table, tuple(column.strip() for column in columns.split(',')))
+        row = self.database.fetch_one(query, (item_id,), row_factory=sqlite3.Row)
+        return dict(row) if row else None
+
+    def _fetch_aggregate_rows(self, query, params):
+        """
+        Run aggregate query whose columns are aliased as '<part>__<column>'
+        and split each row into a dictionary of parts, e.g. {'ticket': {...}, 'customer': {...}}
+        :param query: Query to run.
+        :param params: Query parameters.
+        :return: List of dictionaries.
+        """
+        rows = self.database.fetch_all(query, params, row_factory=sqlite3.Row)
+        if not rows:
+            return []
+        columns = [key.split('__', 1) for key in rows[0].keys()]
+        results = []
+        for row in rows:
+            aggregate = {}
+            for (part, column), value in zip(columns, row):
+                aggregate.setdefault(part, {})[column] = value
+            results.append(aggregate)
+        return results
+
+    def get_ticket_aggregate(self, ticket_id):
+        """
+        Get ticket together with its customer and car (including brand, model and color names) in one query.
+        :param ticket_id: ID of the ticket.
+        :return: Dictionary {'ticket': {...}, 'customer': {...}, 'car': {...}} or None if ticket does not exist.
+        """
+        results = self._fetch_aggregate_rows(STATEMENTS['ticket_aggregate'], (ticket_id,))
+        return results[0] if results else None
+
+    def get_customer_aggregate(self, customer_id):
+        """
+        Get customer together with all their cars (including brand, model and color names) in one query.
+        :param customer_id: ID of the customer.
+        :return: Dictionary {'customer': {...}, 'cars': [{...}, ...]} or None if customer does not exist.
+        """
+        results = self._fetch_aggregate_rows(STATEMENTS['customer_aggregate'], (customer_id,))
+        if not results:
+            return None
+        return {
+            'customer': results[0]['customer'],
+            'cars': [result['car'] for result in results if result['car']['id'] is not None]
+        }
+
+    def get_car_aggregate(self, car_id):
+        """
+        Get car (including brand, model and color names) together with its owner in one query.
+        :param car_id: ID of the car.
+        :return: Dictionary {'car': {...}, 'customer': {...}} or None if car does not exist.
+        """
+        results = self._fetch_aggregate_rows(STATEMENTS['car_aggregate'], (car_id,))
+        return results[0] if results else None
 
     def get_item_from_name(self, table, item_name):
         """
-        Get item's ID from database by name
+        Get item's ID from database by name, brands, models and colors are served from the reference cache.
         :param table:
         :param item_name:
-        :return:
+        :return: ID or None (stored as NULL, which satisfies the foreign keys) if not found.
         """
         _item_name = item_name.lower()
-        query = f"""
-            SELECT {table}.id FROM {table}
-            WHERE {table}.name = ?
+        if table in REFERENCE_TABLES:
+            item_id = self.reference.get_id(table, _item_name)
+            if not item_id and _item_name:
+                # Added by another connection, e.g. an import or the GUI connection for the worker one
+                self.reference.refresh()
+                item_id = self.reference.get_id(table, _item_name)
+            return item_id if item_id else None
+        item_id = self.database.fetch_one(statement(f'{table}_id_by_name'), (_item_name,))
+        return item_id[0] if item_id else None
+
+    def get_model_id(self, brand_id, model_name):
+        """
+        Get ID of the brand's model by name from the reference cache.
+        :param brand_id: ID of the brand.
+        :param model_name: Case-insensitive model name.
+        :return: ID or None if the brand has no such model.
         """
-        self.database.cursor.execute(query, (_item_name,))
-        item_id = self.database.cursor.fetchone()
-        return item_id[0] if item_id else ""
+        model_id = self.reference.get_model_id(brand_id, model_name)
+        if model_id is None and model_name:
+            # Added by another connection, as in get_item_from_name
+            self.reference.refresh()
+            model_id = self.reference.get_model_id(brand_id, model_name)
+        return model_id
 
-    def get_all_items(self, table, where=None):
+    def get_all_items(self, table, where=None, after_id=None, before_id=None, limit=None,
+                      order_by=None, direction='ASC'):
         """
         Get all items from specified table.
+        Rows are ordered by order_by column and ID, which allows keyset pagination with after_id/before_id
+        and limit, e.g. get_all_items('tickets', after_id=200, limit=100) returns the next 100 tickets after
+        the ticket with ID 200.
         :param table: Name of the table.
-        :param where: Conditions to search for.
+        :param where: Filter object, e.g. Filter().equals('tickets.status', 1)
+        :param after_id: Return only rows placed after the row with this ID.
+        :param before_id: Return only rows placed before the row with this ID (the closest ones if limit is set).
+        :param limit: Maximum number of rows to return.
+        :param order_by: Treeview column to sort by, one of SORT_COLUMNS[table], default ID.
+        :param direction: 'ASC' or 'DESC'.
         :return:
         """
-        query = {
-            'tickets': """
-                SELECT tickets.id, tickets.date_creation,
-                CASE WHEN customers.first_name IS NOT NULL AND TRIM(customers.first_name) <> '' THEN customers.first_name
-                || ' - ' || customers.last_name ELSE customers.last_name END || ' - ' || customers.phone,
-                brands.name || CASE WHEN models.name IS NOT NULL THEN ' - ' || models.name ELSE '' END, tickets.notes,
-                tickets.status
-                FROM tickets 
-                LEFT JOIN customers 
-                ON tickets.customer_id = customers.id 
-                LEFT JOIN cars 
-                ON tickets.car_id = cars.id
-                LEFT JOIN brands
-                ON cars.brand_id = brands.id
-                LEFT JOIN models
-                ON cars.model_id = models.id
-            """,
-            'cars': """
-                SELECT cars.id, brands.name, models.name, colors.name, cars.year, cars.vin,
-                customers.first_name || ' ' || customers.last_name || ' ' || customers.phone
-                FROM cars
-                LEFT JOIN brands
-                ON cars.brand_id = brands.id
-                LEFT JOIN models
-                ON cars.model_id = models.id
-                LEFT JOIN colors
-                ON cars.color_id = colors.id
-                LEFT JOIN customers
-                ON cars.customer_id = customers.id
-            """,
-            'customers': f"SELECT * FROM {table}",
-        }
+        if table not in LISTING_QUERIES:
+            raise ValueError(f"Unknown table '{table}'")
+        if order_by and order_by not in SORT_COLUMNS[table]:
+            raise ValueError(f"Cannot sort '{table}' by '{order_by}'")
+        if direction not in ('ASC', 'DESC'):
+            raise ValueError(f"Unknown sort direction '{direction}'")
+
+        columns, source = LISTING_QUERIES[table]
+        id_column = f"{table}.id"
+        sort_column = SORT_COLUMNS[table][order_by] if order_by else id_column
+        if sort_column == id_column:
+            sort_key = id_column
+            cursor = "?"
+            bound = None
+        else:
+            # Ties are broken by ID, the cursor row's sort value is looked up by its ID
+            sort_key = f"({sort_column}, {id_column})"
+            cursor = f"(SELECT {sort_column}, {id_column} FROM {source} WHERE {id_column} = ?)"
+            # SQLite does not seek an expression index by a row value, the redundant range of the sort
+            # expression alone starts the index walk at the cursor row instead of the first row
+            bound = f"(SELECT {sort_column} FROM {source} WHERE {id_column} = ?)"
+        descending = direction == 'DESC'
+
+        conditions = []
+        params = []
+        if where:
+            where_sql, params = where.sql()
+            conditions.append(f"({where_sql})")
+        for item_id, after in ((after_id, True), (before_id, False)):
+            if item_id is None:
+                continue
+            forward = after != descending
+            conditions.append(f"{sort_key} {'>' if forward else '<'} {cursor}")
+            params.append(item_id)
+            if bound:
+                conditions.append(f"{sort_column} {'>=' if forward else '<='} {bound}")
+                params.append(item_id)
+
+        query = f"SELECT {columns} FROM {source}"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        # Walk backwards when paging up, so LIMIT keeps the rows closest to before_id
+        backwards = before_id is not None and after_id is None
+        _direction = 'DESC' if descending != backwards else 'ASC'
+        query += f" ORDER BY {sort_column} {_direction}"
+        if sort_column != id_column:
+            query += f", {id_column} {_direction}"
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+
+        results = self.database.fetch_all(query, params)
+        return results[::-1] if backwards else results
+
+    def get_items_by_ids(self, table, item_ids, where=None):
+        """
+        Get listing rows (same columns as get_all_items) for the given IDs.
+        :param table: Name of the table.
+        :param item_ids: Iterable of row IDs.
+        :param where: Filter the rows have to match as well.
+        :return: List of rows ordered by ID.
+        """
+        item_ids = sorted(set(item_ids))
+        if not item_ids:
+            return []
+        # IDs are bound as one JSON array, the query text is the same for any number of IDs
+        return self.get_all_items(table, where=(where or Filter()).is_in(f"{table}.id", item_ids))
+
+    def get_versioned_items(self, table, **kwargs):
+        """
+        Get a page of items together with the change log version it is up to date with.
+        :param table: Name of the table.
+        :param kwargs: Arguments of get_all_items.
+        :return: Tuple (version, items)
+        """
+        # Version is read first, rows changed in between are synchronized again later
+        version = self.get_change_version()
+        return version, self.get_all_items(table, **kwargs)
 
+    def get_changed_rows(self, table, since, where=None):
+        """
+        Get rows of the table changed after the given change log version.
+        :param table: Name of the table.
+        :param since: Change log version the caller is synchronized with.
+        :param where: Filter of the caller, changed rows not matching it anymore are reported as deleted.
+        :return: Tuple (version, upserted_rows, deleted_ids)
+        """
+        version, upserted, deleted = self.get_changes(table, since)
+        rows = self.get_items_by_ids(table, upserted, where=where)
         if where:
-            query[table] += f" WHERE {where}"
-        self.database.cursor.execute(query[table])
-        return self.database.cursor.fetchall()
+            deleted |= upserted - {row[0] for row in rows}
+        return version, rows, deleted
+
+    def search(self, text, limit=50, candidates=1000):
+        """
+        Full-text search of customers, cars and tickets, best matches first.
+        Ranking every match of a short prefix is slow on a big index, so when there are more
+        matches than candidates only the newest candidates are ranked.
+        :param text: Searched text, every word is matched as a prefix.
+        :param limit: Maximum number of results.
+        :param candidates: Maximum number of matches ranked.
+        :return: List of tuples (table, id, customer, phone, car, vin, notes)
+        """
+        match = build_match_query(text)
+        if not match:
+            return []
+        # Walking matches in rowid order is cheap, it gives the lowest rowid of the newest candidates
+        threshold = self.database.fetch_one(STATEMENTS['search_threshold'], (match, candidates - 1))
+        rows = self.database.fetch_all(STATEMENTS['search'], (match, threshold[0] if threshold else 0, limit))
+        return [(SEARCH_KINDS[kind], *row) for kind, *row in rows]
+
+    def get_change_version(self):
+        """
+        Get the ID of the latest change log entry.
+        :return: 0 if nothing was changed yet.
+        """
+        return self.database.fetch_one(STATEMENTS['change_version'])[0]
+
+    def get_changes(self, table, since):
+        """
+        Get rows of the table changed after the given change log version.
+        Several changes of the same row are collapsed into the last one.
+        :param table: Name of the table.
+        :param since: Change log version the caller is synchronized with.
+        :return: Tuple (version, upserted_ids, deleted_ids)
+        """
+        changes = self.database.fetch_all(STATEMENTS['changes_since'], (table, since))
+        if not changes:
+            return since, set(), set()
+
+        last_operation = {}
+        for _, row_id, operation in changes:
+            last_operation[row_id] = operation
+        upserted = {row_id for row_id, operation in last_operation.items() if operation != 'delete'}
+        deleted = {row_id for row_id, operation in last_operation.items() if operation == 'delete'}
+        return changes[-1][0], upserted, deleted
+
+    def prune_change_log(self, before=None):
+        """
+        Remove change log entries which are not needed anymore.
+        :param before: Remove entries up to this version, default all of them.
+        :return:
+        """
+        if before is None:
+            self.database.execute(STATEMENTS['prune_change_log'])
+        else:
+            self.database.execute(STATEMENTS['prune_change_log_before'], (before,))
+        self.database.commit()
 
     def update_customer(self, customer_data):
         """
@@ -173,13 +561,12 @@ class DBProcessor(Entity):
         :param customer_data:  Dictionary of customer data.
         :return:
         """
-        set_clause = ', '.join([f"{column} = ?" for column in customer_data])
+        query = update_statement('customers', tuple(customer_data))
         values = tuple(customer_data.values()) + (customer_data['id'],)
-        query = f"UPDATE customers SET {set_clause} WHERE customers.id = ?"
 
-        self.logger.debug(f"Updating customer with ID: {customer_data['id']}...")
-        self.database.cursor.execute(query, values)
-        self.database.connection.commit()
+        self.logger.debug("Updating customer with ID: %s...", customer_data['id'])
+        self.database.execute(query, values)
+        self.database.commit()
 
     def update_car(self, car_data):
         """
@@ -187,13 +574,12 @@ class DBProcessor(Entity):
         :param car_data:  Dictionary of car data.
         :return:
         """
-        set_clause = ', '.join([f"{column} = ?" for column in car_data])
+        query = update_statement('cars', tuple(car_data))
         values = tuple(car_data.values()) + (car_data['id'],)
-        query = f"UPDATE cars SET {set_clause} WHERE cars.id = ?"
 
-        self.logger.debug(f"Updating car with ID: {car_data['id']}...")
-        self.database.cursor.execute(query, values)
-        self.database.connection.commit()
+        self.logger.debug("Updating car with ID: %s...", car_data['id'])
+        self.database.execute(query, values)
+        self.database.commit()
 
     def update_ticket(self, ticket_data):
         """
@@ -201,13 +587,51 @@ class DBProcessor(Entity):
         :param ticket_data:  Dictionary of ticket data.
         :return:
         """
-        set_clause = ', '.join([f"{column} = ?" for column in ticket_data])
+        query = update_statement('tickets', tuple(ticket_data))
         values = tuple(ticket_data.values()) + (ticket_data['id'],)
-        query = f"UPDATE tickets SET {set_clause} WHERE tickets.id = ?"
 
-        self.logger.debug(f"Updating ticket with ID: {ticket_data['id']}...")
-        self.database.cursor.execute(query, values)
-        self.database.connection.commit()
+        self.logger.debug("Updating ticket with ID: %s...", ticket_data['id'])
+        self.database.execute(query, values)
+        self.database.commit()
+
+    def toggle_ticket_status(self, ticket_id):
+        """
+        Switch ticket status between 1 (not done) and 0 (done).
+        :param ticket_id: ID of the ticket.
+        :return: New status.
+        """
+        current_ticket_status = self.database.fetch_one(STATEMENTS['ticket_status'], (ticket_id,))
+        status = 0 if bool(current_ticket_status[0]) else 1
+        self.update_ticket({'id': ticket_id, 'status': status})
+        return status
+
+    def update_items(self, table_name, item_ids, item_data):
+        """
+        Set the same values to many rows with one statement and one commit.
+        :param table_name: Name of the table.
+        :param item_ids: IDs of the rows to update.
+        :param item_data: Dictionary of column names and their new values.
+        :return: Number of updated rows.
+        """
+        item_ids = list(item_ids)
+        if not item_ids:
+            return 0
+        self.logger.debug("Updating %s items in %s...", len(item_ids), table_name)
+        query = update_many_statement(table_name, tuple(item_data))
+        with self.database.transaction():
+            _, count = self.database.execute(query, tuple(item_data.values()) + (json.dumps(item_ids),))
+        if table_name in REFERENCE_TABLES:
+            self.reference.invalidate()
+        return count
+
+    def set_tickets_status(self, ticket_ids, status):
+        """
+        Set status of many tickets at once, e.g. to close the tickets done at the end of the day.
+        :param ticket_ids: IDs of the tickets.
+        :param status: New status, 1 (not done) or 0 (done).
+        :return: Number of updated tickets.
+        """
+        return self.update_items('tickets', ticket_ids, {'status': status})
 
     def delete_item(self, table_name, item_id):
         """
@@ -215,11 +639,43 @@ class DBProcessor(Entity):
         :param table_name: Name of the table to delete item from.
         :param item_id: ID of the item to delete.
         :return:
+        :raises sqlite3.IntegrityError: If the item is still referenced (foreign keys are enforced).
         """
         self.logger.warn(f"Deleting item with ID: {item_id} from {table_name}...")
-        query = f"DELETE FROM {table_name} WHERE {table_name}.id = ?"
-        self.database.cursor.execute(query, (item_id,))
-        self.database.connection.commit()
+        query = statement(f'delete_{table_name}')
+        try:
+            self.database.execute(query, (item_id,))
+        except sqlite3.Error as e:
+            self.logger.error(f"Cannot delete item with ID: {item_id} from {table_name}: {e}")
+            if not self.database.transaction_depth:
+                self.database.connection.rollback()
+            raise
+        self.database.commit()
+        if table_name in REFERENCE_TABLES:
+            self.reference.invalidate()
+
+    def delete_items(self, table_name, item_ids):
+        """
+        Delete many items with one statement in one transaction, either all of them are deleted or none.
+        :param table_name: Name of the table to delete items from.
+        :param item_ids: IDs of the items to delete.
+        :return: Number of deleted items.
+        :raises sqlite3.IntegrityError: If any of the items is still referenced (foreign keys are enforced).
+        """
+        item_ids = list(item_ids)
+        if not item_ids:
+            return 0
+        self.logger.warn(f"Deleting {len(item_ids)} items from {table_name}...")
+        query = statement(f'delete_many_{table_name}')
+        try:
+            with self.database.transaction():
+                _, count = self.database.execute(query, (json.dumps(item_ids),))
+        except sqlite3.Error as e:
+            self.logger.error(f"Cannot delete items {item_ids} from {table_name}: {e}")
+            raise
+        if table_name in REFERENCE_TABLES:
+            self.reference.invalidate()
+        return count
 
     def add_item_to_table(self, table_name, item_data):
         """
@@ -227,59 +683,90 @@ class DBProcessor(Entity):
         :param table_name: Name of the table to add items to.
         :param item_data: Dictionary of column names and their values to insert.
         :return: ID of the last row inserted or None if an error occurred.
+                 Inside a transaction the error is raised, so the whole transaction is rolled back.
         """
-        columns = ', '.join(item_data.keys())
-        placeholders = ', '.join(['?'] * len(item_data))
+        query = insert_statement(table_name, tuple(item_data))
         values = tuple(item_data.values())
-        query = f"INSERT INTO {table_name} ({columns}) VALUES ({placeholders})"
-        self.logger.debug(f"Running query: {query} with values {values}")
+        # Values are not logged, they are customer data and make the log grow with every insert
+        self.logger.debug("Running query: %s", query)
         try:
-            self.database.cursor.execute(query, values)
-            self.database.connection.commit()
-            self.logger.debug(f"Item added to {table_name}...")
-            return self.database.cursor.lastrowid
+            item_id, _ = self.database.execute(query, values)
+            self.database.commit()
+            self.logger.debug("Item added to %s...", table_name)
+            if table_name in REFERENCE_TABLES:
+                self.reference.invalidate()
+            key = self._identity_key(table_name, item_data)
+            if key:
+                self._identity_map[key] = item_id
+            return item_id
         except sqlite3.Error as e:
             self.logger.exception(f"Error adding item to {table_name}: {e}")
+            if self.database.transaction_depth:
+                raise
             return None
 
-    def get_static_values_from_database(self):
-        # Out from database e.g:
-        # [
-        #   (1, 'Golf', 'volkswagen'),
-        #   (2, 'Polo', 'volkswagen'),
-        #   (15, 'Series 1', 'bmw'),
-        #   (16, 'Series 3', 'bmw'),
-        #   (...)
-        # ]
-        model_pack = {}
-        fetched_models = self.fetch_models()
-        for model in fetched_models:
-            # Get names list of the model depending on brand
-            model_pack[model[2]] = {m[0]: m[1] for m in fetched_models if m[2] == model[2]}
-
-        self.static_values = {
-            'brands': {b[0]: b[1] for b in self.fetch_brands()},
-            'colors': {c[0]: c[1].lower() for c in self.fetch_colors()},
-            'models': model_pack
-        }
+    def refresh_reference_data(self):
+        """
+        Reload cached brands, models and colors if they were changed since they were loaded.
+        :return:
+        """
+        self.reference.refresh()
+        if not self.reference.loaded:
+            self.reference.load()
+
+    def get_reference_data(self, since=None):
+        """
+        Read brands, models and colors for the reference cache of another DBProcessor, see refresh_reference_data_async.
+        :param since: Reference version of the other cache, None reads the tables anyway.
+        :return: Data for ReferenceCache.fill() or None if nothing changed since the given version.
+        """
+        return self.reference.fetch(since)
+
+    def refresh_reference_data_async(self, callback=None):
+        """
+        Reload cached brands, models and colors if they were changed, the tables are read on the database
+        worker thread and the cache is filled on the Tk mainloop, so it does not wait for SQLite.
+        :param callback: Called on the Tk mainloop once the cache is up to date, with True if it was reloaded.
+        :return: concurrent.futures.Future of the call.
+        """
+        def _on_fetched(data):
+            if data:
+                self.reference.fill(data)
+            if callback:
+                callback(bool(data))
+        return self.submit('get_reference_data', self.reference.version if self.reference.loaded else None,
+                           callback=_on_fetched)
+
+    def get_reference_names(self, table, prefix=''):
+        """
+        Get sorted names of brands or colors from the reference cache, without a database query.
+        :param table: 'brands' or 'colors'.
+        :param prefix: Case-insensitive prefix the names start with, default all names.
+        :return: List of lowercase names.
+        """
+        return self.reference.get_names(table, prefix)
+
+    def get_models_of_brand(self, brand_name, prefix=''):
+        """
+        Get sorted names of the models of the brand from the reference cache, without a database query.
+        :param brand_name: Case-insensitive name of the brand.
+        :param prefix: Case-insensitive prefix the names start with, default all names.
+        :return: List of lowercase names, empty for an unknown brand.
+        """
+        brand_id = self.reference.get_id('brands', brand_name)
+        if brand_id is None:
+            return []
+        return self.reference.get_brand_model_names(brand_id, prefix)
 
     def map_name_to_id(self, name, section):
-        # Get data from self.processor_static_values
-        # Return id of given name
-        # self._print_static_values()
-        # Static values
-        # brands: {1: 'Volkswagen', 2: 'Renault', 3: 'Peugeot' ...}
+        # Return id of given name from brands, models or colors
         _name = name.lower()
-        self.logger.debug(f"Mapping {_name} to id from {section}...")
-        if section == 'models':
-            for brand in self.static_values[section]:
-                for key, value in self.static_values[section][brand].items():
-                    if value == _name:
-                        return key if key else None
+        self.logger.debug("Mapping %s to id from %s...", _name, section)
         if section:
-            for key, value in self.static_values[section].items():
-                if value == _name:
-                    return key if key else None
+            return self.reference.get_id(section, _name)
 
     def close(self):
+        if self.executor:
+            # Calls already submitted, e.g. a save, are finished before the connection is closed
+            self.executor.shutdown()
         self.database.close()
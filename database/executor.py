@@ -0,0 +1,124 @@
+import queue
+import threading
+from concurrent.futures import Future
+from misc import Entity
+
+
+class DBExecutor(Entity):
+    # Milliseconds between checks of finished calls on the Tk mainloop
+    POLL_INTERVAL = 20
+
+    def __init__(self, factory):
+        """
+        Run database calls on a dedicated worker thread which owns its own connection,
+        sqlite connections cannot be shared between threads.
+        Calls are executed one by one in the order they were submitted, so a read submitted
+        after a write always sees the written rows.
+        E.g. executor = DBExecutor(DBProcessor)
+        :param factory: Callable creating the object the calls are made on, it is called on the worker thread.
+        """
+        super().__init__()
+        self.factory = factory
+        self.calls = queue.Queue()
+        self.done = queue.Queue()
+        self.root = None
+        self.thread = threading.Thread(target=self._run, name=self.__class__.__name__, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        self.logger.debug("* Database worker started...")
+        target, startup_error = None, None
+        try:
+            target = self.factory()
+        except Exception as e:
+            # Calls fail with the startup error instead of waiting forever
+            self.logger.exception(f"Database worker cannot start, error {e}...")
+            startup_error = e
+        try:
+            while True:
+                call = self.calls.get()
+                if call is None:
+                    break
+                future, function, args, kwargs = call
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    if startup_error:
+                        raise startup_error
+                    if isinstance(function, str):
+                        result = getattr(target, function)(*args, **kwargs)
+                    else:
+                        result = function(target, *args, **kwargs)
+                except BaseException as e:
+                    future.set_exception(e)
+                else:
+                    future.set_result(result)
+        finally:
+            if target:
+                target.close()
+            self.logger.debug("* Database worker stopped...")
+
+    def submit(self, function, *args, callback=None, errback=None, **kwargs):
+        """
+        Queue a call for the worker thread.
+        E.g. executor.submit('get_all_items', 'tickets', limit=100, callback=self._on_page)
+        :param function: Name of a method of the worker object, or a callable called as function(worker_object, ...).
+        :param args: Positional arguments of the call.
+        :param callback: Called on the Tk mainloop with the result.
+        :param errback: Called on the Tk mainloop with the exception, by default the exception is logged.
+        :param kwargs: Keyword arguments of the call.
+        :return: concurrent.futures.Future of the call.
+        """
+        future = Future()
+        if callback or errback:
+            future.add_done_callback(lambda _future: self.done.put((_future, callback, errback)))
+        self.calls.put((future, function, args, kwargs))
+        return future
+
+    def attach(self, root):
+        """
+        Deliver callbacks of finished calls on the Tk mainloop of the given root window.
+        :param root: tk.Tk object.
+        :return:
+        """
+        self.root = root
+        self.root.after(self.POLL_INTERVAL, self._poll)
+
+    def _poll(self):
+        # Tk is loaded by then, it is not imported at module level so headless callers do not load it
+        from tkinter import TclError
+        try:
+            while True:
+                future, callback, errback = self.done.get_nowait()
+                self._dispatch(future, callback, errback)
+        except queue.Empty:
+            pass
+        try:
+            self.root.after(self.POLL_INTERVAL, self._poll)
+        except TclError:
+            # Root window destroyed, nothing left to deliver results to
+            self.root = None
+
+    def _dispatch(self, future, callback, errback):
+        try:
+            error = future.exception()
+            if error is None:
+                if callback:
+                    callback(future.result())
+            elif errback:
+                errback(error)
+            else:
+                self.logger.error(f"Database call failed: {error!r}")
+        except Exception as e:
+            # A failing callback must not stop delivering results of the other calls
+            self.logger.exception(f"Database callback failed: {e}")
+
+    def shutdown(self, wait=True):
+        """
+        Stop the worker thread once the already submitted calls are executed.
+        :param wait: Wait for the worker thread to finish.
+        :return:
+        """
+        self.calls.put(None)
+        if wait:
+            self.thread.join()
@@ -0,0 +1,125 @@
+import csv
+import json
+import os
+import sqlite3
+import tempfile
+import time
+from database.importer import IMPORT_COLUMNS, RECORDS_QUERY
+from misc import Entity
+
+
+EXPORT_FORMATS = {
+    '.csv': 'csv',
+    '.jsonl': 'jsonl',
+    '.db': 'sqlite',
+    '.sqlite': 'sqlite',
+    '.sqlite3': 'sqlite',
+}
+
+
+class Exporter(Entity):
+    def __init__(self, database, chunk_size=5000, progress=None):
+        """
+        Streaming export of the database to CSV, JSON Lines (both in the import record format)
+        or a consistent SQLite copy made with the online backup API.
+        Rows are written as they are read from the cursor, so memory use does not grow with the database.
+        E.g. Exporter(Database("database/zortech_database.db")).export_file("backup.csv")
+        :param database: Database object, the exporter should own the connection when run on a worker thread.
+        :param chunk_size: Number of rows fetched at once, also number of pages copied in one backup step.
+        :param progress: Callable progress(done, total) called after every chunk.
+        """
+        super().__init__()
+        self.database = database
+        self.chunk_size = chunk_size
+        self.progress = progress
+
+    def export_file(self, path):
+        """
+        Export the database, format is chosen by file extension (see EXPORT_FORMATS).
+        :param path: Path to the output file.
+        :return: Dictionary with export statistics.
+        """
+        export_format = EXPORT_FORMATS.get(os.path.splitext(path)[1].lower())
+        if not export_format:
+            raise ValueError(f"Unknown export format of '{path}'")
+        self.logger.info(f"* Exporting database to {path} ({export_format})...")
+        start = time.perf_counter()
+        if export_format == 'sqlite':
+            stats = self.backup(path)
+        else:
+            stats = self.export_records(path, export_format)
+        stats['seconds'] = round(time.perf_counter() - start, 3)
+        self.logger.info(f"* Export finished: {stats}")
+        return stats
+
+    def _report(self, done, total):
+        if self.progress:
+            self.progress(done, total)
+
+    def export_records(self, path, export_format):
+        """
+        Stream records to CSV or JSON Lines file.
+        :param path: Path to the output file.
+        :param export_format: 'csv' or 'jsonl'
+        :return: Dictionary with export statistics.
+        """
+        cursor = self.database.connection.cursor()
+        try:
+            # Count and rows come from the same snapshot only within one read transaction
+            cursor.execute("BEGIN")
+            cursor.execute(f"SELECT COUNT(*) FROM ({RECORDS_QUERY})")
+            total = cursor.fetchone()[0]
+            cursor.execute(RECORDS_QUERY)
+            done = 0
+            with open(path, 'w', newline='', encoding='utf-8') as _file:
+                writer = csv.writer(_file) if export_format == 'csv' else None
+                if writer:
+                    writer.writerow(IMPORT_COLUMNS)
+                while True:
+                    rows = cursor.fetchmany(self.chunk_size)
+                    if not rows:
+                        break
+                    if writer:
+                        writer.writerows(rows)
+                    else:
+                        _file.writelines(json.dumps(dict(zip(IMPORT_COLUMNS, row)), ensure_ascii=False) + '\n'
+                                         for row in rows)
+                    done += len(rows)
+                    self._report(done, total)
+        finally:
+            cursor.close()
+            self.database.connection.rollback()
+        return {'records': done}
+
+    def backup(self, path):
+        """
+        Copy the database to a new SQLite file using the online backup API,
+        the copy is consistent even if the database is modified meanwhile.
+        An existing file is replaced only once the copy is complete.
+        :param path: Path to the output file.
+        :return: Dictionary with export statistics.
+        :raises ValueError: If the path is the exported database itself.
+        """
+        if os.path.realpath(path) == os.path.realpath(self.database.db):
+            raise ValueError(f"Cannot back up the database to itself '{path}'")
+        # Written next to the target, so the rename below stays on one file system
+        descriptor, temporary = tempfile.mkstemp(suffix='.tmp', prefix='.backup-',
+                                                 dir=os.path.dirname(os.path.abspath(path)))
+        os.close(descriptor)
+        pages = {}
+
+        def _progress(status, remaining, total):
+            pages['total'] = total
+            self._report(total - remaining, total)
+
+        try:
+            target = sqlite3.connect(temporary)
+            try:
+                self.database.connection.backup(target, pages=self.chunk_size, progress=_progress)
+            finally:
+                target.close()
+            os.replace(temporary, path)
+        except BaseException:
+            os.remove(temporary)
+            raise
+        return {'pages': pages.get('total', 0)}
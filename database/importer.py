@@ -0,0 +1,298 @@
+import csv
+import datetime
+import itertools
+import os
+import sqlite3
+import time
+from database.reference_cache import ReferenceCache
+from database.statements import insert_statement
+from misc import Entity
+
+
+# Columns of an import record, CSV files need a header row with these names
+IMPORT_COLUMNS = (
+    'first_name', 'last_name', 'phone', 'email',
+    'brand_name', 'model_name', 'color_name', 'year', 'vin',
+    'date_creation', 'date_modification', 'notes', 'status',
+)
+
+# Records without a customer are skipped, car and ticket data are optional
+IMPORT_REQUIRED = ('last_name', 'phone')
+
+SQLITE_EXTENSIONS = ('.db', '.sqlite', '.sqlite3')
+
+# Records of a zortech database: tickets, then cars and customers which have no ticket.
+# Used to import from another database and to export CSV/JSON Lines files in the import format.
+RECORDS_QUERY = """
+    SELECT customers.first_name, customers.last_name, customers.phone, customers.email,
+    brands.name, models.name, colors.name, cars.year, cars.vin,
+    tickets.date_creation, tickets.date_modification, tickets.notes, tickets.status
+    FROM tickets
+    LEFT JOIN customers
+    ON tickets.customer_id = customers.id
+    LEFT JOIN cars
+    ON tickets.car_id = cars.id
+    LEFT JOIN brands
+    ON cars.brand_id = brands.id
+    LEFT JOIN models
+    ON cars.model_id = models.id
+    LEFT JOIN colors
+    ON cars.color_id = colors.id
+    UNION ALL
+    SELECT customers.first_name, customers.last_name, customers.phone, customers.email,
+    brands.name, models.name, colors.name, cars.year, cars.vin,
+    NULL, NULL, NULL, NULL
+    FROM cars
+    LEFT JOIN customers
+    ON cars.customer_id = customers.id
+    LEFT JOIN brands
+    ON cars.brand_id = brands.id
+    LEFT JOIN models
+    ON cars.model_id = models.id
+    LEFT JOIN colors
+    ON cars.color_id = colors.id
+    WHERE NOT EXISTS (SELECT 1 FROM tickets WHERE tickets.car_id = cars.id)
+    UNION ALL
+    SELECT customers.first_name, customers.last_name, customers.phone, customers.email,
+    NULL, NULL, NULL, NULL, NULL,
+    NULL, NULL, NULL, NULL
+    FROM customers
+    WHERE NOT EXISTS (SELECT 1 FROM tickets WHERE tickets.customer_id = customers.id)
+    AND NOT EXISTS (SELECT 1 FROM cars WHERE cars.customer_id = customers.id)
+"""
+
+
+class Importer(Entity):
+    def __init__(self, database, chunk_size=5000, progress=None, validator=None):
+        """
+        Streaming importer of customers, cars and tickets from CSV files or another zortech database.
+        Records are read and written in chunks, each chunk in one transaction. Customers are
+        deduplicated on (last_name, phone) and cars on (customer_id, brand_id) in memory,
+        brands, models and colors are resolved through the reference cache.
+        E.g. Importer(Database("database/zortech_database.db")).import_file("tickets.csv")
+        :param database: Database object, the importer should own the connection when run on a worker thread.
+        :param chunk_size: Number of records written in one transaction.
+        :param progress: Callable progress(done, total) called after every chunk.
+        :param validator: Validator checking the records of every chunk before they are written,
+                          invalid records are skipped. None imports the records as they are.
+        """
+        super().__init__()
+        self.database = database
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.validator = validator
+        self.reference = ReferenceCache(database)
+        self.date = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self.customers = {}
+        self.cars = {}
+        # Highest IDs of the customers and cars loaded into the identities
+        self.last_customer_id = 0
+        self.last_car_id = 0
+        self.stats = {}
+
+    def import_file(self, path):
+        """
+        Import records from CSV file or SQLite database depending on file extension.
+        :param path: Path to the file.
+        :return: Dictionary with import statistics.
+        """
+        if os.path.splitext(path)[1].lower() in SQLITE_EXTENSIONS:
+            return self.run(self.read_sqlite(path), self.count_sqlite(path))
+        return self.run(self.read_csv(path), self.count_csv(path))
+
+    @staticmethod
+    def count_csv(path):
+        with open(path, newline='', encoding='utf-8-sig') as _file:
+            return max(sum(1 for _ in csv.reader(_file)) - 1, 0)
+
+    @staticmethod
+    def read_csv(path):
+        """
+        Stream records from CSV file with IMPORT_COLUMNS header, unknown columns are ignored.
+        :param path: Path to the file.
+        :return: Generator of dictionaries.
+        """
+        with open(path, newline='', encoding='utf-8-sig') as _file:
+            for row in csv.DictReader(_file):
+                yield {column: row.get(column) for column in IMPORT_COLUMNS}
+
+    @staticmethod
+    def count_sqlite(path):
+        source = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            return source.execute(f"SELECT COUNT(*) FROM ({RECORDS_QUERY})").fetchone()[0]
+        finally:
+            source.close()
+
+    def read_sqlite(self, path):
+        """
+        Stream records from another zortech database (opened read-only).
+        :param path: Path to the database file.
+        :return: Generator of dictionaries.
+        """
+        source = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            cursor = source.execute(RECORDS_QUERY)
+            while True:
+                rows = cursor.fetchmany(self.chunk_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield dict(zip(IMPORT_COLUMNS, row))
+        finally:
+            source.close()
+
+    def _load_existing(self):
+        """
+        Load identities of existing customers and cars, so duplicates are found without per-row queries.
+        :return:
+        """
+        self.customers = {}
+        self.cars = {}
+        self.last_customer_id = 0
+        self.last_car_id = 0
+        self._load_new()
+
+    def _load_new(self):
+        """
+        Add customers and cars inserted since the last load, e.g. saved by the GUI on its own connection
+        during the import, to the identities.
+        :return:
+        """
+        for c_id, last_name, phone in self.database.fetch_all(
+                "SELECT id, last_name, phone FROM customers WHERE id > ? ORDER BY id", (self.last_customer_id,)):
+            # Keep the first (lowest) ID of duplicated identities, as the lookups in DBProcessor do
+            self.customers.setdefault((last_name, phone), c_id)
+            self.last_customer_id = c_id
+        for c_id, customer_id, brand_id in self.database.fetch_all(
+                "SELECT id, customer_id, brand_id FROM cars WHERE id > ? ORDER BY id", (self.last_car_id,)):
+            self.cars.setdefault((customer_id, brand_id), c_id)
+            self.last_car_id = c_id
+
+    def run(self, records, total=None):
+        """
+        Import records.
+        :param records: Iterable of dictionaries with IMPORT_COLUMNS keys.
+        :param total: Number of records if known, passed to the progress callback.
+        :return: Dictionary with import statistics.
+        """
+        self.logger.info("* Importing records...")
+        start = time.perf_counter()
+        self.stats = {'records': 0, 'customers': 0, 'cars': 0, 'tickets': 0, 'skipped': 0, 'invalid': 0}
+        self._load_existing()
+        records = iter(records)
+        while True:
+            chunk = list(itertools.islice(records, self.chunk_size))
+            if not chunk:
+                break
+            try:
+                with self.database.transaction():
+                    self._import_chunk(chunk)
+            except Exception:
+                # Brands, models and colors added by the failed chunk were rolled back
+                self.reference.invalidate()
+                raise
+            self.stats['records'] += len(chunk)
+            if self.progress:
+                self.progress(self.stats['records'], total)
+        self.stats['seconds'] = round(time.perf_counter() - start, 3)
+        self.logger.info(f"* Import finished: {self.stats}")
+        return self.stats
+
+    def _import_chunk(self, chunk):
+        # IDs are assigned by SQLite, other connections may insert customers and cars during the import
+        self._load_new()
+        customers = 0
+        cars = 0
+        tickets = []
+        chunk = [{key: value.strip() if isinstance(value, str) else value for key, value in record.items()}
+                 for record in chunk]
+        invalid = set()
+        if self.validator:
+            for index, fields in self.validator.validate_many(chunk, IMPORT_REQUIRED):
+                self.logger.debug("\tSkipping record with invalid %s: %s", ', '.join(fields), chunk[index])
+                invalid.add(index)
+            self.stats['invalid'] += len(invalid)
+        for index, record in enumerate(chunk):
+            if index in invalid:
+                continue
+            last_name = (record.get('last_name') or '').lower()
+            phone = str(record.get('phone') or '')
+            if not last_name or not phone:
+                self.stats['skipped'] += 1
+                continue
+            status = record.get('status')
+            try:
+                status = int(status) if status not in (None, '') else 1
+            except ValueError:
+                self.logger.warning("\tSkipping record %s with invalid status '%s'",
+                                    self.stats['records'] + index + 1, status)
+                self.stats['invalid'] += 1
+                continue
+
+            customer_id = self.customers.get((last_name, phone))
+            if customer_id is None:
+                customer_id, _ = self.database.execute(
+                    "INSERT INTO customers (first_name, last_name, email, phone) VALUES (?, ?, ?, ?)",
+                    ((record.get('first_name') or '').lower(), last_name, (record.get('email') or '').lower(), phone)
+                )
+                self.customers[(last_name, phone)] = customer_id
+                customers += 1
+
+            car_id = None
+            if any(record.get(column) for column in ('brand_name', 'model_name', 'vin', 'year')):
+                brand_id = self._resolve('brands', record.get('brand_name'))
+                car_id = self.cars.get((customer_id, brand_id))
+                if car_id is None:
+                    car_id, _ = self.database.execute(
+                        "INSERT INTO cars (customer_id, brand_id, model_id, color_id, year, vin) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (customer_id, brand_id, self._resolve_model(brand_id, record.get('model_name')),
+                         self._resolve('colors', record.get('color_name')),
+                         record.get('year') or None, record.get('vin') or '')
+                    )
+                    self.cars[(customer_id, brand_id)] = car_id
+                    cars += 1
+
+            if any(record.get(column) not in (None, '') for column in ('date_creation', 'notes', 'status')):
+                tickets.append((customer_id, car_id, record.get('date_creation') or self.date,
+                                record.get('date_modification') or None, record.get('notes') or '', status))
+
+        self.database.execute_many(
+            "INSERT INTO tickets (customer_id, car_id, date_creation, date_modification, notes, status) "
+            "VALUES (?, ?, ?, ?, ?, ?)", tickets
+        )
+        self.stats['customers'] += customers
+        self.stats['cars'] += cars
+        self.stats['tickets'] += len(tickets)
+
+    def _resolve(self, table, name):
+        """
+        Get ID of brand or color by name, unknown names are added to the table.
+        :param table: 'brands' or 'colors'
+        :param name: Name from the record.
+        :return: ID or None if name is empty.
+        """
+        if not name:
+            return None
+        item_id = self.reference.get_id(table, name)
+        if item_id is None:
+            item_id, _ = self.database.execute(insert_statement(table, ('name',)), (name.lower(),))
+            self.reference.add(table, item_id, name)
+        return item_id
+
+    def _resolve_model(self, brand_id, name):
+        """
+        Get ID of the brand's model by name, unknown models are added to the table.
+        :param brand_id: ID of the brand.
+        :param name: Model name from the record.
+        :return: ID or None if name is empty.
+        """
+        if not name:
+            return None
+        model_id = self.reference.get_model_id(brand_id, name)
+        if model_id is None:
+            model_id, _ = self.database.execute(insert_statement('models', ('brand_id', 'name')),
+                                                (brand_id, name.lower()))
+            self.reference.add('models', model_id, name, brand_id)
+        return model_id
@@ -0,0 +1,172 @@
+import bisect
+import inspect
+import logging
+import re
+import threading
+import time
+from collections import deque
+from functools import lru_cache, wraps
+from database.statements import STATEMENTS
+from misc import Entity
+
+# Upper bounds of the latency histogram buckets in milliseconds, the last bucket has no bound
+BUCKETS_MS = (0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000)
+# DBProcessor methods which are not timed, they only queue calls or return a context manager
+NOT_INSTRUMENTED = ('attach', 'submit', 'transaction', 'close')
+
+_STATEMENT_NAMES = {sql: name for name, sql in STATEMENTS.items()}
+
+
+@lru_cache(maxsize=1024)
+def query_name(sql):
+    """
+    :param sql: Query text.
+    :return: Name of the statement from database/statements.py or the query with whitespace collapsed,
+             shortened to 120 characters.
+    """
+    name = _STATEMENT_NAMES.get(sql)
+    if name:
+        return name
+    sql = re.sub(r'\s+', ' ', sql).strip()
+    return sql if len(sql) <= 120 else sql[:117] + '...'
+
+
+class QueryStats(Entity):
+    def __init__(self, config=None):
+        """
+        Call counts, latency histograms and rows of the queries run by Database and of the DBProcessor methods.
+        Shared by all connections, the GUI one and the worker thread one.
+        :param config: Dictionary as APP_CONFIG['instrumentation'], default APP_CONFIG['instrumentation'].
+        """
+        super().__init__()
+        config = self.app_config.get('instrumentation', {}) if config is None else config
+        self.enabled = config.get('enabled', True)
+        self.slow_query_ms = config.get('slow_query_ms', 100)
+        self.explain = config.get('explain', True)
+        self.slow_queries = deque(maxlen=config.get('slow_queries_kept', 50))
+        # Slow queries are logged by their own logger, so they can be kept when 'database' logs only warnings
+        self.slow_logger = logging.getLogger('database.slow_queries')
+        # (kind, name) -> [count, total ms, max ms, rows, histogram]
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def record(self, kind, name, seconds, rows=None):
+        """
+        :param kind: 'queries' or 'methods'.
+        :param name: Query or method name.
+        :param seconds: Duration of the call.
+        :param rows: Number of rows returned or modified, None if unknown.
+        :return: True if the call was slower than the slow query threshold.
+        """
+        ms = seconds * 1000
+        with self._lock:
+            entry = self._stats.get((kind, name))
+            if entry is None:
+                entry = self._stats[(kind, name)] = [0, 0.0, 0.0, 0, [0] * (len(BUCKETS_MS) + 1)]
+            entry[0] += 1
+            entry[1] += ms
+            entry[2] = max(entry[2], ms)
+            if rows:
+                entry[3] += rows
+            entry[4][bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        return ms >= self.slow_query_ms
+
+    def slow_query(self, sql, params, seconds, plan=None):
+        """
+        Add the query to the slow query log.
+        :param sql: Query text.
+        :param params: Query parameters, only their number is kept.
+        :param seconds: Duration of the query.
+        :param plan: Rows of EXPLAIN QUERY PLAN of the query.
+        :return:
+        """
+        ms = round(seconds * 1000, 3)
+        # Parameters are customer data, they are neither logged nor kept
+        self.slow_queries.append({'query': query_name(sql), 'sql': sql, 'ms': ms,
+                                  'params': len(params) if params else 0, 'plan': plan})
+        self.slow_logger.warning("Slow query (%s ms): %s\n\tQuery plan: %s", ms, sql,
+                                 '\n\t'.join(plan) if plan else 'not available')
+
+    @staticmethod
+    def _percentile(histogram, count, fraction, maximum):
+        # Interpolated within the bucket the percentile falls into, never above the slowest call
+        rank = count * fraction
+        seen = 0
+        lower = 0
+        for bound, hits in zip(BUCKETS_MS + (None,), histogram):
+            upper = min(bound, maximum) if bound is not None else maximum
+            if hits and seen + hits >= rank:
+                return round(min(lower + (upper - lower) * (rank - seen) / hits, maximum), 3)
+            seen += hits
+            lower = bound
+        return round(maximum, 3)
+
+    def snapshot(self):
+        """
+        :return: Dictionary with 'queries' and 'methods' lists sorted by total time and 'slow_queries',
+                 e.g. {'queries': [{'name': 'brands', 'count': 3, 'mean_ms': 0.1, ...}], ...}
+        """
+        with self._lock:
+            stats = {key: (count, total, _max, rows, list(histogram))
+                     for key, (count, total, _max, rows, histogram) in self._stats.items()}
+        report = {'queries': [], 'methods': [], 'slow_queries': list(self.slow_queries)}
+        for (kind, name), (count, total, _max, rows, histogram) in stats.items():
+            report[kind].append({
+                'name': name,
+                'count': count,
+                'total_ms': round(total, 3),
+                'mean_ms': round(total / count, 3),
+                'p95_ms': self._percentile(histogram, count, 0.95, _max),
+                'max_ms': round(_max, 3),
+                'rows': rows,
+                'histogram': {f"<={bound}" if bound is not None else f">{BUCKETS_MS[-1]}": hits
+                              for bound, hits in zip(BUCKETS_MS + (None,), histogram) if hits},
+            })
+        for kind in ('queries', 'methods'):
+            report[kind].sort(key=lambda item: item['total_ms'], reverse=True)
+        return report
+
+    def reset(self):
+        """
+        Forget all recorded calls and slow queries.
+        :return:
+        """
+        with self._lock:
+            self._stats.clear()
+            self.slow_queries.clear()
+
+
+STATS = QueryStats()
+
+
+def instrumented(cls):
+    """
+    Class decorator timing every public method of the class, recorded in STATS as 'methods' named
+    '<class>.<method>'. The *_async variants only queue calls and are not timed, the call they queue is.
+    E.g. @instrumented class DBProcessor(Entity): ...
+    :param cls: Class to instrument.
+    :return: The class.
+    """
+    for name, function in list(vars(cls).items()):
+        if name.startswith('_') or name.endswith('_async') or name in NOT_INSTRUMENTED \
+                or not inspect.isfunction(function):
+            continue
+        setattr(cls, name, _timed(function, f"{cls.__name__}.{name}"))
+    return cls
+
+
+def _timed(function, name):
+    @wraps(function)
+    def method(*args, **kwargs):
+        if not STATS.enabled:
+            return function(*args, **kwargs)
+        start = time.perf_counter()
+        result = None
+        try:
+            result = function(*args, **kwargs)
+            return result
+        finally:
+            # Calls which raise are timed as well, e.g. a failed save
+            STATS.record('methods', name, time.perf_counter() - start,
+                         len(result) if isinstance(result, list) else None)
+    return method
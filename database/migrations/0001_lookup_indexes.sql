@@ -0,0 +1,20 @@
+-- Indexes for the hot lookups and joins
+
+-- check_if_customer_exists, also used for sorting by last name
+DROP INDEX IF EXISTS idx_customers_last_name;
+CREATE INDEX IF NOT EXISTS idx_customers_last_name_phone ON customers (last_name, phone);
+
+-- check_if_car_exists and cars of a customer
+CREATE INDEX IF NOT EXISTS idx_cars_customer_id_brand_id ON cars (customer_id, brand_id);
+
+-- get_item_from_name
+CREATE INDEX IF NOT EXISTS idx_brands_name ON brands (name);
+CREATE INDEX IF NOT EXISTS idx_models_name ON models (name);
+CREATE INDEX IF NOT EXISTS idx_colors_name ON colors (name);
+
+-- fetch_models_from_brand
+CREATE INDEX IF NOT EXISTS idx_models_brand_id ON models (brand_id);
+
+-- Joins of the tickets listing
+CREATE INDEX IF NOT EXISTS idx_tickets_customer_id ON tickets (customer_id);
+CREATE INDEX IF NOT EXISTS idx_tickets_car_id ON tickets (car_id);
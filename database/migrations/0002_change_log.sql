@@ -0,0 +1,63 @@
+-- Row-level change log filled by triggers, used to refresh views incrementally
+CREATE TABLE IF NOT EXISTS change_log
+(
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    table_name TEXT NOT NULL,
+    row_id INTEGER NOT NULL,
+    operation TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_change_log_table_name ON change_log (table_name, id);
+
+CREATE TRIGGER IF NOT EXISTS tickets_log_insert AFTER INSERT ON tickets
+BEGIN
+    INSERT INTO change_log (table_name, row_id, operation) VALUES ('tickets', NEW.id, 'insert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS tickets_log_update AFTER UPDATE ON tickets
+BEGIN
+    INSERT INTO change_log (table_name, row_id, operation) VALUES ('tickets', NEW.id, 'update');
+END;
+
+CREATE TRIGGER IF NOT EXISTS tickets_log_delete AFTER DELETE ON tickets
+BEGIN
+    INSERT INTO change_log (table_name, row_id, operation) VALUES ('tickets', OLD.id, 'delete');
+END;
+
+CREATE TRIGGER IF NOT EXISTS customers_log_insert AFTER INSERT ON customers
+BEGIN
+    INSERT INTO change_log (table_name, row_id, operation) VALUES ('customers', NEW.id, 'insert');
+END;
+
+-- Customer data is also displayed in the tickets and cars listings
+CREATE TRIGGER IF NOT EXISTS customers_log_update AFTER UPDATE ON customers
+BEGIN
+    INSERT INTO change_log (table_name, row_id, operation) VALUES ('customers', NEW.id, 'update');
+    INSERT INTO change_log (table_name, row_id, operation)
+    SELECT 'tickets', tickets.id, 'update' FROM tickets WHERE tickets.customer_id = NEW.id;
+    INSERT INTO change_log (table_name, row_id, operation)
+    SELECT 'cars', cars.id, 'update' FROM cars WHERE cars.customer_id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS customers_log_delete AFTER DELETE ON customers
+BEGIN
+    INSERT INTO change_log (table_name, row_id, operation) VALUES ('customers', OLD.id, 'delete');
+END;
+
+CREATE TRIGGER IF NOT EXISTS cars_log_insert AFTER INSERT ON cars
+BEGIN
+    INSERT INTO change_log (table_name, row_id, operation) VALUES ('cars', NEW.id, 'insert');
+END;
+
+-- Car data is also displayed in the tickets listing
+CREATE TRIGGER IF NOT EXISTS cars_log_update AFTER UPDATE ON cars
+BEGIN
+    INSERT INTO change_log (table_name, row_id, operation) VALUES ('cars', NEW.id, 'update');
+    INSERT INTO change_log (table_name, row_id, operation)
+    SELECT 'tickets', tickets.id, 'update' FROM tickets WHERE tickets.car_id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS cars_log_delete AFTER DELETE ON cars
+BEGIN
+    INSERT INTO change_log (table_name, row_id, operation) VALUES ('cars', OLD.id, 'delete');
+END;
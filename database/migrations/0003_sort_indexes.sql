@@ -0,0 +1,3 @@
+-- Indexes for sorting the treeview listings in the database
+CREATE INDEX IF NOT EXISTS idx_tickets_date_creation ON tickets (date_creation);
+CREATE INDEX IF NOT EXISTS idx_customers_phone ON customers (phone);
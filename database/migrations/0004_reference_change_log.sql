@@ -0,0 +1,46 @@
+-- Log changes of the reference tables, so cached brands, models and colors can be reloaded
+
+CREATE TRIGGER IF NOT EXISTS brands_log_insert AFTER INSERT ON brands
+BEGIN
+    INSERT INTO change_log (table_name, row_id, operation) VALUES ('brands', NEW.id, 'insert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS brands_log_update AFTER UPDATE ON brands
+BEGIN
+    INSERT INTO change_log (table_name, row_id, operation) VALUES ('brands', NEW.id, 'update');
+END;
+
+CREATE TRIGGER IF NOT EXISTS brands_log_delete AFTER DELETE ON brands
+BEGIN
+    INSERT INTO change_log (table_name, row_id, operation) VALUES ('brands', OLD.id, 'delete');
+END;
+
+CREATE TRIGGER IF NOT EXISTS models_log_insert AFTER INSERT ON models
+BEGIN
+    INSERT INTO change_log (table_name, row_id, operation) VALUES ('models', NEW.id, 'insert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS models_log_update AFTER UPDATE ON models
+BEGIN
+    INSERT INTO change_log (table_name, row_id, operation) VALUES ('models', NEW.id, 'update');
+END;
+
+CREATE TRIGGER IF NOT EXISTS models_log_delete AFTER DELETE ON models
+BEGIN
+    INSERT INTO change_log (table_name, row_id, operation) VALUES ('models', OLD.id, 'delete');
+END;
+
+CREATE TRIGGER IF NOT EXISTS colors_log_insert AFTER INSERT ON colors
+BEGIN
+    INSERT INTO change_log (table_name, row_id, operation) VALUES ('colors', NEW.id, 'insert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS colors_log_update AFTER UPDATE ON colors
+BEGIN
+    INSERT INTO change_log (table_name, row_id, operation) VALUES ('colors', NEW.id, 'update');
+END;
+
+CREATE TRIGGER IF NOT EXISTS colors_log_delete AFTER DELETE ON colors
+BEGIN
+    INSERT INTO change_log (table_name, row_id, operation) VALUES ('colors', OLD.id, 'delete');
+END;
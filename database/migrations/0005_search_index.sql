@@ -0,0 +1,168 @@
+-- Full-text search over customers, cars and tickets kept in sync by triggers.
+-- Document rowid is item_id * 4 + kind (1 customer, 2 car, 3 ticket), so a document
+-- is replaced or removed by its rowid without scanning the index.
+
+CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5
+(
+    customer,
+    phone,
+    email,
+    vin,
+    car,
+    notes,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+);
+
+CREATE VIEW IF NOT EXISTS search_customer_documents AS
+SELECT customers.id AS item_id,
+       customers.id * 4 + 1 AS doc_id,
+       TRIM(COALESCE(customers.first_name, '') || ' ' || customers.last_name) AS customer,
+       customers.phone AS phone,
+       customers.email AS email,
+       NULL AS vin,
+       NULL AS car,
+       NULL AS notes
+FROM customers;
+
+CREATE VIEW IF NOT EXISTS search_car_documents AS
+SELECT cars.id AS item_id,
+       cars.id * 4 + 2 AS doc_id,
+       TRIM(COALESCE(customers.first_name, '') || ' ' || COALESCE(customers.last_name, '')) AS customer,
+       customers.phone AS phone,
+       customers.email AS email,
+       cars.vin AS vin,
+       TRIM(COALESCE(brands.name, '') || ' ' || COALESCE(models.name, '')) AS car,
+       NULL AS notes
+FROM cars
+LEFT JOIN customers
+ON cars.customer_id = customers.id
+LEFT JOIN brands
+ON cars.brand_id = brands.id
+LEFT JOIN models
+ON cars.model_id = models.id;
+
+CREATE VIEW IF NOT EXISTS search_ticket_documents AS
+SELECT tickets.id AS item_id,
+       tickets.id * 4 + 3 AS doc_id,
+       TRIM(COALESCE(customers.first_name, '') || ' ' || COALESCE(customers.last_name, '')) AS customer,
+       customers.phone AS phone,
+       customers.email AS email,
+       cars.vin AS vin,
+       TRIM(COALESCE(brands.name, '') || ' ' || COALESCE(models.name, '')) AS car,
+       tickets.notes AS notes
+FROM tickets
+LEFT JOIN customers
+ON tickets.customer_id = customers.id
+LEFT JOIN cars
+ON tickets.car_id = cars.id
+LEFT JOIN brands
+ON cars.brand_id = brands.id
+LEFT JOIN models
+ON cars.model_id = models.id;
+
+-- Customers
+CREATE TRIGGER IF NOT EXISTS customers_search_insert AFTER INSERT ON customers
+BEGIN
+    INSERT INTO search_index (rowid, customer, phone, email, vin, car, notes)
+    SELECT doc_id, customer, phone, email, vin, car, notes FROM search_customer_documents WHERE item_id = NEW.id;
+END;
+
+-- Customer data is also part of the documents of the customer cars and tickets
+CREATE TRIGGER IF NOT EXISTS customers_search_update AFTER UPDATE ON customers
+BEGIN
+    DELETE FROM search_index WHERE rowid = OLD.id * 4 + 1;
+    INSERT INTO search_index (rowid, customer, phone, email, vin, car, notes)
+    SELECT doc_id, customer, phone, email, vin, car, notes FROM search_customer_documents WHERE item_id = NEW.id;
+    DELETE FROM search_index WHERE rowid IN (SELECT id * 4 + 2 FROM cars WHERE customer_id = NEW.id);
+    INSERT INTO search_index (rowid, customer, phone, email, vin, car, notes)
+    SELECT doc_id, customer, phone, email, vin, car, notes FROM search_car_documents
+    WHERE item_id IN (SELECT id FROM cars WHERE customer_id = NEW.id);
+    DELETE FROM search_index WHERE rowid IN (SELECT id * 4 + 3 FROM tickets WHERE customer_id = NEW.id);
+    INSERT INTO search_index (rowid, customer, phone, email, vin, car, notes)
+    SELECT doc_id, customer, phone, email, vin, car, notes FROM search_ticket_documents
+    WHERE item_id IN (SELECT id FROM tickets WHERE customer_id = NEW.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS customers_search_delete AFTER DELETE ON customers
+BEGIN
+    DELETE FROM search_index WHERE rowid = OLD.id * 4 + 1;
+END;
+
+-- Cars
+CREATE TRIGGER IF NOT EXISTS cars_search_insert AFTER INSERT ON cars
+BEGIN
+    INSERT INTO search_index (rowid, customer, phone, email, vin, car, notes)
+    SELECT doc_id, customer, phone, email, vin, car, notes FROM search_car_documents WHERE item_id = NEW.id;
+END;
+
+-- Car data is also part of the documents of the car tickets
+CREATE TRIGGER IF NOT EXISTS cars_search_update AFTER UPDATE ON cars
+BEGIN
+    DELETE FROM search_index WHERE rowid = OLD.id * 4 + 2;
+    INSERT INTO search_index (rowid, customer, phone, email, vin, car, notes)
+    SELECT doc_id, customer, phone, email, vin, car, notes FROM search_car_documents WHERE item_id = NEW.id;
+    DELETE FROM search_index WHERE rowid IN (SELECT id * 4 + 3 FROM tickets WHERE car_id = NEW.id);
+    INSERT INTO search_index (rowid, customer, phone, email, vin, car, notes)
+    SELECT doc_id, customer, phone, email, vin, car, notes FROM search_ticket_documents
+    WHERE item_id IN (SELECT id FROM tickets WHERE car_id = NEW.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS cars_search_delete AFTER DELETE ON cars
+BEGIN
+    DELETE FROM search_index WHERE rowid = OLD.id * 4 + 2;
+END;
+
+-- Tickets
+CREATE TRIGGER IF NOT EXISTS tickets_search_insert AFTER INSERT ON tickets
+BEGIN
+    INSERT INTO search_index (rowid, customer, phone, email, vin, car, notes)
+    SELECT doc_id, customer, phone, email, vin, car, notes FROM search_ticket_documents WHERE item_id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS tickets_search_update AFTER UPDATE OF customer_id, car_id, notes ON tickets
+BEGIN
+    DELETE FROM search_index WHERE rowid = OLD.id * 4 + 3;
+    INSERT INTO search_index (rowid, customer, phone, email, vin, car, notes)
+    SELECT doc_id, customer, phone, email, vin, car, notes FROM search_ticket_documents WHERE item_id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS tickets_search_delete AFTER DELETE ON tickets
+BEGIN
+    DELETE FROM search_index WHERE rowid = OLD.id * 4 + 3;
+END;
+
+-- Renamed brands and models change the documents of the cars and tickets using them
+CREATE TRIGGER IF NOT EXISTS brands_search_update AFTER UPDATE OF name ON brands
+BEGIN
+    DELETE FROM search_index WHERE rowid IN (SELECT id * 4 + 2 FROM cars WHERE brand_id = NEW.id);
+    INSERT INTO search_index (rowid, customer, phone, email, vin, car, notes)
+    SELECT doc_id, customer, phone, email, vin, car, notes FROM search_car_documents
+    WHERE item_id IN (SELECT id FROM cars WHERE brand_id = NEW.id);
+    DELETE FROM search_index WHERE rowid IN
+        (SELECT tickets.id * 4 + 3 FROM tickets JOIN cars ON tickets.car_id = cars.id WHERE cars.brand_id = NEW.id);
+    INSERT INTO search_index (rowid, customer, phone, email, vin, car, notes)
+    SELECT doc_id, customer, phone, email, vin, car, notes FROM search_ticket_documents
+    WHERE item_id IN (SELECT tickets.id FROM tickets JOIN cars ON tickets.car_id = cars.id WHERE cars.brand_id = NEW.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS models_search_update AFTER UPDATE OF name ON models
+BEGIN
+    DELETE FROM search_index WHERE rowid IN (SELECT id * 4 + 2 FROM cars WHERE model_id = NEW.id);
+    INSERT INTO search_index (rowid, customer, phone, email, vin, car, notes)
+    SELECT doc_id, customer, phone, email, vin, car, notes FROM search_car_documents
+    WHERE item_id IN (SELECT id FROM cars WHERE model_id = NEW.id);
+    DELETE FROM search_index WHERE rowid IN
+        (SELECT tickets.id * 4 + 3 FROM tickets JOIN cars ON tickets.car_id = cars.id WHERE cars.model_id = NEW.id);
+    INSERT INTO search_index (rowid, customer, phone, email, vin, car, notes)
+    SELECT doc_id, customer, phone, email, vin, car, notes FROM search_ticket_documents
+    WHERE item_id IN (SELECT tickets.id FROM tickets JOIN cars ON tickets.car_id = cars.id WHERE cars.model_id = NEW.id);
+END;
+
+-- Index the already existing data
+INSERT INTO search_index (rowid, customer, phone, email, vin, car, notes)
+SELECT doc_id, customer, phone, email, vin, car, notes FROM search_customer_documents;
+INSERT INTO search_index (rowid, customer, phone, email, vin, car, notes)
+SELECT doc_id, customer, phone, email, vin, car, notes FROM search_car_documents;
+INSERT INTO search_index (rowid, customer, phone, email, vin, car, notes)
+SELECT doc_id, customer, phone, email, vin, car, notes FROM search_ticket_documents;
@@ -0,0 +1,100 @@
+-- Ready to display tickets listing kept up to date by triggers, so listing and paging the
+-- tickets treeview reads a single table instead of joining customers, cars, brands and models.
+
+CREATE VIEW IF NOT EXISTS ticket_listing_source AS
+SELECT tickets.id AS id,
+       tickets.date_creation AS date_creation,
+       CASE WHEN customers.first_name IS NOT NULL AND TRIM(customers.first_name) <> '' THEN customers.first_name
+       || ' - ' || customers.last_name ELSE customers.last_name END || ' - ' || customers.phone AS customer,
+       brands.name || CASE WHEN models.name IS NOT NULL THEN ' - ' || models.name ELSE '' END AS car,
+       tickets.notes AS notes,
+       tickets.status AS status,
+       COALESCE(customers.last_name, '') AS customer_last_name,
+       COALESCE(customers.first_name, '') AS customer_first_name,
+       COALESCE(customers.phone, '') AS customer_phone,
+       COALESCE(brands.name, '') AS brand_name
+FROM tickets
+LEFT JOIN customers
+ON tickets.customer_id = customers.id
+LEFT JOIN cars
+ON tickets.car_id = cars.id
+LEFT JOIN brands
+ON cars.brand_id = brands.id
+LEFT JOIN models
+ON cars.model_id = models.id;
+
+CREATE TABLE IF NOT EXISTS ticket_listing
+(
+    id INTEGER PRIMARY KEY,
+    date_creation TIMESTAMP,
+    customer TEXT,
+    car TEXT,
+    notes TEXT,
+    status INTEGER,
+    -- Sort and filter keys
+    customer_last_name TEXT NOT NULL,
+    customer_first_name TEXT NOT NULL,
+    customer_phone TEXT NOT NULL,
+    brand_name TEXT NOT NULL
+);
+
+-- Sorting by a column walks its index, ties are ordered by the rowid stored in every index entry
+CREATE INDEX IF NOT EXISTS idx_ticket_listing_date_creation ON ticket_listing (date_creation);
+CREATE INDEX IF NOT EXISTS idx_ticket_listing_customer_last_name ON ticket_listing (customer_last_name);
+CREATE INDEX IF NOT EXISTS idx_ticket_listing_brand_name ON ticket_listing (brand_name);
+
+CREATE TRIGGER IF NOT EXISTS tickets_listing_insert AFTER INSERT ON tickets
+BEGIN
+    INSERT OR REPLACE INTO ticket_listing SELECT * FROM ticket_listing_source WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS tickets_listing_update AFTER UPDATE ON tickets
+BEGIN
+    DELETE FROM ticket_listing WHERE id = OLD.id AND OLD.id <> NEW.id;
+    INSERT OR REPLACE INTO ticket_listing SELECT * FROM ticket_listing_source WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS tickets_listing_delete AFTER DELETE ON tickets
+BEGIN
+    DELETE FROM ticket_listing WHERE id = OLD.id;
+END;
+
+-- Customer, car, brand and model data is copied into the listing of the tickets using them
+CREATE TRIGGER IF NOT EXISTS customers_listing_update AFTER UPDATE OF id, first_name, last_name, phone ON customers
+BEGIN
+    INSERT OR REPLACE INTO ticket_listing SELECT * FROM ticket_listing_source
+    WHERE id IN (SELECT id FROM tickets WHERE customer_id IN (OLD.id, NEW.id));
+END;
+
+CREATE TRIGGER IF NOT EXISTS customers_listing_delete AFTER DELETE ON customers
+BEGIN
+    INSERT OR REPLACE INTO ticket_listing SELECT * FROM ticket_listing_source
+    WHERE id IN (SELECT id FROM tickets WHERE customer_id = OLD.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS cars_listing_update AFTER UPDATE OF id, brand_id, model_id ON cars
+BEGIN
+    INSERT OR REPLACE INTO ticket_listing SELECT * FROM ticket_listing_source
+    WHERE id IN (SELECT id FROM tickets WHERE car_id IN (OLD.id, NEW.id));
+END;
+
+CREATE TRIGGER IF NOT EXISTS cars_listing_delete AFTER DELETE ON cars
+BEGIN
+    INSERT OR REPLACE INTO ticket_listing SELECT * FROM ticket_listing_source
+    WHERE id IN (SELECT id FROM tickets WHERE car_id = OLD.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS brands_listing_update AFTER UPDATE OF name ON brands
+BEGIN
+    INSERT OR REPLACE INTO ticket_listing SELECT * FROM ticket_listing_source
+    WHERE id IN (SELECT tickets.id FROM tickets JOIN cars ON tickets.car_id = cars.id WHERE cars.brand_id = NEW.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS models_listing_update AFTER UPDATE OF name ON models
+BEGIN
+    INSERT OR REPLACE INTO ticket_listing SELECT * FROM ticket_listing_source
+    WHERE id IN (SELECT tickets.id FROM tickets JOIN cars ON tickets.car_id = cars.id WHERE cars.model_id = NEW.id);
+END;
+
+-- Fill the listing with the already existing tickets
+INSERT OR REPLACE INTO ticket_listing SELECT * FROM ticket_listing_source;
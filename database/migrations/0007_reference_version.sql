@@ -0,0 +1,55 @@
+-- Version of the reference tables (brands, models, colors) bumped by every change of them.
+-- It is kept apart from change_log, which is pruned, so ReferenceCache.refresh() cannot miss a change.
+
+CREATE TABLE IF NOT EXISTS reference_version
+(
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL
+);
+
+INSERT OR IGNORE INTO reference_version (id, version) VALUES (1, 0);
+
+CREATE TRIGGER IF NOT EXISTS brands_version_insert AFTER INSERT ON brands
+BEGIN
+    UPDATE reference_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS brands_version_update AFTER UPDATE ON brands
+BEGIN
+    UPDATE reference_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS brands_version_delete AFTER DELETE ON brands
+BEGIN
+    UPDATE reference_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS models_version_insert AFTER INSERT ON models
+BEGIN
+    UPDATE reference_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS models_version_update AFTER UPDATE ON models
+BEGIN
+    UPDATE reference_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS models_version_delete AFTER DELETE ON models
+BEGIN
+    UPDATE reference_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS colors_version_insert AFTER INSERT ON colors
+BEGIN
+    UPDATE reference_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS colors_version_update AFTER UPDATE ON colors
+BEGIN
+    UPDATE reference_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS colors_version_delete AFTER DELETE ON colors
+BEGIN
+    UPDATE reference_version SET version = version + 1 WHERE id = 1;
+END;
@@ -0,0 +1,10 @@
+-- Databases written before get_item_from_name returned None store unknown brands, models and colors
+-- as '', which is not a valid foreign key, writing such a row back fails with foreign_keys = ON.
+-- Missing references are stored as NULL.
+
+UPDATE cars SET customer_id = NULL WHERE customer_id = '';
+UPDATE cars SET brand_id = NULL WHERE brand_id = '';
+UPDATE cars SET model_id = NULL WHERE model_id = '';
+UPDATE cars SET color_id = NULL WHERE color_id = '';
+UPDATE tickets SET customer_id = NULL WHERE customer_id = '';
+UPDATE tickets SET car_id = NULL WHERE car_id = '';
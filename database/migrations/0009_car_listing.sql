@@ -0,0 +1,108 @@
+-- Ready to display cars listing kept up to date by triggers, as ticket_listing for the tickets.
+-- The cars treeview sorts by brand, model, color and customer names, which are not cars columns,
+-- the listing stores them as NOT NULL sort keys with an index each, so a page walks an index
+-- instead of sorting all joined cars.
+
+CREATE VIEW IF NOT EXISTS car_listing_source AS
+SELECT cars.id AS id,
+       brands.name AS brand,
+       models.name AS model,
+       colors.name AS color,
+       cars.year AS year,
+       cars.vin AS vin,
+       customers.first_name || ' ' || customers.last_name || ' ' || customers.phone AS customer,
+       COALESCE(brands.name, '') AS brand_name,
+       COALESCE(models.name, '') AS model_name,
+       COALESCE(colors.name, '') AS color_name,
+       COALESCE(cars.year, 0) AS year_key,
+       COALESCE(cars.vin, '') AS vin_key,
+       COALESCE(customers.last_name, '') AS customer_last_name
+FROM cars
+LEFT JOIN brands
+ON cars.brand_id = brands.id
+LEFT JOIN models
+ON cars.model_id = models.id
+LEFT JOIN colors
+ON cars.color_id = colors.id
+LEFT JOIN customers
+ON cars.customer_id = customers.id;
+
+CREATE TABLE IF NOT EXISTS car_listing
+(
+    id INTEGER PRIMARY KEY,
+    brand TEXT,
+    model TEXT,
+    color TEXT,
+    year INTEGER,
+    vin TEXT,
+    customer TEXT,
+    -- Sort keys
+    brand_name TEXT NOT NULL DEFAULT '',
+    model_name TEXT NOT NULL DEFAULT '',
+    color_name TEXT NOT NULL DEFAULT '',
+    year_key INTEGER NOT NULL DEFAULT 0,
+    vin_key TEXT NOT NULL DEFAULT '',
+    customer_last_name TEXT NOT NULL DEFAULT ''
+);
+
+-- Sorting by a column walks its index, ties are ordered by the rowid stored in every index entry
+CREATE INDEX IF NOT EXISTS idx_car_listing_brand_name ON car_listing (brand_name);
+CREATE INDEX IF NOT EXISTS idx_car_listing_model_name ON car_listing (model_name);
+CREATE INDEX IF NOT EXISTS idx_car_listing_color_name ON car_listing (color_name);
+CREATE INDEX IF NOT EXISTS idx_car_listing_year_key ON car_listing (year_key);
+CREATE INDEX IF NOT EXISTS idx_car_listing_vin_key ON car_listing (vin_key);
+CREATE INDEX IF NOT EXISTS idx_car_listing_customer_last_name ON car_listing (customer_last_name);
+
+CREATE TRIGGER IF NOT EXISTS cars_car_listing_insert AFTER INSERT ON cars
+BEGIN
+    INSERT OR REPLACE INTO car_listing SELECT * FROM car_listing_source WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS cars_car_listing_update AFTER UPDATE ON cars
+BEGIN
+    DELETE FROM car_listing WHERE id = OLD.id AND OLD.id <> NEW.id;
+    INSERT OR REPLACE INTO car_listing SELECT * FROM car_listing_source WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS cars_car_listing_delete AFTER DELETE ON cars
+BEGIN
+    DELETE FROM car_listing WHERE id = OLD.id;
+END;
+
+-- Customer, brand, model and color names are copied into the listing of the cars using them
+CREATE TRIGGER IF NOT EXISTS customers_car_listing_update AFTER UPDATE OF id, first_name, last_name, phone ON customers
+BEGIN
+    INSERT OR REPLACE INTO car_listing SELECT * FROM car_listing_source
+    WHERE id IN (SELECT id FROM cars WHERE customer_id IN (OLD.id, NEW.id));
+END;
+
+CREATE TRIGGER IF NOT EXISTS customers_car_listing_delete AFTER DELETE ON customers
+BEGIN
+    INSERT OR REPLACE INTO car_listing SELECT * FROM car_listing_source
+    WHERE id IN (SELECT id FROM cars WHERE customer_id = OLD.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS brands_car_listing_update AFTER UPDATE OF name ON brands
+BEGIN
+    INSERT OR REPLACE INTO car_listing SELECT * FROM car_listing_source
+    WHERE id IN (SELECT id FROM cars WHERE brand_id = NEW.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS models_car_listing_update AFTER UPDATE OF name ON models
+BEGIN
+    INSERT OR REPLACE INTO car_listing SELECT * FROM car_listing_source
+    WHERE id IN (SELECT id FROM cars WHERE model_id = NEW.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS colors_car_listing_update AFTER UPDATE OF name ON colors
+BEGIN
+    INSERT OR REPLACE INTO car_listing SELECT * FROM car_listing_source
+    WHERE id IN (SELECT id FROM cars WHERE color_id = NEW.id);
+END;
+
+-- The customers treeview sorts by these expressions, see SORT_COLUMNS, indexes have to match them exactly
+CREATE INDEX IF NOT EXISTS idx_customers_first_name_key ON customers (COALESCE(first_name, ''));
+CREATE INDEX IF NOT EXISTS idx_customers_email_key ON customers (COALESCE(email, ''));
+
+-- Fill the listing with the already existing cars
+INSERT OR REPLACE INTO car_listing SELECT * FROM car_listing_source;
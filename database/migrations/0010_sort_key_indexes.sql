@@ -0,0 +1,8 @@
+-- Sort orders of SORT_COLUMNS which were still sorted in a temporary B-tree
+
+-- Sorting the tickets listing by notes, the expression has to match SORT_COLUMNS exactly
+CREATE INDEX IF NOT EXISTS idx_ticket_listing_notes_key ON ticket_listing (COALESCE(notes, ''), id);
+
+-- Sorting customers by last name, the (last_name, phone) index of 0001 orders the ties by phone instead of ID.
+-- That index still serves check_if_customer_exists.
+CREATE INDEX IF NOT EXISTS idx_customers_last_name_id ON customers (last_name, id);
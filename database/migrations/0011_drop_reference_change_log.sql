@@ -0,0 +1,14 @@
+-- Changes of brands, models and colors are tracked by reference_version since 0007,
+-- their change_log rows of 0004 are not read by anything
+
+DROP TRIGGER IF EXISTS brands_log_insert;
+DROP TRIGGER IF EXISTS brands_log_update;
+DROP TRIGGER IF EXISTS brands_log_delete;
+DROP TRIGGER IF EXISTS models_log_insert;
+DROP TRIGGER IF EXISTS models_log_update;
+DROP TRIGGER IF EXISTS models_log_delete;
+DROP TRIGGER IF EXISTS colors_log_insert;
+DROP TRIGGER IF EXISTS colors_log_update;
+DROP TRIGGER IF EXISTS colors_log_delete;
+
+DELETE FROM change_log WHERE table_name IN ('brands', 'models', 'colors');
@@ -0,0 +1,26 @@
+-- Brand and model names are displayed in the tickets and cars listings, color names in the cars listing.
+-- A rename changes those listing rows, they are logged so the treeviews sync them incrementally.
+
+CREATE TRIGGER IF NOT EXISTS brands_listing_log_update AFTER UPDATE OF name ON brands
+BEGIN
+    INSERT INTO change_log (table_name, row_id, operation)
+    SELECT 'cars', cars.id, 'update' FROM cars WHERE cars.brand_id = NEW.id;
+    INSERT INTO change_log (table_name, row_id, operation)
+    SELECT 'tickets', tickets.id, 'update' FROM tickets
+    WHERE tickets.car_id IN (SELECT cars.id FROM cars WHERE cars.brand_id = NEW.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS models_listing_log_update AFTER UPDATE OF name ON models
+BEGIN
+    INSERT INTO change_log (table_name, row_id, operation)
+    SELECT 'cars', cars.id, 'update' FROM cars WHERE cars.model_id = NEW.id;
+    INSERT INTO change_log (table_name, row_id, operation)
+    SELECT 'tickets', tickets.id, 'update' FROM tickets
+    WHERE tickets.car_id IN (SELECT cars.id FROM cars WHERE cars.model_id = NEW.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS colors_listing_log_update AFTER UPDATE OF name ON colors
+BEGIN
+    INSERT INTO change_log (table_name, row_id, operation)
+    SELECT 'cars', cars.id, 'update' FROM cars WHERE cars.color_id = NEW.id;
+END;
@@ -0,0 +1,94 @@
+import json
+import re
+
+# Only plain or table qualified column names can be used in predicates, values are always bound
+COLUMN_PATTERN = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)?$')
+
+OPERATORS = ('=', '<>', '<', '<=', '>', '>=')
+
+
+class Filter:
+    def __init__(self, predicates=()):
+        """
+        Conjunction of parameterized predicates, rendered as a WHERE clause.
+        The SQL text depends only on the columns and operators, never on the values,
+        so the same kind of filter always hits the sqlite3 statement cache.
+        Filters are immutable, every method returns a new filter.
+        E.g. Filter().equals('tickets.status', 1).between('tickets.date_creation', '2024-01-01', '2024-01-08')
+        :param predicates: Tuple of (sql, params) tuples.
+        """
+        self.predicates = tuple(predicates)
+
+    def __bool__(self):
+        return bool(self.predicates)
+
+    def __repr__(self):
+        return f"Filter({self.sql()!r})"
+
+    @staticmethod
+    def _column(column):
+        if not COLUMN_PATTERN.match(column):
+            raise ValueError(f"Invalid column name '{column}'")
+        return column
+
+    def _add(self, sql, *params):
+        return Filter(self.predicates + ((sql, params),))
+
+    def compare(self, column, operator, value):
+        """
+        :param column: Column name, e.g. 'tickets.status'.
+        :param operator: One of OPERATORS.
+        :param value: Compared value.
+        :return: New filter.
+        """
+        if operator not in OPERATORS:
+            raise ValueError(f"Unknown operator '{operator}'")
+        return self._add(f"{self._column(column)} {operator} ?", value)
+
+    def equals(self, column, value):
+        return self.compare(column, '=', value)
+
+    def between(self, column, start=None, end=None):
+        """
+        Range filter, start is inclusive and end is exclusive, a missing bound is not checked.
+        :param column: Column name.
+        :param start: Lower bound.
+        :param end: Upper bound.
+        :return: New filter.
+        """
+        _filter = self
+        if start is not None:
+            _filter = _filter.compare(column, '>=', start)
+        if end is not None:
+            _filter = _filter.compare(column, '<', end)
+        return _filter
+
+    def is_in(self, column, values):
+        """
+        Membership filter, values are bound as one JSON array, so the SQL text does not depend on their number.
+        :param column: Column name.
+        :param values: Iterable of values.
+        :return: New filter.
+        """
+        return self._add(f"{self._column(column)} IN (SELECT value FROM json_each(?))", json.dumps(list(values)))
+
+    def starts_with(self, columns, prefix):
+        """
+        Case-insensitive prefix filter matching any of the columns.
+        :param columns: Column name or tuple of column names.
+        :param prefix: Searched prefix, LIKE wildcards in it are taken literally.
+        :return: New filter.
+        """
+        if isinstance(columns, str):
+            columns = (columns,)
+        pattern = re.sub(r'([\\%_])', r'\\\1', prefix) + '%'
+        sql = ' OR '.join(f"{self._column(column)} LIKE ? ESCAPE '\\'" for column in columns)
+        return self._add(f"({sql})", *([pattern] * len(columns)))
+
+    def sql(self):
+        """
+        :return: Tuple (sql, params), sql is an empty string for an empty filter.
+        """
+        sql = ' AND '.join(predicate for predicate, _ in self.predicates)
+        params = [param for _, params in self.predicates for param in params]
+        return sql, params
@@ -0,0 +1,210 @@
+import bisect
+from database.statements import STATEMENTS
+from misc import Entity
+
+
+REFERENCE_TABLES = ('brands', 'models', 'colors')
+
+
+def _prefixed(names, prefix):
+    """
+    Get names starting with the prefix.
+    :param names: Sorted list of names.
+    :param prefix: Lowercase prefix, empty string matches all names.
+    :return: List of names.
+    """
+    if not prefix:
+        return list(names)
+    start = bisect.bisect_left(names, prefix)
+    return names[start:bisect.bisect_left(names, prefix + '\U0010ffff', start)]
+
+
+class ReferenceCache(Entity):
+    def __init__(self, database):
+        """
+        In-memory copy of the reference tables (brands, models, colors) with name <-> id maps.
+        Data is loaded on first use and reloaded after invalidate() or when the reference version
+        shows that one of the tables was modified.
+        :param database: Database object.
+        """
+        super().__init__()
+        self.database = database
+        self.loaded = False
+        self.version = 0
+        # {table: {id: name}}
+        self.names = {}
+        # {table: {name: id}}
+        self.ids = {}
+        # {model_id: brand_id}
+        self.model_brands = {}
+        # {brand_id: {model_id: name}}
+        self.brand_models = {}
+        # {(brand_id, model_name): model_id}
+        self.brand_model_ids = {}
+        # Sorted distinct names for the comboboxes and their type-ahead, {table: [name]}
+        self.sorted_names = {}
+        # {brand_id: [model name]}
+        self.brand_model_names = {}
+
+    def load(self):
+        """
+        Load reference tables into memory.
+        :return:
+        """
+        self.logger.debug("* Loading reference data...")
+        self.fill(self.fetch())
+
+    def fetch(self, since=None):
+        """
+        Read reference tables without touching the cached data, e.g. on the database worker thread
+        for the cache of the GUI thread, see fill().
+        :param since: Reference version the caller already has, None reads the tables anyway.
+        :return: Tuple (version, {table: rows}) or None if nothing changed since the given version.
+        """
+        version = self._get_change_version()
+        if since is not None and version <= since:
+            return None
+        return version, {table: self.database.fetch_all(STATEMENTS[table]) for table in REFERENCE_TABLES}
+
+    def fill(self, data):
+        """
+        Replace cached data with the result of fetch(), no database query is made.
+        :param data: Tuple (version, {table: rows})
+        :return:
+        """
+        version, rows = data
+        self.version = version
+        self.names = {table: {} for table in REFERENCE_TABLES}
+        self.ids = {table: {} for table in REFERENCE_TABLES}
+        self.model_brands = {}
+        self.brand_models = {}
+        self.brand_model_ids = {}
+        self.sorted_names = {table: [] for table in REFERENCE_TABLES}
+        self.brand_model_names = {}
+
+        for table in ('brands', 'colors'):
+            for item_id, name in rows[table]:
+                self.add(table, item_id, name)
+
+        for model_id, name, brand_id in rows['models']:
+            self.add('models', model_id, name, brand_id)
+        self.loaded = True
+
+    def add(self, table, item_id, name, brand_id=None):
+        """
+        Add a row to the cached data, e.g. after it was inserted into the database.
+        :param table: One of REFERENCE_TABLES.
+        :param item_id: ID of the item.
+        :param name: Name of the item.
+        :param brand_id: ID of the brand, models only.
+        :return:
+        """
+        name = name.lower()
+        self.names[table][item_id] = name
+        if name not in self.ids[table]:
+            bisect.insort(self.sorted_names[table], name)
+        # Keep the first (lowest) ID for duplicated names, as the database lookup does
+        self.ids[table].setdefault(name, item_id)
+        if table == 'models':
+            self.model_brands[item_id] = brand_id
+            self.brand_models.setdefault(brand_id, {})[item_id] = name
+            if (brand_id, name) not in self.brand_model_ids:
+                bisect.insort(self.brand_model_names.setdefault(brand_id, []), name)
+            self.brand_model_ids.setdefault((brand_id, name), item_id)
+
+    def _get_change_version(self):
+        return self.database.fetch_one(STATEMENTS['reference_change_version'])[0]
+
+    def invalidate(self):
+        """
+        Drop cached data, it will be loaded again on next use.
+        :return:
+        """
+        self.loaded = False
+
+    def refresh(self):
+        """
+        Reload the cache if reference tables were modified since it was loaded (e.g. by another connection).
+        :return:
+        """
+        if self.loaded and self._get_change_version() > self.version:
+            self.logger.debug("* Reference data changed, reloading...")
+            self.invalidate()
+
+    def _ensure_loaded(self):
+        if not self.loaded:
+            self.load()
+
+    def get_id(self, table, name):
+        """
+        Get ID of the item by its name.
+        :param table: One of REFERENCE_TABLES.
+        :param name: Case-insensitive name.
+        :return: ID or None if not found.
+        """
+        self._ensure_loaded()
+        return self.ids[table].get(name.lower()) if name else None
+
+    def get_name(self, table, item_id):
+        """
+        Get lowercase name of the item by its ID.
+        :param table: One of REFERENCE_TABLES.
+        :param item_id: ID of the item.
+        :return: Name or None if not found.
+        """
+        self._ensure_loaded()
+        return self.names[table].get(item_id)
+
+    def get_model_id(self, brand_id, name):
+        """
+        Get ID of the model of given brand.
+        :param brand_id: ID of the brand.
+        :param name: Case-insensitive model name.
+        :return: ID or None if not found.
+        """
+        self._ensure_loaded()
+        return self.brand_model_ids.get((brand_id, name.lower())) if name else None
+
+    def get_brand_models(self, brand_id):
+        """
+        Get models of the brand.
+        :param brand_id: ID of the brand.
+        :return: Dictionary {model_id: name}
+        """
+        self._ensure_loaded()
+        return self.brand_models.get(brand_id, {})
+
+    def get_names(self, table, prefix=''):
+        """
+        Get sorted names of the items, e.g. for a combobox.
+        :param table: One of REFERENCE_TABLES.
+        :param prefix: Case-insensitive prefix the names start with, default all names.
+        :return: List of lowercase names.
+        """
+        self._ensure_loaded()
+        return _prefixed(self.sorted_names[table], prefix.lower())
+
+    def get_brand_model_names(self, brand_id, prefix=''):
+        """
+        Get sorted names of the models of the brand.
+        :param brand_id: ID of the brand.
+        :param prefix: Case-insensitive prefix the names start with, default all names.
+        :return: List of lowercase names.
+        """
+        self._ensure_loaded()
+        return _prefixed(self.brand_model_names.get(brand_id, []), prefix.lower())
+
+    def get_item(self, table, item_id):
+        """
+        Get cached row as a dictionary, same as DBProcessor.get_item_from_id returns.
+        :param table: One of REFERENCE_TABLES.
+        :param item_id: ID of the item.
+        :return: Dictionary or None if not found.
+        """
+        name = self.get_name(table, item_id)
+        if name is None:
+            return None
+        item = {'id': item_id, 'name': name}
+        if table == 'models':
+            item['brand_id'] = self.model_brands[item_id]
+        return item
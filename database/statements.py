@@ -0,0 +1,185 @@
+from functools import lru_cache
+from database.query import COLUMN_PATTERN
+
+TABLES = ('tickets', 'customers', 'cars', 'brands', 'models', 'colors')
+NAMED_TABLES = ('brands', 'models', 'colors')
+
+# Named SQL of every DBProcessor operation, the text never changes so sqlite3 keeps the statements prepared
+STATEMENTS = {
+    # Reference data
+    'brands': "SELECT id, name FROM brands ORDER BY id",
+    'colors': "SELECT id, name FROM colors ORDER BY id",
+    'models': "SELECT id, name, brand_id FROM models ORDER BY id",
+    'models_of_brand': """
+        SELECT models.name FROM models
+        JOIN brands ON models.brand_id = brands.id
+        WHERE brands.name = ?
+    """,
+    # Bumped by triggers on every change of brands, models and colors, see migrations/0007_reference_version.sql
+    'reference_change_version': "SELECT version FROM reference_version WHERE id = 1",
+
+    # Identity lookups, see IDENTITY_KEYS
+    'customer_by_identity': "SELECT id FROM customers WHERE last_name = ? AND phone = ?",
+    'car_by_identity': "SELECT id FROM cars WHERE customer_id = ? AND brand_id = ?",
+
+    'ticket_status': "SELECT status FROM tickets WHERE id = ?",
+
+    # Aggregates, columns are aliased as '<part>__<column>'
+    'ticket_aggregate': """
+        SELECT tickets.id AS ticket__id, tickets.date_creation AS ticket__date_creation,
+        tickets.date_modification AS ticket__date_modification, tickets.customer_id AS ticket__customer_id,
+        tickets.car_id AS ticket__car_id, tickets.notes AS ticket__notes, tickets.status AS ticket__status,
+        customers.id AS customer__id, customers.first_name AS customer__first_name,
+        customers.last_name AS customer__last_name, customers.email AS customer__email,
+        customers.phone AS customer__phone,
+        cars.id AS car__id, cars.customer_id AS car__customer_id, cars.brand_id AS car__brand_id,
+        cars.model_id AS car__model_id, cars.color_id AS car__color_id, cars.year AS car__year,
+        cars.vin AS car__vin, brands.name AS car__brand_name, models.name AS car__model_name,
+        colors.name AS car__color_name
+        FROM tickets
+        LEFT JOIN customers
+        ON tickets.customer_id = customers.id
+        LEFT JOIN cars
+        ON tickets.car_id = cars.id
+        LEFT JOIN brands
+        ON cars.brand_id = brands.id
+        LEFT JOIN models
+        ON cars.model_id = models.id
+        LEFT JOIN colors
+        ON cars.color_id = colors.id
+        WHERE tickets.id = ?
+    """,
+    'customer_aggregate': """
+        SELECT customers.id AS customer__id, customers.first_name AS customer__first_name,
+        customers.last_name AS customer__last_name, customers.email AS customer__email,
+        customers.phone AS customer__phone,
+        cars.id AS car__id, cars.customer_id AS car__customer_id, cars.brand_id AS car__brand_id,
+        cars.model_id AS car__model_id, cars.color_id AS car__color_id, cars.year AS car__year,
+        cars.vin AS car__vin, brands.name AS car__brand_name, models.name AS car__model_name,
+        colors.name AS car__color_name
+        FROM customers
+        LEFT JOIN cars
+        ON cars.customer_id = customers.id
+        LEFT JOIN brands
+        ON cars.brand_id = brands.id
+        LEFT JOIN models
+        ON cars.model_id = models.id
+        LEFT JOIN colors
+        ON cars.color_id = colors.id
+        WHERE customers.id = ?
+        ORDER BY cars.id
+    """,
+    'car_aggregate': """
+        SELECT cars.id AS car__id, cars.customer_id AS car__customer_id, cars.brand_id AS car__brand_id,
+        cars.model_id AS car__model_id, cars.color_id AS car__color_id, cars.year AS car__year,
+        cars.vin AS car__vin, brands.name AS car__brand_name, models.name AS car__model_name,
+        colors.name AS car__color_name,
+        customers.id AS customer__id, customers.first_name AS customer__first_name,
+        customers.last_name AS customer__last_name, customers.email AS customer__email,
+        customers.phone AS customer__phone
+        FROM cars
+        LEFT JOIN brands
+        ON cars.brand_id = brands.id
+        LEFT JOIN models
+        ON cars.model_id = models.id
+        LEFT JOIN colors
+        ON cars.color_id = colors.id
+        LEFT JOIN customers
+        ON cars.customer_id = customers.id
+        WHERE cars.id = ?
+    """,
+
+    # Change log
+    'change_version': "SELECT COALESCE(MAX(id), 0) FROM change_log",
+    'changes_since': "SELECT id, row_id, operation FROM change_log WHERE table_name = ? AND id > ? ORDER BY id",
+    'prune_change_log': "DELETE FROM change_log",
+    'prune_change_log_before': "DELETE FROM change_log WHERE id <= ?",
+
+    # Full-text search, see migrations/0005_search_index.sql
+    'search_threshold': "SELECT rowid FROM search_index WHERE search_index MATCH ? ORDER BY rowid DESC LIMIT 1 OFFSET ?",
+    'search': """
+        SELECT rowid % 4, rowid / 4, customer, phone, car, vin, notes
+        FROM search_index
+        WHERE search_index MATCH ? AND rowid >= ?
+        ORDER BY rank
+        LIMIT ?
+    """,
+}
+
+for _table in TABLES:
+    STATEMENTS[f'{_table}_by_id'] = f"SELECT * FROM {_table} WHERE id = ?"
+    STATEMENTS[f'delete_{_table}'] = f"DELETE FROM {_table} WHERE id = ?"
+    # IDs are bound as one JSON array, so the statement is the same for any number of rows
+    STATEMENTS[f'delete_many_{_table}'] = f"DELETE FROM {_table} WHERE id IN (SELECT value FROM json_each(?))"
+for _table in NAMED_TABLES:
+    STATEMENTS[f'{_table}_id_by_name'] = f"SELECT id FROM {_table} WHERE name = ?"
+
+
+def statement(name):
+    """
+    Get SQL of a named statement.
+    :param name: Statement name, e.g. 'tickets_by_id'.
+    :return:
+    :raises ValueError: If there is no such statement.
+    """
+    try:
+        return STATEMENTS[name]
+    except KeyError:
+        raise ValueError(f"Unknown statement '{name}'") from None
+
+
+def _identifiers(table, columns):
+    if table not in TABLES:
+        raise ValueError(f"Unknown table '{table}'")
+    for column in columns:
+        if not COLUMN_PATTERN.match(column):
+            raise ValueError(f"Invalid column name '{column}'")
+
+
+@lru_cache(maxsize=None)
+def insert_statement(table, columns):
+    """
+    Build INSERT of the given columns, built once per column set.
+    :param table: Name of the table.
+    :param columns: Tuple of column names.
+    :return:
+    """
+    _identifiers(table, columns)
+    return f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['?'] * len(columns))})"
+
+
+@lru_cache(maxsize=None)
+def update_statement(table, columns):
+    """
+    Build UPDATE of the given columns of the row with ID bound last, built once per column set.
+    :param table: Name of the table.
+    :param columns: Tuple of column names.
+    :return:
+    """
+    _identifiers(table, columns)
+    return f"UPDATE {table} SET {', '.join(f'{column} = ?' for column in columns)} WHERE id = ?"
+
+
+@lru_cache(maxsize=None)
+def update_many_statement(table, columns):
+    """
+    Build UPDATE of the given columns of the rows with IDs bound last as one JSON array, built once per column set.
+    :param table: Name of the table.
+    :param columns: Tuple of column names.
+    :return:
+    """
+    _identifiers(table, columns)
+    return (f"UPDATE {table} SET {', '.join(f'{column} = ?' for column in columns)} "
+            f"WHERE id IN (SELECT value FROM json_each(?))")
+
+
+@lru_cache(maxsize=None)
+def select_by_id_statement(table, columns):
+    """
+    Build SELECT of the given columns of the row with ID, built once per column set.
+    :param table: Name of the table.
+    :param columns: Tuple of column names.
+    :return:
+    """
+    _identifiers(table, columns)
+    return f"SELECT {', '.join(columns)} FROM {table} WHERE id = ?"
@@ -72,7 +72,7 @@ class Car(_Object):
     def add(self):
         if not self.get_id():
             self._id = self.database.add_item_to_table('cars', self.gen_data())
-            self.logger.debug(f"Car not in database, added with ID: {self._id}")
+            self.logger.debug("Car not in database, added with ID: %s", self._id)
         return self._id
 
     def exists(self):
@@ -83,7 +83,7 @@ class Car(_Object):
         }
         car_id = self.database.check_if_car_exists(data)
         if car_id:
-            self.logger.debug(f"Car exists in database with ID: {car_id}")
+            self.logger.debug("Car exists in database with ID: %s", car_id)
         return car_id
 
     def update(self):
@@ -113,7 +113,7 @@ class Customer(_Object):
     def add(self):
         if not self.get_id():
             self._id = self.database.add_item_to_table('customers', self.gen_data())
-            self.logger.debug(f"Customer not in database, added with ID: {self._id}")
+            self.logger.debug("Customer not in database, added with ID: %s", self._id)
         return self._id
 
     def exists(self):
@@ -123,7 +123,7 @@ class Customer(_Object):
         }
         customer_id = self.database.check_if_customer_exists(data)
         if customer_id:
-            self.logger.debug(f"Customer exists in database with id: {customer_id}")
+            self.logger.debug("Customer exists in database with id: %s", customer_id)
         return customer_id
 
     def update(self):
@@ -190,28 +190,80 @@ class TicketDAO(DAO):
         self.car_id = data.get('car_id')
         self.notes = data.get('notes')
         self.status = data.get('status')
+        self.customer = None
+        self.car = None
+
+    @classmethod
+    def load(cls, db, ticket_id):
+        """
+        Load ticket with its customer and car using a single query.
+        :param db: DBProcessor object.
+        :param ticket_id: ID of the ticket.
+        :return: TicketDAO or None if ticket does not exist.
+        """
+        aggregate = db.get_ticket_aggregate(ticket_id)
+        if not aggregate:
+            return None
+        ticket = cls(aggregate['ticket'], db)
+        ticket.customer = CustomerDAO(aggregate['ticket'], db, collected_data=aggregate['customer'])
+        ticket.car = CarDAO(aggregate['ticket'], db, collected_data=aggregate['car'])
+        return ticket
 
 
 class CustomerDAO(DAO):
-    def __init__(self, data, db):
+    def __init__(self, data, db, collected_data=None):
         super().__init__()
         self.database = db
         self.id = data.get('customer_id')
         self.car_id = data.get('car_id')
-        self.collected_data = None
-        self.load_data()
+        self.collected_data = collected_data
+        self.cars = []
+        if collected_data is None:
+            self.load_data()
 
     def load_data(self):
         self.collected_data = self.database.get_item_from_id('customers', self._id)
 
+    @classmethod
+    def load(cls, db, customer_id):
+        """
+        Load customer with all their cars using a single query.
+        :param db: DBProcessor object.
+        :param customer_id: ID of the customer.
+        :return: CustomerDAO or None if customer does not exist.
+        """
+        aggregate = db.get_customer_aggregate(customer_id)
+        if not aggregate:
+            return None
+        customer = cls({'customer_id': customer_id}, db, collected_data=aggregate['customer'])
+        customer.cars = [CarDAO({'car_id': car['id']}, db, collected_data=car) for car in aggregate['cars']]
+        return customer
+
 
 class CarDAO(DAO):
-    def __init__(self, data, db):
+    def __init__(self, data, db, collected_data=None):
         super().__init__()
         self.database = db
         self.id = data.get('car_id')
-        self.collected_data = None
-        self.load_data()
+        self.collected_data = collected_data
+        self.customer = None
+        if collected_data is None:
+            self.load_data()
 
     def load_data(self):
         self.collected_data = self.database.get_item_from_id('cars', self._id)
+
+    @classmethod
+    def load(cls, db, car_id):
+        """
+        Load car with its owner using a single query.
+        :param db: DBProcessor object.
+        :param car_id: ID of the car.
+        :return: CarDAO or None if car does not exist.
+        """
+        aggregate = db.get_car_aggregate(car_id)
+        if not aggregate:
+            return None
+        car = cls({'car_id': car_id}, db, collected_data=aggregate['car'])
+        car.customer = CustomerDAO(aggregate['car'], db, collected_data=aggregate['customer'])
+        return car
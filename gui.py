@@ -4,9 +4,13 @@ from gui_elements import (
     TreeViewSelector,
     NewTicketWindow,
     EditTicketWindow,
-    EditCustomerWindow)
+    EditCustomerWindow,
+    ProgressWindow,
+    QueryStatsWindow,
+    SearchBar,
+    WindowPool)
 from misc import Entity, popup
-from database.database_model import DBProcessor
+from startup import STARTUP
 
 
 class MainGUI(Entity):
@@ -18,6 +22,8 @@ class MainGUI(Entity):
         self.tabs = None
         self.active_tab = 'tickets'
         self.tree_views = {}
+        self.search_bar = None
+        self.windows = WindowPool(self)
 
         self._init_gui()
 
@@ -26,12 +32,44 @@ class MainGUI(Entity):
         try:
             self._init_main_frame()
             self._init_top_dropdown_menu()
+            self._init_search_bar()
             self._init_tree_views()
             self._init_buttons()
         except Exception as e:
             self._pop_error('error_loading_gui', str(e))
+        STARTUP.mark('window_built')
+        # Idle callbacks run after the pending redraws, i.e. once the window is painted
+        self.root.after_idle(self._on_first_paint)
         self.root.mainloop()
 
+    def _on_first_paint(self):
+        STARTUP.mark('first_paint')
+        # Brands, models and colors are needed by the data windows only, load them once the window is shown
+        self.root.after_idle(self._load_reference_data)
+
+    def _load_reference_data(self):
+        # Read on the database worker thread, the cache is filled on the mainloop
+        self.database.refresh_reference_data_async(callback=self._on_reference_data_loaded)
+
+    def _on_reference_data_loaded(self, _):
+        STARTUP.mark('reference_data')
+        self._finish_startup()
+
+    def treeview_populated(self, tab):
+        """
+        Called by the tree views whenever they are (re)populated.
+        :param tab: Name of the tab.
+        :return:
+        """
+        if tab == self.active_tab:
+            STARTUP.mark('tabs_loaded')
+            self._finish_startup()
+
+    @staticmethod
+    def _finish_startup():
+        if all(mark in STARTUP.marks for mark in ('first_paint', 'reference_data', 'tabs_loaded')):
+            STARTUP.finish()
+
     def _init_root(self):
         self.logger.debug("\tInitializing root...")
         root = tk.Tk()
@@ -41,6 +79,8 @@ class MainGUI(Entity):
         root.grid_columnconfigure(0, weight=1)
         root.grid_rowconfigure(1, weight=1)
         self.root = root
+        # Results of database calls made on the worker thread are delivered on this mainloop
+        self.database.attach(root)
 
     def _init_main_frame(self):
         self._init_root()
@@ -60,6 +100,7 @@ class MainGUI(Entity):
         filemenu.add_command(label=self._lang('export_db'), command=self.menu_on_save_file)
         filemenu.add_separator()
         filemenu.add_command(label=self._lang('settings'), command=self.menu_on_settings)
+        filemenu.add_command(label=self._lang('query_stats'), command=self.menu_on_query_stats)
         filemenu.add_separator()
         filemenu.add_command(label=self._lang('exit'), command=self.menu_on_exit)
 
@@ -79,7 +120,13 @@ class MainGUI(Entity):
                                 text=self._lang('exit'),
                                 command=self.quit_app,
                                 font=self.app_config["layout_config"]["large_font"])
-        exit_button.grid(row=2, column=0, sticky='ew', padx=5, pady=5)
+        exit_button.grid(row=3, column=0, sticky='ew', padx=5, pady=5)
+
+    def _init_search_bar(self):
+        self.logger.debug("\tInitializing search bar...")
+        search_frame = tk.Frame(self.main_frame)
+        search_frame.grid(row=1, column=0, sticky='ew', padx=5)
+        self.search_bar = SearchBar(search_frame, self)
 
     def _init_tree_views(self):
         self.logger.debug("\tInitializing tree views...")
@@ -89,8 +136,8 @@ class MainGUI(Entity):
             'cars': ['ID', 'brand_name', 'model_name', 'color_name', 'year', 'vin', 'customer'],
         }
         notebook = ttk.Notebook(self.main_frame)
-        notebook.grid(row=1, column=0, sticky='nsew', padx=5, pady=5)
-        self.main_frame.grid_rowconfigure(1, weight=1)
+        notebook.grid(row=2, column=0, sticky='nsew', padx=5, pady=5)
+        self.main_frame.grid_rowconfigure(2, weight=1)
         self.main_frame.grid_columnconfigure(0, weight=1)
 
         for tab in notebook_tabs.keys():
@@ -101,39 +148,121 @@ class MainGUI(Entity):
 
         self.logger.debug("\t\tTree views: %s", self.tree_views)
         self.tabs = notebook
+        # Tabs are loaded when shown for the first time
+        notebook.bind('<<NotebookTabChanged>>', self._on_tab_changed)
         self._init_active_tab()
 
     def _init_active_tab(self):
         self.logger.debug("\tInitializing active tab...")
         self.tabs.select(0)
+        self._on_tab_changed()
+
+    def _on_tab_changed(self, event=None):
+        self.active_tab = list(self.tree_views)[self.tabs.index(self.tabs.select())]
+        self.logger.debug("\tActive tab: %s", self.active_tab)
+        self.tree_views[self.active_tab].show()
 
     def delete_entry(self):
         pass
 
     def menu_on_open_file(self):
-        popup('info', self._lang('info'), self._lang('not_implemented'))
+        # Imported on first use, not needed to show the main window
+        from tkinter import filedialog
+        from database.database import Database
+        from database.importer import Importer
+        path = filedialog.askopenfilename(parent=self.root,
+                                          title=self._lang('import_db'),
+                                          filetypes=[(self._lang('csv_files'), '*.csv'),
+                                                     (self._lang('sqlite_files'), '*.db *.sqlite *.sqlite3')])
+        if not path:
+            return
+        self.logger.info(f"* Importing {path}...")
+        database_name = self.database.database_name
+
+        def import_task(report):
+            # Runs on a worker thread, sqlite connections cannot be shared between threads
+            database = Database(database_name)
+            try:
+                return Importer(database, progress=report).import_file(path)
+            finally:
+                database.close()
+
+        ProgressWindow(self, 'import_db', import_task, on_done=self._on_import_done)
+
+    def _on_import_done(self, result, error):
+        if error:
+            popup('error', self._lang('error'), self._lang('import_failed') + '\n' + str(error))
+            return
+        self.database.refresh_reference_data_async()
+        # Imported rows are not synced one by one, the tree views are reloaded from the first page
+        for tw in self.tree_views.values():
+            tw.invalidate()
+        self.tree_views[self.active_tab].show()
+        popup('info', self._lang('info'), self._lang('import_finished').format(**result))
 
     def menu_on_save_file(self):
-        popup('info', self._lang('info'), self._lang('not_implemented'))
+        from tkinter import filedialog
+        from database.database import Database
+        from database.exporter import Exporter
+        path = filedialog.asksaveasfilename(parent=self.root,
+                                            title=self._lang('export_db'),
+                                            defaultextension='.csv',
+                                            filetypes=[(self._lang('csv_files'), '*.csv'),
+                                                       (self._lang('jsonl_files'), '*.jsonl'),
+                                                       (self._lang('sqlite_files'), '*.db *.sqlite *.sqlite3')])
+        if not path:
+            return
+        self.logger.info(f"* Exporting to {path}...")
+        database_name = self.database.database_name
+
+        def export_task(report):
+            # Runs on a worker thread, sqlite connections cannot be shared between threads
+            database = Database(database_name)
+            try:
+                return Exporter(database, progress=report).export_file(path)
+            finally:
+                database.close()
+
+        ProgressWindow(self, 'export_db', export_task, on_done=self._on_export_done)
+
+    def _on_export_done(self, result, error):
+        if error:
+            popup('error', self._lang('error'), self._lang('export_failed') + '\n' + str(error))
+            return
+        popup('info', self._lang('info'), self._lang('export_finished').format(seconds=result['seconds']))
 
     def menu_on_settings(self):
         popup('info', self._lang('info'), self._lang('not_implemented'))
 
+    def menu_on_query_stats(self):
+        self.logger.info("* Opening query statistics...")
+        QueryStatsWindow(self)
+
     def menu_on_exit(self):
         self.quit_app()
 
     def open_new_ticket_window(self):
         self.logger.info("* Opening new ticket window...")
-        NewTicketWindow(self)
+        self.windows.open(NewTicketWindow)
 
     def update_treeview(self, tab):
         self.logger.info("* Updating tree view...")
-        self.tree_views[tab].populate_treeview()
+        self.tree_views[tab].sync_treeview()
 
     def update_treeviews(self):
         self.logger.info("* Updating tree views...")
-        for tw in self.tree_views.values():
-            tw.populate_treeview()
+        # Only the visible tree view is synchronized now, hidden ones when their tab is shown
+        for tab, tw in self.tree_views.items():
+            if tab == self.active_tab:
+                tw.sync_treeview()
+            else:
+                tw.mark_dirty()
+        # Every loaded tree view is synchronized at least up to the oldest version, older entries are not needed.
+        # Tree views not loaded yet read all rows when shown.
+        versions = [tw.version for tw in self.tree_views.values() if tw.loaded]
+        if versions:
+            self.database.prune_change_log_async(min(versions))
+        self.search_bar.search()
 
     def _pop_error(self, msg, e):
         self.logger.exception(msg, exc_info=True)
@@ -2,13 +2,22 @@ from misc import (
     Entity,
     WINDOWS_SETTINGS,
     Logger,
-    popup,
-    custom_sort_key)
+    popup)
+import bisect
 import datetime
+import queue
+import sqlite3
+import threading
 import tkinter as tk
-import re
 from tkinter import ttk
-from entities import *
+from database.instrumentation import STATS
+from entities import TicketDAO, CustomerDAO, CarDAO
+from services import TicketService, CustomerService, ticket_filter
+from validation import VALIDATOR
+
+# Keys which do not change the text of a combobox, e.g. opening its list with Down
+COMPLETION_IGNORED_KEYS = ('Up', 'Down', 'Left', 'Right', 'Return', 'Tab', 'Escape', 'Home', 'End',
+                           'Shift_L', 'Shift_R', 'Control_L', 'Control_R', 'Alt_L', 'Alt_R')
 
 
 class Treeview(Entity):
@@ -19,12 +28,34 @@ class Treeview(Entity):
         self.name = name
         self.parent = parent
         self.database = parent.database
+        self.treeview_config = self.app_config.get('treeview', {})
+        self.virtual = self.treeview_config.get('virtual', False)
+        self.page_size = self.treeview_config.get('page_size', 100)
+        self.buffer_pages = self.treeview_config.get('buffer_pages', 3)
+        self.prefetch_threshold = self.treeview_config.get('prefetch_threshold', 0.1)
+        # Keyset pagination state of the rows currently kept in the widget
+        self._first_id = None
+        self._last_id = None
+        self._has_more_before = False
+        self._has_more_after = False
+        self._page_pending = False
+        # Change log version the treeview content is synchronized with
+        self._version = 0
+        # Bumped on every repopulation, results of database calls made before are discarded
+        self._generation = 0
+        self.order_by = None
+        self.direction = 'ASC'
+        # Filter object applied by the database, None shows all rows
+        self.filter = None
+        # Rows are loaded when the tab is shown for the first time, see show()
+        self.loaded = False
+        # Hidden tab with changes not synchronized yet
+        self.dirty = False
         self._init_treeview()
-        self.populate_treeview()
 
     def _init_treeview(self):
         self.logger.debug("\tInitializing treeview...")
-        self.treeview = ttk.Treeview(self.tab, columns=self.columns, show='headings')
+        self.treeview = ttk.Treeview(self.tab, columns=self.columns, show='headings', selectmode='extended')
         self.treeview.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         self._init_treeview_columns()
         self._init_treeview_scrollbar()
@@ -47,7 +78,26 @@ class Treeview(Entity):
         self.logger.debug("\tInitializing treeview scrollbar...")
         scrollbar = ttk.Scrollbar(self.tab, orient=tk.VERTICAL, command=self.treeview.yview)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        self.treeview.configure(yscrollcommand=scrollbar.set)
+        self.scrollbar = scrollbar
+        self.treeview.configure(yscrollcommand=self._on_yscroll)
+
+    def _on_yscroll(self, first, last):
+        """
+        Update the scrollbar and, in virtual mode, fetch the next/previous page when
+        the visible part of the treeview gets close to the edge of the loaded rows.
+        :param first: Fraction of the rows above the visible area.
+        :param last: Fraction of the rows up to the bottom of the visible area.
+        :return:
+        """
+        self.scrollbar.set(first, last)
+        if not self.virtual or self._page_pending:
+            return
+        if float(last) >= 1 - self.prefetch_threshold and self._has_more_after:
+            self._page_pending = True
+            self._load_next_page()
+        elif float(first) <= self.prefetch_threshold and self._has_more_before:
+            self._page_pending = True
+            self._load_previous_page()
 
     def _init_treeview_menu(self):
         self.logger.debug("\tInitializing treeview menu...")
@@ -58,41 +108,341 @@ class Treeview(Entity):
         self.menu.add_command(label=self._lang('change_status'), command=lambda: self.change_status())
         self.treeview.bind('<Button-3>', self.on_right_click)
         self.treeview.bind('<Button-2>', self.on_right_click)
-        self.treeview.bind('<Control-Button-1>', self.on_right_click)
+        # Control-click extends the selection, except on macOS where it is the right click
+        if self.treeview.tk.call('tk', 'windowingsystem') == 'aqua':
+            self.treeview.bind('<Control-Button-1>', self.on_right_click)
         self.treeview.bind('<Double-Button-1>', self.edit_row)
+        self.treeview.bind('<Delete>', lambda event: self.delete_row())
 
     def _sort_treeview_column(self, treeview, column, reverse):
-        column_contents = [(treeview.set(k, column), k) for k in treeview.get_children('')]
-        column_contents.sort(key=custom_sort_key, reverse=reverse)
-
-        for index, (val, k) in enumerate(column_contents):
-            treeview.move(k, '', index)
+        # Sorting is done by the database, the treeview is reloaded from the first page
+        self.order_by = column
+        self.direction = 'DESC' if reverse else 'ASC'
+        self.populate_treeview()
 
         treeview.heading(column, command=lambda: self._sort_treeview_column(treeview, column, not reverse))
 
+    def show(self):
+        """
+        Bring the treeview up to date when its tab becomes visible:
+        load it on first show, apply the changes made while it was hidden.
+        :return:
+        """
+        if not self.loaded:
+            self.populate_treeview()
+        elif self.dirty:
+            self.sync_treeview()
+
+    def mark_dirty(self):
+        """
+        Remember to synchronize a hidden treeview when it is shown, nothing is queried now.
+        :return:
+        """
+        if self.loaded:
+            self.dirty = True
+
+    def invalidate(self):
+        """
+        Repopulate the treeview from the first page when it is shown next time.
+        :return:
+        """
+        self.loaded = False
+        self.dirty = False
+
     def populate_treeview(self):
-        # FIXME: Refactor this function it is ugly
-        tag = ''
         self.logger.debug("\tPopulating treeview...")
+        self.loaded = True
+        self.dirty = False
         style = ttk.Style()
         style.map('Treeview', background=[('selected', '#999999')])
         self.treeview.tag_configure('Green.Row', background='#E6FFE6')
         self.treeview.tag_configure('Red.Row', background='#FFE6E6')
         self.clear_treeview()
-        data = self.database.get_all_items(self.name)
-        # Capitalize first letter of each element in data lists
-        data = [
-            [item.upper() if isinstance(item, str) else item for item in row]
-            for row in data
-        ]
-        if data:
-            for row in data:
-                # Set color row depends on the last value from data (status 1/0 where 1 is not done)w
-                if self.name == 'tickets':
-                    tag = 'Green.Row' if row[-1] == 0 else 'Red.Row'
-                self.treeview.insert('', tk.END, values=row, tags=tag)
-        else:
+        self._generation += 1
+        self._first_id = None
+        self._last_id = None
+        self._has_more_before = False
+        self._has_more_after = False
+        self._page_pending = True
+        self.database.get_versioned_items_async(self.name, limit=self.page_size if self.virtual else None,
+                                                **self._query_options(),
+                                                callback=self._current(self._on_populated),
+                                                errback=self._current(self._on_database_error))
+
+    def _on_populated(self, result):
+        """
+        Fill the treeview with the first page, or with all rows if the treeview is not virtual.
+        :param result: Tuple (version, rows) as returned by get_versioned_items.
+        :return:
+        """
+        self._version, rows = result
+        self._page_pending = False
+        if not rows:
             self.logger.debug("\t\tNo data to populate treeview...")
+        for row in rows:
+            self._insert_row(row)
+        self._update_window_bounds()
+        self._has_more_after = self.virtual and len(rows) == self.page_size
+        self.parent.treeview_populated(self.name)
+
+    def _current(self, callback):
+        """
+        Wrap a callback of a database call, so it is skipped if the treeview was repopulated in the meantime.
+        :param callback: Callable called with the result of the database call.
+        :return:
+        """
+        generation = self._generation
+
+        def _callback(result):
+            if generation == self._generation:
+                callback(result)
+        return _callback
+
+    def _on_database_error(self, error):
+        self.logger.error(f"\tLoading {self.name} failed: {error!r}")
+        self._page_pending = False
+
+    @property
+    def version(self):
+        return self._version
+
+    def sync_treeview(self):
+        """
+        Apply rows inserted, updated and deleted since the last synchronization
+        instead of repopulating the whole treeview.
+        :return:
+        """
+        self.dirty = False
+        self.database.get_changed_rows_async(self.name, self._version, where=self.filter,
+                                             callback=self._current(self._apply_changes),
+                                             errback=self._current(self._on_database_error))
+
+    def _apply_changes(self, result):
+        """
+        Apply changed rows read on the database worker thread.
+        :param result: Tuple (version, rows, deleted_ids) as returned by get_changed_rows.
+        :return:
+        """
+        version, rows, deleted = result
+        # Another sync submitted earlier or later may have been applied already
+        if version <= self._version:
+            return
+        self.logger.debug("\tSyncing treeview: %s upserted, %s deleted...", len(rows), len(deleted))
+        self._version = version
+
+        deleted_items = [item for item in map(str, deleted) if self.treeview.exists(item)]
+        if deleted_items:
+            self.treeview.delete(*deleted_items)
+        self._update_window_bounds()
+
+        if self.order_by in (None, 'ID') and self.direction == 'ASC':
+            self._sync_rows_by_id(rows)
+        else:
+            self._sync_rows_sorted(rows)
+
+    def _sync_rows_by_id(self, rows):
+        """
+        Update or insert rows into a treeview ordered by ID.
+        :param rows: Changed rows as returned by get_items_by_ids.
+        :return:
+        """
+        loaded_ids = [int(item) for item in self.treeview.get_children()]
+        for row in rows:
+            if self.treeview.exists(row[0]):
+                self.treeview.item(row[0], **self._row_options(row))
+                continue
+            # Skip rows outside the window of loaded pages, they will be fetched while scrolling
+            if self.virtual and self._first_id is not None and row[0] < self._first_id:
+                continue
+            if self.virtual and self._has_more_after and self._last_id is not None and row[0] > self._last_id:
+                continue
+            index = bisect.bisect(loaded_ids, row[0])
+            loaded_ids.insert(index, row[0])
+            self._insert_row(row, index)
+        self._update_window_bounds()
+
+    def _sync_rows_sorted(self, rows):
+        """
+        Update rows in place when their value in the sorted column did not change,
+        otherwise reload the window of loaded rows as their position is decided by the database.
+        :param rows: Changed rows as returned by get_items_by_ids.
+        :return:
+        """
+        sort_index = self.columns.index(self.order_by)
+        for row in rows:
+            options = self._row_options(row)
+            if not self.treeview.exists(row[0]) or \
+                    self.treeview.set(row[0], self.order_by) != str(options['values'][sort_index]):
+                self._reload_window()
+                return
+            self.treeview.item(row[0], **options)
+
+    def _reload_window(self):
+        """
+        Re-read the rows of the currently loaded window from the database.
+        :return:
+        """
+        count = max(len(self.treeview.get_children()), self.page_size)
+        first_id = self._first_id if self._has_more_before else None
+        table = self.name
+        query_options = self._query_options()
+        limit = count if self.virtual else None
+
+        def load_window(database):
+            # Runs on the database worker thread
+            previous = []
+            if first_id is not None:
+                previous = database.get_all_items(table, before_id=first_id, limit=1, **query_options)
+            rows = database.get_all_items(table, after_id=previous[0][0] if previous else None,
+                                          limit=limit, **query_options)
+            return previous, rows
+
+        self._page_pending = True
+        self.database.submit(load_window,
+                             callback=self._current(lambda result: self._on_window_reloaded(*result, count)),
+                             errback=self._current(self._on_database_error))
+
+    def _on_window_reloaded(self, previous, rows, count):
+        """
+        Replace the loaded rows with the re-read window.
+        :param previous: Row preceding the window, empty list if the window starts at the first row.
+        :param rows: Rows of the window.
+        :param count: Number of requested rows.
+        :return:
+        """
+        self._page_pending = False
+        top_item = self.treeview.identify_row(1)
+        self.clear_treeview()
+        for row in rows:
+            self._insert_row(row)
+        self._has_more_before = bool(previous)
+        self._has_more_after = self.virtual and len(rows) == count
+        self._update_window_bounds()
+        self._keep_in_view(top_item)
+
+    def _update_window_bounds(self):
+        """
+        Set keyset pagination cursors to the first and the last loaded row.
+        :return:
+        """
+        children = self.treeview.get_children()
+        self._first_id = int(children[0]) if children else None
+        self._last_id = int(children[-1]) if children else None
+
+    def _query_options(self):
+        return {'where': self.filter, 'order_by': self.order_by, 'direction': self.direction}
+
+    def _row_options(self, row):
+        """
+        Get treeview item options for a database row.
+        :param row: Row as returned by get_all_items.
+        :return: Dictionary with values and tags.
+        """
+        tag = ''
+        # Set color row depends on the last value from data (status 1/0 where 1 is not done)
+        if self.name == 'tickets':
+            tag = 'Green.Row' if row[-1] == 0 else 'Red.Row'
+        values = [item.upper() if isinstance(item, str) else item for item in row]
+        return {'values': values, 'tags': tag}
+
+    def _insert_row(self, row, index=tk.END):
+        """
+        Insert a database row into the treeview, the row ID is used as item ID.
+        :param row: Row as returned by get_all_items.
+        :param index: Position in the treeview.
+        :return:
+        """
+        self.treeview.insert('', index, iid=row[0], **self._row_options(row))
+
+    def _load_next_page(self):
+        """
+        Fetch the page following the last loaded row on the database worker thread.
+        :return:
+        """
+        self.database.get_all_items_async(self.name, after_id=self._last_id, limit=self.page_size,
+                                          **self._query_options(),
+                                          callback=self._current(self._on_next_page),
+                                          errback=self._current(self._on_database_error))
+
+    def _on_next_page(self, rows):
+        """
+        Append the fetched page and drop the oldest page if the widget holds more than buffer_pages pages.
+        :param rows: Rows following the last loaded row.
+        :return:
+        """
+        self._page_pending = False
+        self.logger.debug("\t\tLoaded %s rows after ID %s...", len(rows), self._last_id)
+        self._has_more_after = len(rows) == self.page_size
+        if not rows:
+            return
+        for row in rows:
+            self._insert_row(row)
+        if self._first_id is None:
+            self._first_id = rows[0][0]
+        self._last_id = rows[-1][0]
+
+        children = self.treeview.get_children()
+        overflow = len(children) - self.page_size * self.buffer_pages
+        if overflow > 0:
+            self._trim_rows(children[:overflow])
+            self._first_id = int(self.treeview.get_children()[0])
+            self._has_more_before = True
+
+    def _load_previous_page(self):
+        """
+        Fetch the page preceding the first loaded row on the database worker thread.
+        :return:
+        """
+        self.database.get_all_items_async(self.name, before_id=self._first_id, limit=self.page_size,
+                                          **self._query_options(),
+                                          callback=self._current(self._on_previous_page),
+                                          errback=self._current(self._on_database_error))
+
+    def _on_previous_page(self, rows):
+        """
+        Prepend the fetched page and drop the newest page if the widget holds more than buffer_pages pages.
+        :param rows: Rows preceding the first loaded row.
+        :return:
+        """
+        self._page_pending = False
+        self.logger.debug("\t\tLoaded %s rows before ID %s...", len(rows), self._first_id)
+        self._has_more_before = len(rows) == self.page_size
+        if not rows:
+            return
+        top_item = self.treeview.identify_row(1)
+        for index, row in enumerate(rows):
+            self._insert_row(row, index)
+        self._first_id = rows[0][0]
+
+        children = self.treeview.get_children()
+        overflow = len(children) - self.page_size * self.buffer_pages
+        if overflow > 0:
+            self.treeview.delete(*children[-overflow:])
+            self._last_id = int(self.treeview.get_children()[-1])
+            self._has_more_after = True
+        self._keep_in_view(top_item)
+
+    def _trim_rows(self, items):
+        """
+        Remove items from the top of the treeview keeping the currently visible row in place.
+        :param items: Items to remove.
+        :return:
+        """
+        top_item = self.treeview.identify_row(1)
+        self.treeview.delete(*items)
+        if top_item and top_item not in items:
+            self._keep_in_view(top_item)
+
+    def _keep_in_view(self, item):
+        """
+        Scroll the treeview so that the given item is the first visible row again.
+        :param item: Item ID.
+        :return:
+        """
+        if not item or not self.treeview.exists(item):
+            return
+        children = self.treeview.get_children()
+        self.treeview.yview_moveto(self.treeview.index(item) / max(len(children), 1))
 
     def clear_treeview(self):
         self.logger.debug("\tClearing treeview...")
@@ -105,7 +455,10 @@ class Treeview(Entity):
             row_id = self.treeview.identify_row(event.y)
             if row_id:
                 button_state = tk.NORMAL
-                self.treeview.selection_set(row_id)
+                # Keep a multi-selection the clicked row is part of, so the action applies to all selected rows
+                if row_id not in self.treeview.selection():
+                    self.treeview.selection_set(row_id)
+                self.treeview.focus(row_id)
                 self.menu.entryconfig(self._lang('delete'), command=lambda: self.delete_row(), state=button_state)
                 self.menu.entryconfig(self._lang('edit'), command=lambda: self.edit_row(), state=button_state)
                 self.menu.entryconfig(self._lang('change_status'),
@@ -121,47 +474,88 @@ class Treeview(Entity):
     def change_status(self, event=None):
         pass
 
+    def selected_item(self):
+        """
+        Get the item actions on a single row apply to, the focused row if selected, else the first selected row.
+        :return: Item ID or None.
+        """
+        selection = self.treeview.selection()
+        if not selection:
+            return None
+        focus = self.treeview.focus()
+        return focus if focus in selection else selection[0]
+
+    def selected_ids(self):
+        """
+        :return: Database IDs of all selected rows, item IDs are the row IDs.
+        """
+        return [int(item) for item in self.treeview.selection()]
+
     def delete_row(self):
-        self.logger.debug(f"\tDeleting row {self.treeview.selection()}...")
-        selected_item = self.treeview.selection()
-        if selected_item and popup('askyesno', self._lang('delete_item'), self._lang('delete_item_warning')):
-            self.logger.debug(f"\t\tSelected item: {selected_item}")
-            self.logger.debug(f"\t\tDeleting item {selected_item}...")
-            self.database.delete_item(self.name, self.treeview.item(selected_item)['values'][0])
-            self.populate_treeview()
+        selected_ids = self.selected_ids()
+        self.logger.debug("\tDeleting rows %s...", selected_ids)
+        if not selected_ids:
+            return
+        if len(selected_ids) == 1:
+            warning = self._lang('delete_item_warning')
+        else:
+            warning = self._lang('delete_items_warning').format(count=len(selected_ids))
+        if popup('askyesno', self._lang('delete_item'), warning):
+            # One statement and one commit for the whole selection, then one incremental update
+            self.database.delete_items_async(self.name, selected_ids,
+                                             callback=lambda _: self.sync_treeview(),
+                                             errback=self._on_delete_error)
+
+    def _on_delete_error(self, error):
+        if isinstance(error, sqlite3.IntegrityError):
+            popup('error', self._lang('error'), self._lang('delete_item_in_use'))
+            return
+        self.logger.error(f"\tDeleting item failed: {error!r}")
+        popup('error', self._lang('error'), str(error))
 
 
 class DataWindow(Entity):
-    def __init__(self, parent, window_settings):
+    def __init__(self, parent, window_settings, pool=None):
         super().__init__()
         self.date = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         self.parent = parent
         self.window_config = window_settings.get('config', {})
-        self.window_config['window_position'] = \
-            f"+{int(parent.root.winfo_x()) + 50}+" \
-            f"{int(parent.root.winfo_y()) + 50}"
+        self._set_window_position()
 
         self.window_layout = window_settings.get('layout', {})
         self.database = parent.database
 
         self.entries = {}
         self.error_labels = {}
+        # WindowPool the window is returned to when closed, None destroys it
+        self.pool = pool
+        self.reusable = True
+        # Bumped every time the window is reopened, results of database calls made before are discarded
+        self._session = 0
 
         self._init_window()
+        self._refresh_reference_data()
+
+    def _set_window_position(self):
+        self.window_config['window_position'] = \
+            f"+{int(self.parent.root.winfo_x()) + 50}+" \
+            f"{int(self.parent.root.winfo_y()) + 50}"
 
     # ===================================================
     # Layout
     # ===================================================
     def _init_window(self):
-        self.logger.debug(f"\tInitializing ticket {self._lang(self.window_config['title'])}...")
+        self.logger.debug("\tInitializing ticket %s...", self._lang(self.window_config['title']))
         try:
             self.window = tk.Toplevel(self.parent.root, pady=10, padx=10)
             self.window.title(self._lang(self.window_config['title']))
             self.window.geometry(self.window_config['window_size'] + self.window_config['window_position'])
             self.window.resizable(*self.window_config['resizable'])
+            self.window.protocol('WM_DELETE_WINDOW', self.quit_window)
 
             self._init_layout()
         except Exception as e:
+            self.reusable = False
             self._pop_error('error_loading_window_ticket', str(e))
 
     def _init_layout(self):
@@ -176,7 +570,7 @@ class DataWindow(Entity):
             self._build_section(section)
 
     def _build_section(self, section):
-        self.logger.debug("\tBuilding section: {}".format(section[0]))
+        self.logger.debug("\tBuilding section: %s", section[0])
         frame = tk.LabelFrame(self.window, text=self._lang(section[0]))
         frame.grid(row=section[2], column=0, sticky='nsew', padx=5, pady=5)
         frame.grid_columnconfigure(0, minsize=100)
@@ -189,7 +583,7 @@ class DataWindow(Entity):
             frame.grid_rowconfigure(i, weight=1)
 
     def _build_field(self, frame, field):
-        self.logger.debug("\t\tBuilding field: {}".format(field[0]))
+        self.logger.debug("\t\tBuilding field: %s", field[0])
         entry = tk.Entry(frame)
         if 'list' in field[0].lower():
             entry = ttk.Combobox(frame, values=[])
@@ -199,14 +593,19 @@ class DataWindow(Entity):
             entry.configure(state=self.window_config['ticket_date_state'])
         if field[0] == 'notes':
             entry = tk.Text(frame, height=5, width=10, wrap=tk.WORD, pady=5, padx=5)
+        # Combobox values are served from the reference cache, opening a window makes no database query
         if field[0] == 'color_name':
-            entry = ttk.Combobox(frame, width=10, values=[c[1].upper() for c in self.database.fetch_colors()])
+            entry = ttk.Combobox(frame, width=10,
+                                 values=[c.upper() for c in self.database.get_reference_names('colors')])
         if field[0] == 'brand_name':
-            entry = ttk.Combobox(frame, width=10, values=[b[1].upper() for b in self.database.fetch_brands()])
+            entry = ttk.Combobox(frame, width=10,
+                                 values=[b.upper() for b in self.database.get_reference_names('brands')])
             entry.bind('<<ComboboxSelected>>', self._update_models)
             entry.bind("<Return>", self._update_models)
+            entry.bind('<KeyRelease>', self._complete_brands)
         if field[0] == 'model_name':
             entry = ttk.Combobox(frame, width=10, values=('',))
+            entry.bind('<KeyRelease>', self._complete_models)
         if 'error' in field[0].lower():
             error_label = tk.Label(frame, text='', fg='red', font=('Arial', 6))
             error_label.grid(row=field[1], column=1, sticky='we', padx=5, pady=(0, 0))
@@ -221,15 +620,34 @@ class DataWindow(Entity):
         if entry:
             self.entries[field[0]] = entry
 
-    def _update_models(self):
+    def _update_models(self, event=None):
         self.logger.debug("Update models")
         self.entries['model_name'].set('')
-        brand = self.entries['brand_name'].get().lower()
-        try:
-            models = [m[0].upper() for m in self.database.fetch_models_from_brand(brand)]
-        except KeyError:
-            models = []
-        self.entries['model_name'].configure(values=models)
+        self._set_models(self.database.get_models_of_brand(self.entries['brand_name'].get()))
+
+    def _set_models(self, models):
+        self.entries['model_name'].configure(values=[m.upper() for m in models])
+
+    def _complete_brands(self, event):
+        """
+        Type-ahead: narrow the brand list to the names starting with the typed text.
+        :param event: Key release event.
+        :return:
+        """
+        if event.keysym in COMPLETION_IGNORED_KEYS:
+            return
+        event.widget.configure(values=[b.upper() for b in
+                                       self.database.get_reference_names('brands', event.widget.get())])
+
+    def _complete_models(self, event):
+        """
+        Type-ahead: narrow the model list of the selected brand to the names starting with the typed text.
+        :param event: Key release event.
+        :return:
+        """
+        if event.keysym in COMPLETION_IGNORED_KEYS:
+            return
+        self._set_models(self.database.get_models_of_brand(self.entries['brand_name'].get(), event.widget.get()))
 
     def _build_notes_section(self):
         pass
@@ -253,45 +671,28 @@ class DataWindow(Entity):
     # ===================================================
     def validate(self, value, entry):
         """
-        Validate entry value.
+        Validate entry value with the precompiled rules, see validation.py.
         If entry is optional and is empty, treat it as correct
-        If entry is out of two lists it should not be validated so return True
+        If entry has no rule it should not be validated so return True
         :param value:
         :param entry:
         :return: bool (True, False) as a _validate(value, entry) result
         """
-        self.logger.info('* Validating data')
-        necessary_entries = ['last_name', 'phone', 'brand_name']
-        optional_entries = ['vin', 'year', 'email']
-
-        self.logger.debug(f'\tValidating entry \'{entry}\' with value \'{value}\'')
-
-        if entry not in necessary_entries + optional_entries:
-            return True
+        self.logger.debug('\tValidating entry \'%s\' with value \'%s\'', entry, value)
 
-        if entry in optional_entries and (not value or value == ''):
+        if entry not in VALIDATOR.fields:
             return True
 
         return self._validate(value, entry)
 
     def _validate(self, value, entry):
         """
-        Validate value under entry pattern
+        Validate value under entry pattern and show or clear the error message
         :param value: entry value
         :param entry: entry name
         :return: bool
         """
-        # TODO: Move requirements to config file
-        _type = {
-            'vin': r'^[A-HJ-NPR-Z0-9]{17}$',
-            'email': r'^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$',
-            'year': r'^[0-9]{4}$',
-            'phone': r'^[0-9]{9}$',
-            'brand_name': r'^[a-zA-Z0-9 ]+$',
-            'last_name': r'^[a-zA-Z]{2,}$'
-        }
-
-        if not re.match(_type[entry], value):
+        if not VALIDATOR.validate(entry, value):
             return self._set_data_invalid_msg(entry)
 
         self._set_data_invalid_msg(entry, clear=True)
@@ -333,34 +734,214 @@ class DataWindow(Entity):
     def save_data(self):
         pass
 
+    # ===================================================
+    # Reuse
+    # ===================================================
+    def reopen(self, *args):
+        """
+        Show a pooled window again with new data, see WindowPool.
+        :param args: Arguments of rehydrate(), e.g. ID of the edited item.
+        :return:
+        """
+        self.date = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self._set_window_position()
+        self.window.geometry(self.window_config['window_position'])
+        self.reset()
+        self._refresh_reference_data()
+        self.rehydrate(*args)
+        self.window.deiconify()
+        self.window.lift()
+        self.window.focus_set()
+
+    def reset(self):
+        """
+        Clear entries and error messages and reload combobox lists, leaving the window as if it was just built.
+        :return:
+        """
+        for name, entry in self.entries.items():
+            state = str(entry.cget('state'))
+            entry.configure(state='normal')
+            if isinstance(entry, tk.Text):
+                entry.delete('1.0', tk.END)
+            else:
+                entry.delete(0, tk.END)
+            if name == 'date_creation' and not self.window_config['title'] == 'edit_ticket':
+                entry.insert(0, self.date)
+            entry.configure(state=state)
+        for label in self.error_labels.values():
+            label.config(text='')
+        self._set_reference_values()
+        if 'model_name' in self.entries:
+            self.entries['model_name'].configure(values=('',))
+
+    def _refresh_reference_data(self):
+        """
+        Check brands, models and colors for changes on the database worker thread,
+        the combobox lists are reloaded when they were changed.
+        :return:
+        """
+        self.database.refresh_reference_data_async(callback=self._current(self._on_reference_data))
+
+    def _on_reference_data(self, reloaded):
+        if not reloaded:
+            return
+        self._set_reference_values()
+        if 'model_name' in self.entries and self.entries['brand_name'].get():
+            self._set_models(self.database.get_models_of_brand(self.entries['brand_name'].get()))
+
+    def _set_reference_values(self):
+        if 'color_name' in self.entries:
+            self.entries['color_name'].configure(
+                values=[c.upper() for c in self.database.get_reference_names('colors')])
+        if 'brand_name' in self.entries:
+            self.entries['brand_name'].configure(
+                values=[b.upper() for b in self.database.get_reference_names('brands')])
+
+    def rehydrate(self, *args):
+        """
+        Fill the entries of a new or reset window, overridden by the window types.
+        :param args: Window type specific, e.g. ID of the edited item.
+        :return:
+        """
+        pass
+
+    def _current(self, callback):
+        """
+        Wrap a callback of a database call, so it is skipped if the window was closed and reopened in the meantime.
+        :param callback: Callable called with the result of the database call.
+        :return:
+        """
+        session = self._session
+
+        def _callback(result):
+            if session == self._session:
+                callback(result)
+        return _callback
+
     def quit_window(self):
         self.logger.info('* Closing window')
-        self.window.destroy()
+        self._session += 1
+        if self.pool:
+            self.pool.release(self)
+        else:
+            self.window.destroy()
 
 
 class TicketTreeview(Treeview):
+    # Status filter -> tickets.status value (1 is not done)
+    STATUSES = {'all': None, 'open': 1, 'closed': 0}
+    PERIODS = ('all', 'today', 'this_week', 'this_month')
+
     def __init__(self, tab, column, name, parent):
+        self.filter_entries = {}
         super().__init__(tab, column, name, parent)
 
+    def _init_treeview(self):
+        self._init_filter_bar()
+        super()._init_treeview()
+
+    def _init_filter_bar(self):
+        self.logger.debug("\tInitializing filter bar...")
+        frame = tk.Frame(self.tab)
+        frame.pack(side=tk.TOP, fill=tk.X, pady=(0, 5))
+
+        tk.Label(frame, text=self._lang('status')).pack(side=tk.LEFT, padx=(0, 5))
+        status = ttk.Combobox(frame, state='readonly', width=12, values=[self._lang(s) for s in self.STATUSES])
+        status.current(0)
+        status.pack(side=tk.LEFT, padx=(0, 10))
+
+        tk.Label(frame, text=self._lang('period')).pack(side=tk.LEFT, padx=(0, 5))
+        period = ttk.Combobox(frame, state='readonly', width=12, values=[self._lang(p) for p in self.PERIODS])
+        period.current(0)
+        period.bind('<<ComboboxSelected>>', self._on_period_selected)
+        period.pack(side=tk.LEFT, padx=(0, 10))
+
+        self.filter_entries = {'status': status, 'period': period}
+        for name, width in (('date_from', 11), ('date_to', 11), ('customer', 20)):
+            tk.Label(frame, text=self._lang(name)).pack(side=tk.LEFT, padx=(0, 5))
+            entry = ttk.Entry(frame, width=width)
+            entry.bind('<Return>', self.apply_filter)
+            entry.pack(side=tk.LEFT, padx=(0, 10))
+            self.filter_entries[name] = entry
+
+        ttk.Button(frame, text=self._lang('filter'), command=self.apply_filter).pack(side=tk.LEFT)
+        ttk.Button(frame, text=self._lang('clear_filter'), command=self.clear_filter).pack(side=tk.LEFT, padx=5)
+
+    @staticmethod
+    def period_range(period, today=None):
+        """
+        Get the first and the last day of a period.
+        :param period: One of PERIODS.
+        :param today: Reference day, default today.
+        :return: Tuple of datetime.date (start, end), (None, None) for 'all'.
+        """
+        today = today or datetime.date.today()
+        if period == 'today':
+            return today, today
+        if period == 'this_week':
+            start = today - datetime.timedelta(days=today.weekday())
+            return start, start + datetime.timedelta(days=6)
+        if period == 'this_month':
+            start = today.replace(day=1)
+            return start, (start + datetime.timedelta(days=32)).replace(day=1) - datetime.timedelta(days=1)
+        return None, None
+
+    def _on_period_selected(self, event=None):
+        start, end = self.period_range(self.PERIODS[self.filter_entries['period'].current()])
+        for name, day in (('date_from', start), ('date_to', end)):
+            self.filter_entries[name].delete(0, tk.END)
+            if day:
+                self.filter_entries[name].insert(0, day.isoformat())
+        self.apply_filter()
+
+    def _get_filter_date(self, name):
+        value = self.filter_entries[name].get().strip()
+        return datetime.date.fromisoformat(value) if value else None
+
+    def build_filter(self):
+        """
+        Build a filter from the filter bar, e.g. open tickets created this week.
+        :return: Filter object or None if nothing is filtered.
+        :raises ValueError: If a date is not in the YYYY-MM-DD format.
+        """
+        status = self.STATUSES[list(self.STATUSES)[self.filter_entries['status'].current()]]
+        return ticket_filter(status, self._get_filter_date('date_from'), self._get_filter_date('date_to'),
+                             self.filter_entries['customer'].get())
+
+    def apply_filter(self, event=None):
+        try:
+            self.filter = self.build_filter()
+        except ValueError:
+            popup('error', self._lang('error'), self._lang('date_invalid'))
+            return
+        self.logger.debug("\tFiltering tickets: %s", self.filter)
+        self.populate_treeview()
+
+    def clear_filter(self):
+        self.filter_entries['status'].current(0)
+        self.filter_entries['period'].current(0)
+        for name in ('date_from', 'date_to', 'customer'):
+            self.filter_entries[name].delete(0, tk.END)
+        self.filter = None
+        self.populate_treeview()
+
     def edit_row(self, event=None):
-        selected_item = self.treeview.selection()
+        selected_item = self.selected_item()
         if selected_item:
-            self.logger.debug(f"\tEditing row {self.treeview.selection()}...")
-            self.logger.debug(f"\t\tSelected item: {selected_item}")
-            self.logger.debug(f"\t\tEditing item {selected_item}...")
+            self.logger.debug("\tEditing row %s...", self.treeview.selection())
+            self.logger.debug("\t\tSelected item: %s", selected_item)
+            self.logger.debug("\t\tEditing item %s...", selected_item)
             ticket_id = self.treeview.item(selected_item)["values"][0]
-            self.logger.debug(f"\t\t\tTicket ID: {ticket_id}")
-            EditTicketWindow(self.parent, ticket_id)
+            self.logger.debug("\t\t\tTicket ID: %s", ticket_id)
+            self.parent.windows.open(EditTicketWindow, ticket_id)
 
     def change_status(self, event=None):
-
-        ticket_id = self.treeview.item(self.treeview.selection())["values"][0]
-        if ticket_id:
-            current_ticket_status = self.database.get_item_from_id('tickets', ticket_id, columns='status')
-            status = 0 if bool(current_ticket_status['status']) else 1
-
-            self.database.update_ticket({'id': ticket_id, 'status': status})
-        self.populate_treeview()
+        selected_item = self.selected_item()
+        if not selected_item:
+            return
+        # All selected tickets get the status opposite to the clicked one, mixed selections end up the same
+        status = 0 if int(self.treeview.item(selected_item)['values'][-1]) else 1
+        self.database.set_tickets_status_async(self.selected_ids(), status, callback=lambda _: self.sync_treeview())
 
 
 class CustomerTreeview(Treeview):
@@ -368,14 +949,14 @@ class CustomerTreeview(Treeview):
         super().__init__(tab, column, name, parent)
 
     def edit_row(self, event=None):
-        selected_item = self.treeview.selection()
+        selected_item = self.selected_item()
         if selected_item:
-            self.logger.debug(f"\tEditing row {self.treeview.selection()}...")
-            self.logger.debug(f"\t\tSelected item: {selected_item}")
-            self.logger.debug(f"\t\tEditing item {selected_item}...")
+            self.logger.debug("\tEditing row %s...", self.treeview.selection())
+            self.logger.debug("\t\tSelected item: %s", selected_item)
+            self.logger.debug("\t\tEditing item %s...", selected_item)
             customer_id = self.treeview.item(selected_item)["values"][0]
-            self.logger.debug(f"\t\t\tCustomer ID: {customer_id}")
-            EditCustomerWindow(self.parent, customer_id)
+            self.logger.debug("\t\t\tCustomer ID: %s", customer_id)
+            self.parent.windows.open(EditCustomerWindow, customer_id)
 
 
 class CarTreeview(Treeview):
@@ -383,14 +964,14 @@ class CarTreeview(Treeview):
         super().__init__(tab, column, name, parent)
 
     def edit_row(self, event=None):
-        selected_item = self.treeview.selection()
+        selected_item = self.selected_item()
         if selected_item:
-            self.logger.debug(f"\tEditing row {self.treeview.selection()}...")
-            self.logger.debug(f"\t\tSelected item: {selected_item}")
-            self.logger.debug(f"\t\tEditing item {selected_item}...")
+            self.logger.debug("\tEditing row %s...", self.treeview.selection())
+            self.logger.debug("\t\tSelected item: %s", selected_item)
+            self.logger.debug("\t\tEditing item %s...", selected_item)
             car_id = self.treeview.item(selected_item)["values"][0]
-            self.logger.debug(f"\t\t\tCar ID: {car_id}")
-            EditCarWindow(self.parent, car_id)
+            self.logger.debug("\t\t\tCar ID: %s", car_id)
+            self.parent.windows.open(EditCarWindow, car_id)
 
 
 class TreeViewSelector:
@@ -414,8 +995,8 @@ class TreeViewSelector:
 
 
 class NewTicketWindow(DataWindow):
-    def __init__(self, parent):
-        super().__init__(parent, WINDOWS_SETTINGS['ticket_window'])
+    def __init__(self, parent, pool=None):
+        super().__init__(parent, WINDOWS_SETTINGS['ticket_window'], pool)
         self.logger.info('NewTicketWindow created')
         self.data_type = 'tickets'
 
@@ -423,63 +1004,59 @@ class NewTicketWindow(DataWindow):
         data = self.get_data_from_entries()
         if not data:
             return
-        # Set ticket status to 1 as it is not processed yet
-        status = 1
-        customer = Customer({
-            'first_name': data.get('first_name', '').lower(),
-            'last_name': data.get('last_name', '').lower(),
-            'phone':  data.get('phone', '').lower(),
-            'email':  data.get('email', '').lower()
-        }, self.database)
-        customer.add()
-
-        car = Car({
-            'brand_id': self.database.get_item_from_name('brands', data.get('brand_name').lower()),
-            'model_id': self.database.get_item_from_name('models', data.get('model_name').lower()),
-            'vin': data.get('vin', ''),
-            'year': data.get('year', ''),
-            'color_id': self.database.get_item_from_name('colors', data.get('color_name').lower()),
-            'customer_id': customer.get_id(),
-        }, self.database)
-        car.add()
-
-        ticket = Ticket({
-            'customer_id': customer.get_id(),
-            'car_id': car.get_id(),
-            'date_creation': data.get('date_creation'),
-            'date_modification': data.get('date_modification'),
-            'notes': data.get('notes', ''),
-            'status': status,
-        }, self.database)
-        ticket.add()
+        self.database.submit(self._create_ticket, data, callback=self._current(self._on_ticket_created),
+                             errback=self._current(self._on_save_failed))
 
+    @staticmethod
+    def _create_ticket(database, data):
+        """
+        Save customer, car and ticket, runs on the database worker thread.
+        :param database: DBProcessor of the worker thread.
+        :param data: Data collected from entries.
+        :return: ID of the new ticket.
+        """
+        return TicketService(database).create(data)
+
+    def _on_ticket_created(self, ticket_id):
         self.quit_window()
         self.parent.update_treeviews()
-        if ticket.get_id():
-            popup('info', 'Success', self._lang(f'Ticket {ticket.get_id()} created'))
-        else:
-            popup('error', 'Error', "Ticket could not be created!")
+        popup('info', 'Success', self._lang(f'Ticket {ticket_id} created'))
+
+    def _on_save_failed(self, error):
+        self.logger.error(f"Ticket could not be created, changes rolled back: {error!r}")
+        # ValueError of the services explains what has to be corrected, e.g. an unknown brand
+        popup('error', 'Error', f"Ticket could not be created!\n{error}" if isinstance(error, ValueError)
+              else "Ticket could not be created!")
 
 
 class EditTicketWindow(DataWindow):
-    def __init__(self, parent, ticket):
-        super().__init__(parent, WINDOWS_SETTINGS['edit_ticket_window'])
+    def __init__(self, parent, ticket, pool=None):
+        super().__init__(parent, WINDOWS_SETTINGS['edit_ticket_window'], pool)
         self.logger.info('EditTicketWindow created')
         self.data = None
         self.car = None
         self.customer = None
+        self.ticket = None
+        self.rehydrate(ticket)
+
+    def rehydrate(self, ticket):
         self.ticket = ticket
+        # Loaded by _read_ticket_data, the window cannot be saved until then
+        self.data = None
+        self.car = None
+        self.customer = None
         self._read_ticket_data()
 
     def _read_ticket_data(self):
-        # TODO: This should be moved and refactored
-        self.data = self.database.get_item_from_id('tickets', self.ticket)
-        if not self.data:
+        self.database.submit(TicketDAO.load, self.ticket, callback=self._current(self._on_ticket_loaded))
+
+    def _on_ticket_loaded(self, ticket):
+        if not ticket:
             self.logger.warning(f'Gathering data failed, empty dict')
             return
-        ticket = TicketDAO(self.data, self.database)
-        self.customer = CustomerDAO(self.data, self.database)
-        self.car = CarDAO(self.data, self.database)
+        self.data = ticket
+        self.customer = ticket.customer
+        self.car = ticket.car
 
         self.entries['date_creation'].configure(state='normal')
         self.entries['date_creation'].insert(0, ticket.date_creation)
@@ -491,152 +1068,145 @@ class EditTicketWindow(DataWindow):
         self.entries['phone'].insert(0, self.customer.collected_data['phone'])
         self.entries['email'].insert(0, self.customer.collected_data['email'].upper())
 
-        self.entries['brand_name'].insert(0, self.database.get_item_from_id('brands',
-                                                                            self.car.collected_data['brand_id']
-                                                                            )['name'].upper())
+        self.entries['brand_name'].insert(0, (self.car.collected_data['brand_name'] or '').upper())
         self._update_models()
-        self.entries['model_name'].insert(0, self.database.get_item_from_id('models',
-                                                                            self.car.collected_data['model_id']
-                                                                            )['name'].upper())
+        self.entries['model_name'].insert(0, (self.car.collected_data['model_name'] or '').upper())
         self.entries['year'].insert(0, self.car.collected_data['year'])
-        self.entries['color_name'].insert(0, self.database.get_item_from_id('colors',
-                                                                            self.car.collected_data['color_id']
-                                                                            )['name'].upper())
+        self.entries['color_name'].insert(0, (self.car.collected_data['color_name'] or '').upper())
         self.entries['vin'].insert(0, self.car.collected_data['vin'].upper())
 
         self.entries['notes'].insert(tk.END, ticket.notes)
 
     def save_data(self):
         # TODO: Remove duplicated code (compare this to other functions - save_data)
+        if not self.data:
+            return
         data = self.get_data_from_entries()
         if not data:
             return
-        customer = Customer({
-            'id': self.customer.id,
-            'first_name': data.get('first_name', '').lower(),
-            'last_name': data.get('last_name', '').lower(),
-            'phone':  data.get('phone', ''),
-            'email':  data.get('email', '').lower(),
-        }, self.database)
-        customer.update()
-
-        car = Car({
-            'id': self.car.id,
-            'brand_id': self.database.get_item_from_name('brands', data.get('brand_name')),
-            'model_id': self.database.get_item_from_name('models', data.get('model_name')),
-            'vin': data.get('vin', ''),
-            'year': data.get('year', ''),
-            'color_id': self.database.get_item_from_name('colors', data.get('color_name')),
-            'customer_id': customer.get_id(),
-        }, self.database)
-        car.update()
-
-        ticket = Ticket({
-            'id': self.ticket,
-            'customer_id': customer.get_id(),
-            'car_id': car.get_id(),
-            'date_creation': data.get('date_creation'),
-            'date_modification': data.get('date_modification'),
-            'notes': data.get('notes', ''),
-            'status': data.get('status')
-        }, self.database)
-        ticket.update()
+        self.database.submit(self._update_ticket, data, self.ticket, self.customer.id, self.car.id,
+                             callback=self._current(self._on_ticket_updated),
+                             errback=self._current(self._on_save_failed))
+
+    @staticmethod
+    def _update_ticket(database, data, ticket_id, customer_id, car_id):
+        """
+        Update customer, car and ticket, runs on the database worker thread.
+        :param database: DBProcessor of the worker thread.
+        :param data: Data collected from entries.
+        :param ticket_id: ID of the ticket.
+        :param customer_id: ID of the ticket customer.
+        :param car_id: ID of the ticket car.
+        :return:
+        """
+        TicketService(database).update(ticket_id, data, customer_id, car_id)
 
+    def _on_ticket_updated(self, _):
         self.quit_window()
         self.parent.update_treeviews()
         popup('info', 'Success', self._lang(f'Ticket {self.ticket} updated'))
 
+    def _on_save_failed(self, error):
+        self.logger.error(f"Ticket {self.ticket} could not be updated, changes rolled back: {error!r}")
+        popup('error', 'Error', f"Ticket {self.ticket} could not be updated!\n{error}"
+              if isinstance(error, ValueError) else f"Ticket {self.ticket} could not be updated!")
+
 
 class EditCustomerWindow(DataWindow):
-    def __init__(self, parent, customer_id):
-        super().__init__(parent, WINDOWS_SETTINGS['edit_customer_window'])
+    def __init__(self, parent, customer_id, pool=None):
+        super().__init__(parent, WINDOWS_SETTINGS['edit_customer_window'], pool)
         self.logger.info('EditCustomerWindow created')
-        self.customer_id = customer_id
+        self.customer_id = None
+        self.rehydrate(customer_id)
 
+    def rehydrate(self, customer_id):
+        self.customer_id = customer_id
         self._read_customer_data()
 
-    def _get_customer_cars(self):
-        # FIXME: Maybe we should create a separate function for this?
-        customer_cars = self.database.fetch_all_join('cars',
-                                                     columns='brands.id AS brand_id, models.id AS model_id',
-                                                     join='''
-                                                     brands
-                                                     ON cars.brand_id = brands.id
-                                                     LEFT JOIN models
-                                                     ON cars.model_id = models.id
-                                                     LEFT JOIN colors
-                                                     ON cars.color_id = colors.id
-                                                     ''',
-                                                     where=f'customer_id = {self.customer_id}',
-                                                     dictionary=True)
+    def reset(self):
+        super().reset()
+        self.entries['car_list'].configure(values=[])
+
+    @staticmethod
+    def _get_customer_cars(customer):
         customer_car_info = [
-            (f"{self.database.get_item_from_id('brands', brand['brand_id'])['name'].upper()}"
-             f" {self.database.get_item_from_id('models', brand['model_id'])['name'].upper()}")
-            for brand in customer_cars
+            (f"{(car.collected_data['brand_name'] or '').upper()}"
+             f" {(car.collected_data['model_name'] or '').upper()}")
+            for car in customer.cars
         ]
         return customer_car_info
 
     def _read_customer_data(self):
         self.logger.info(f'* Read customer data with customer ID: {self.customer_id}')
-        customer_data = self.database.get_item_from_id('customers', self.customer_id)
-        if not customer_data:
+        self.database.submit(CustomerDAO.load, self.customer_id, callback=self._current(self._on_customer_loaded))
+
+    def _on_customer_loaded(self, customer):
+        if not customer:
             self.logger.warning(f'Gathering data failed, empty dict')
             return
-        self.logger.debug(f"Customer data: {customer_data}")
+        customer_data = customer.collected_data
+        self.logger.debug("Customer data: %s", customer_data)
         self.entries['first_name'].insert(0, customer_data['first_name'].capitalize())
         self.entries['last_name'].insert(0, customer_data['last_name'].capitalize())
         self.entries['email'].insert(0, customer_data['email'].upper())
         self.entries['phone'].insert(0, customer_data['phone'])
 
-        self.entries['car_list'].configure(values=self._get_customer_cars())
+        self.entries['car_list'].configure(values=self._get_customer_cars(customer))
 
     def save_data(self):
         data = self.get_data_from_entries()
         if not data:
             return
 
-        # Update customer data
-        customer = {
-            'id': self.customer_id,
-            'first_name': data.get('first_name', '').lower(),
-            'last_name': data.get('last_name').lower(),
-            'email': data.get('email', '').lower(),
-            'phone': data.get('phone'),
-        }
-        self.logger.debug(f"Customer data: {customer}")
-        self.database.update_customer(customer)
+        self.logger.debug("Customer data: %s", data)
+        self.database.submit(self._update_customer, self.customer_id, data,
+                             callback=self._current(self._on_customer_updated),
+                             errback=self._current(self._on_save_failed))
+
+    @staticmethod
+    def _update_customer(database, customer_id, data):
+        # Runs on the database worker thread
+        CustomerService(database).update(customer_id, data)
+
+    def _on_customer_updated(self, _):
         self.quit_window()
         popup('info', 'Success', self._lang(f'Customer {self.customer_id} updated'))
         self.parent.update_treeviews()
 
+    def _on_save_failed(self, error):
+        self.logger.error(f"Customer {self.customer_id} could not be updated: {error!r}")
+        popup('error', 'Error', f"Customer {self.customer_id} could not be updated!\n{error}"
+              if isinstance(error, ValueError) else f"Customer {self.customer_id} could not be updated!")
+
 
 class EditCarWindow(DataWindow):
-    def __init__(self, parent, car_id):
-        super().__init__(parent, WINDOWS_SETTINGS['edit_car_window'])
+    def __init__(self, parent, car_id, pool=None):
+        super().__init__(parent, WINDOWS_SETTINGS['edit_car_window'], pool)
         self.logger.info('EditCarWindow created')
-        self.car_id = car_id
+        self.car_id = None
+        self.rehydrate(car_id)
 
+    def rehydrate(self, car_id):
+        self.car_id = car_id
         self._read_car_data()
 
     def _read_car_data(self):
         self.logger.info(f'* Reading data for car with ID: {self.car_id}')
-        car_data = self.database.get_item_from_id('cars', self.car_id)
-        if not car_data:
+        self.database.submit(CarDAO.load, self.car_id, callback=self._current(self._on_car_loaded))
+
+    def _on_car_loaded(self, car):
+        if not car:
             self.logger.warning(f'Gathering data failed, empty dict')
             return
-        self.entries['brand_name'].insert(0, self.database.get_item_from_id('brands',
-                                                                            car_data['brand_id']
-                                                                            )['name'].upper())
+        car_data = car.collected_data
+        self.entries['brand_name'].insert(0, (car_data['brand_name'] or '').upper())
         self._update_models()
-        self.entries['model_name'].insert(0, self.database.get_item_from_id('models',
-                                                                            car_data['model_id']
-                                                                            )['name'].upper())
+        self.entries['model_name'].insert(0, (car_data['model_name'] or '').upper())
         self.entries['year'].insert(0, car_data['year'])
-        self.entries['color_name'].insert(0, self.database.get_item_from_id('colors',
-                                                                            car_data['color_id']
-                                                                            )['name'].upper())
+        self.entries['color_name'].insert(0, (car_data['color_name'] or '').upper())
         self.entries['vin'].insert(0, car_data['vin'])
-        customer_data = self.database.get_item_from_id('customers', car_data['customer_id'])
+        customer_data = car.customer.collected_data
+        self.entries['customer'].config(state='normal')
         self.entries['customer'].insert(0,
                                         (f"{customer_data['first_name'].capitalize()} "
                                          f"{customer_data['last_name'].capitalize()} "
@@ -648,17 +1218,326 @@ class EditCarWindow(DataWindow):
         if not data:
             return
 
-        # Update car data
-        car = {
-            'id': self.car_id,
-            'brand_id': self.database.get_item_from_name('brands', data.get('brand_name')),
-            'model_id': self.database.get_item_from_name('models', data.get('model_name')),
-            'year': data.get('year', ''),
-            'color_id': self.database.get_item_from_name('colors', data.get('color_name')),
-            'vin': data.get('vin', ''),
-        }
-        self.logger.debug(f"Car data: {car}")
-        self.database.update_car(car)
+        self.logger.debug("Car data: %s", data)
+        self.database.submit(self._update_car, self.car_id, data, callback=self._current(self._on_car_updated),
+                             errback=self._current(self._on_save_failed))
+
+    @staticmethod
+    def _update_car(database, car_id, data):
+        # Runs on the database worker thread
+        CustomerService(database).update_car(car_id, data)
+
+    def _on_car_updated(self, _):
         self.quit_window()
         self.parent.update_treeviews()
         popup('info', 'Success', self._lang(f'Car {self.car_id} updated'))
+
+    def _on_save_failed(self, error):
+        self.logger.error(f"Car {self.car_id} could not be updated: {error!r}")
+        popup('error', 'Error', f"Car {self.car_id} could not be updated!\n{error}"
+              if isinstance(error, ValueError) else f"Car {self.car_id} could not be updated!")
+
+
+class WindowPool(Entity):
+    def __init__(self, parent):
+        """
+        Closed data windows are hidden and kept per window type instead of being destroyed,
+        the next window of the same type reuses one of them: it is reset and filled with the new data.
+        E.g. parent.windows.open(EditTicketWindow, ticket_id)
+        :param parent: MainGUI object.
+        """
+        super().__init__()
+        self.parent = parent
+        self.size = self.app_config.get('window_pool', {}).get('size', 2)
+        # {window class: [hidden windows]}
+        self.idle = {}
+
+    def open(self, window_class, *args):
+        """
+        Show a window of the given type, reusing a hidden one if there is any.
+        :param window_class: DataWindow subclass.
+        :param args: Arguments of the window rehydrate(), e.g. ID of the edited item.
+        :return: The window.
+        """
+        idle = self.idle.setdefault(window_class, [])
+        while idle:
+            window = idle.pop()
+            if window.window.winfo_exists():
+                self.logger.debug("\tReusing %s...", window_class.__name__)
+                window.reopen(*args)
+                return window
+        return window_class(self.parent, *args, pool=self)
+
+    def release(self, window):
+        """
+        Hide a closed window to be reused, or destroy it if the pool of its type is full.
+        :param window: DataWindow object.
+        :return:
+        """
+        idle = self.idle.setdefault(type(window), [])
+        if window in idle:
+            return
+        if not window.reusable or len(idle) >= self.size:
+            window.window.destroy()
+            return
+        window.window.withdraw()
+        idle.append(window)
+
+    def clear(self):
+        """
+        Destroy all hidden windows.
+        :return:
+        """
+        for idle in self.idle.values():
+            for window in idle:
+                window.window.destroy()
+        self.idle = {}
+
+
+class SearchBar(Entity):
+    COLUMNS = ['type', 'ID', 'customer', 'phone', 'car', 'vin', 'notes']
+
+    def __init__(self, frame, parent):
+        """
+        Search entry with ranked full-text search results shown as the user types.
+        Searches are debounced and run on the database worker thread, results of outdated searches are discarded.
+        :param frame: Frame the search bar is placed in.
+        :param parent: MainGUI object.
+        """
+        super().__init__()
+        self.frame = frame
+        self.parent = parent
+        self.database = parent.database
+        search_config = self.app_config.get('search', {})
+        self.debounce = search_config.get('debounce', 250)
+        self.min_length = search_config.get('min_length', 2)
+        self.limit = search_config.get('limit', 50)
+        self.candidates = search_config.get('candidates', 1000)
+        self._pending = None
+        self._generation = 0
+        self._init_search_bar()
+
+    def _init_search_bar(self):
+        self.frame.grid_columnconfigure(1, weight=1)
+        tk.Label(self.frame, text=self._lang('search')).grid(row=0, column=0, sticky='w', padx=(0, 5))
+        self.text = tk.StringVar()
+        self.text.trace_add('write', self._on_text_changed)
+        self.entry = ttk.Entry(self.frame, textvariable=self.text)
+        self.entry.grid(row=0, column=1, sticky='ew')
+        self.entry.bind('<Escape>', self.clear)
+        self.entry.bind('<Down>', self._focus_results)
+
+        self.results = ttk.Treeview(self.frame, columns=self.COLUMNS, show='headings', height=8)
+        for column in self.COLUMNS:
+            self.results.column(column, width=30 if column == 'ID' else 100, anchor=tk.W)
+            self.results.heading(column, text=self._lang(column), anchor=tk.CENTER)
+        self.results.grid(row=1, column=0, columnspan=2, sticky='ew', pady=(5, 0))
+        self.results.bind('<Double-Button-1>', self.open_result)
+        self.results.bind('<Return>', self.open_result)
+        self.results.bind('<Escape>', self.clear)
+        # Results are only shown while something is searched
+        self.results.grid_remove()
+
+    def _on_text_changed(self, *args):
+        if self._pending:
+            self.frame.after_cancel(self._pending)
+        self._pending = self.frame.after(self.debounce, self.search)
+
+    def search(self):
+        """
+        Search for the text typed in the entry.
+        :return:
+        """
+        self._pending = None
+        self._generation += 1
+        text = self.text.get().strip()
+        if len(text) < self.min_length:
+            self._show_results([])
+            return
+        generation = self._generation
+        self.logger.debug("\tSearching for '%s'...", text)
+        self.database.search_async(text, limit=self.limit, candidates=self.candidates,
+                                   callback=lambda rows: generation == self._generation and self._show_results(rows))
+
+    def _show_results(self, rows):
+        """
+        Replace the displayed results.
+        :param rows: Rows as returned by DBProcessor.search.
+        :return:
+        """
+        self.results.delete(*self.results.get_children())
+        if not rows:
+            self.results.grid_remove()
+            return
+        for table, item_id, customer, phone, car, vin, notes in rows:
+            self.results.insert('', tk.END, iid=f"{table}:{item_id}",
+                                values=(self._lang(table), item_id, (customer or '').upper(), phone or '',
+                                        (car or '').upper(), (vin or '').upper(), notes or ''))
+        self.results.grid()
+
+    def _focus_results(self, event=None):
+        children = self.results.get_children()
+        if children:
+            self.results.focus_set()
+            self.results.selection_set(children[0])
+            self.results.focus(children[0])
+
+    def open_result(self, event=None):
+        selection = self.results.selection()
+        if not selection:
+            return
+        table, item_id = selection[0].split(':')
+        windows = {
+            'tickets': EditTicketWindow,
+            'customers': EditCustomerWindow,
+            'cars': EditCarWindow
+        }
+        self.logger.info(f"* Opening {table} {item_id} from search results...")
+        self.parent.windows.open(windows[table], int(item_id))
+
+    def clear(self, event=None):
+        self.text.set('')
+        self.entry.focus_set()
+
+
+class ProgressWindow(Entity):
+    # Milliseconds between checks of the worker thread messages
+    POLL_INTERVAL = 100
+
+    def __init__(self, parent, title, task, on_done=None):
+        """
+        Window with a progress bar for a long running task executed on a worker thread.
+        The task is called as task(report) and reports progress with report(done, total),
+        messages are passed to the Tk mainloop through a queue polled with after(), so the UI stays responsive.
+        :param parent: MainGUI object.
+        :param title: Window title (language key).
+        :param task: Callable run on the worker thread, it must not touch Tk widgets.
+        :param on_done: Callable on_done(result, error) called on the mainloop when the task finished.
+        """
+        super().__init__()
+        self.parent = parent
+        self.task = task
+        self.on_done = on_done
+        self.queue = queue.Queue()
+        self._init_window(title)
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        self.window.after(self.POLL_INTERVAL, self._poll)
+
+    def _init_window(self, title):
+        self.window = tk.Toplevel(self.parent.root, padx=10, pady=10)
+        self.window.title(self._lang(title))
+        self.window.resizable(False, False)
+        self.window.transient(self.parent.root)
+        # Window cannot be closed until the task finishes
+        self.window.protocol('WM_DELETE_WINDOW', lambda: None)
+        self.label = tk.Label(self.window, text=self._lang('in_progress'))
+        self.label.grid(row=0, column=0, sticky='w')
+        self.progressbar = ttk.Progressbar(self.window, length=300, mode='determinate')
+        self.progressbar.grid(row=1, column=0, sticky='we', pady=5)
+
+    def _run(self):
+        try:
+            self.queue.put(('done', self.task(self.report), None))
+        except Exception as e:
+            self.logger.exception(f"Task failed: {e}")
+            self.queue.put(('done', None, e))
+
+    def report(self, done, total=None):
+        """
+        Report progress, safe to call from the worker thread.
+        :param done: Number of processed items.
+        :param total: Number of all items if known.
+        :return:
+        """
+        self.queue.put(('progress', done, total))
+
+    def _poll(self):
+        try:
+            while True:
+                message = self.queue.get_nowait()
+                if message[0] == 'progress':
+                    self._set_progress(*message[1:])
+                    continue
+                self.window.destroy()
+                if self.on_done:
+                    self.on_done(*message[1:])
+                return
+        except queue.Empty:
+            pass
+        self.window.after(self.POLL_INTERVAL, self._poll)
+
+    def _set_progress(self, done, total):
+        if total:
+            self.progressbar.configure(maximum=total, value=done)
+            self.label.configure(text=f"{self._lang('in_progress')} {done}/{total}")
+        else:
+            self.progressbar.step()
+            self.label.configure(text=f"{self._lang('in_progress')} {done}")
+
+
+class QueryStatsWindow(Entity):
+    COLUMNS = ('query', 'count', 'mean_ms', 'p95_ms', 'max_ms', 'rows')
+
+    def __init__(self, parent):
+        """
+        Debug window with the query and DBProcessor method statistics and the slow query log of this session,
+        of both the GUI connection and the database worker thread, see database/instrumentation.py.
+        :param parent: MainGUI object.
+        """
+        super().__init__()
+        self.parent = parent
+        self._init_window()
+        self.refresh()
+
+    def _init_window(self):
+        self.window = tk.Toplevel(self.parent.root, padx=10, pady=10)
+        self.window.title(self._lang('query_stats'))
+        self.window.geometry('900x500')
+        self.window.columnconfigure(0, weight=1)
+        self.window.rowconfigure(0, weight=3)
+        self.window.rowconfigure(1, weight=1)
+
+        self.treeview = ttk.Treeview(self.window, columns=self.COLUMNS, show='tree headings')
+        self.treeview.column('#0', width=120, stretch=False)
+        for column in self.COLUMNS:
+            self.treeview.heading(column, text=self._lang(column))
+            self.treeview.column(column, width=500 if column == 'query' else 70, stretch=column == 'query',
+                                 anchor='w' if column == 'query' else 'e')
+        self.treeview.grid(row=0, column=0, sticky='nsew')
+        scrollbar = ttk.Scrollbar(self.window, orient='vertical', command=self.treeview.yview)
+        scrollbar.grid(row=0, column=1, sticky='ns')
+        self.treeview.configure(yscrollcommand=scrollbar.set)
+
+        self.slow_queries = tk.Text(self.window, height=8, wrap='none')
+        self.slow_queries.grid(row=1, column=0, columnspan=2, sticky='nsew', pady=5)
+
+        buttons = tk.Frame(self.window)
+        buttons.grid(row=2, column=0, columnspan=2, sticky='e')
+        tk.Button(buttons, text=self._lang('refresh'), command=self.refresh).grid(row=0, column=0, padx=5)
+        tk.Button(buttons, text=self._lang('reset'), command=self.reset).grid(row=0, column=1, padx=5)
+
+    def refresh(self):
+        """
+        Show the current statistics, the slowest in total first.
+        :return:
+        """
+        snapshot = STATS.snapshot()
+        self.treeview.delete(*self.treeview.get_children())
+        for kind in ('methods', 'queries'):
+            for item in snapshot[kind]:
+                self.treeview.insert('', 'end', text=self._lang(kind), values=(
+                    item['name'], item['count'], item['mean_ms'],
+                    item['p95_ms'], item['max_ms'], item['rows']))
+        self.slow_queries.configure(state='normal')
+        self.slow_queries.delete('1.0', 'end')
+        self.slow_queries.insert('end', f"{self._lang('slow_queries')}:\n")
+        for query in reversed(snapshot['slow_queries']):
+            self.slow_queries.insert('end', f"{query['ms']} ms: {query['sql']}\n")
+            for detail in query['plan'] or ():
+                self.slow_queries.insert('end', f"\t{detail}\n")
+        self.slow_queries.configure(state='disabled')
+
+    def reset(self):
+        STATS.reset()
+        self.refresh()
@@ -122,7 +122,46 @@ LANG = {
         'ask_add_car': 'Czy chcesz dodać nowy pojazd?',
         'delete_item_warning': 'Czy na pewno chcesz usunąć ten element?',
         'delete_item': 'Usuń element',
+        'delete_items_warning': 'Czy na pewno chcesz usunąć zaznaczone elementy ({count})?',
+        'delete_item_in_use': 'Nie można usunąć elementu, jest on powiązany z innymi danymi '
+                              '(np. klient ze zgłoszeniami lub pojazdami).',
         'change_status': 'Zmień status',
-        'settings': 'Opcje'
+        'settings': 'Opcje',
+        'info': 'Informacja',
+        'in_progress': 'Przetwarzanie...',
+        'csv_files': 'Pliki CSV',
+        'sqlite_files': 'Bazy danych SQLite',
+        'jsonl_files': 'Pliki JSON Lines',
+        'export_failed': 'Eksport bazy danych nie powiódł się.',
+        'export_finished': 'Eksport zakończony w {seconds}s.',
+        'import_failed': 'Import bazy danych nie powiódł się.',
+        'import_finished': 'Import zakończony: {customers} klientów, {cars} pojazdów, {tickets} zgłoszeń '
+                           '(pominięto {skipped} rekordów, {invalid} nieprawidłowych) w {seconds}s.',
+        'search': 'Szukaj',
+        'all': 'Wszystkie',
+        'open': 'Otwarte',
+        'closed': 'Zamknięte',
+        'period': 'Okres',
+        'today': 'Dzisiaj',
+        'this_week': 'Ten tydzień',
+        'this_month': 'Ten miesiąc',
+        'date_from': 'Od',
+        'date_to': 'Do',
+        'filter': 'Filtruj',
+        'clear_filter': 'Wyczyść',
+        'date_invalid': 'Nieprawidłowa data, wymagany format RRRR-MM-DD.',
+        'type': 'Typ',
+        'query_stats': 'Statystyki zapytań',
+        'query': 'Zapytanie',
+        'count': 'Liczba',
+        'mean_ms': 'Średnio ms',
+        'p95_ms': 'p95 ms',
+        'max_ms': 'Maks. ms',
+        'rows': 'Wiersze',
+        'methods': 'Metody',
+        'queries': 'Zapytania',
+        'slow_queries': 'Wolne zapytania',
+        'refresh': 'Odśwież',
+        'reset': 'Wyzeruj',
     }
 }
\ No newline at end of file
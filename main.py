@@ -1,18 +1,20 @@
+# Imported first, the startup clock starts before the other imports
+from startup import STARTUP
 from gui import MainGUI
 from database.database_model import DBProcessor
 from misc import Logger
 
 Logger.setup_logging()
+STARTUP.mark('imports')
 
 
 class ZortechApp:
     def __init__(self):
-        # Create main window (layout/GUI)
-        # Connect to database and fetch data
-        # Use data to populate treeview
-        self.database = DBProcessor()
+        # Connect to database, reference data is loaded after the main window is shown
+        # Create main window (layout/GUI), treeviews are populated by the database worker thread
+        self.database = DBProcessor(background=True, preload=False)
+        STARTUP.mark('database_open')
         self.gui = MainGUI(self.database)
-        pass
 
 
 if __name__ == '__main__':
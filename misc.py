@@ -1,5 +1,7 @@
+import atexit
 import logging
-from tkinter import messagebox
+import logging.handlers
+import queue
 from language import LANG
 
 
@@ -7,20 +9,13 @@ class Entity:
     def __init__(self):
         self.app_config = APP_CONFIG
         self.app_lang = self.app_config.get('lang', 'pl')
-        self.logger = Logger.get_logger(self.__class__.__name__)
+        # Named after the module, e.g. 'database.database_model.DBProcessor', so levels can be set per subsystem
+        self.logger = Logger.get_logger(f"{self.__class__.__module__}.{self.__class__.__name__}")
 
     def _lang(self, expression):
         return LANG[self.app_lang].get(expression, expression)
 
 
-def custom_sort_key(x):
-    item = x[0]
-    if item.isdigit():
-        return 0, int(item)
-    else:
-        return 1, item.lower()
-
-
 APP_CONFIG = {
     "version": "0.1",
     "author": "ZORTECH",
@@ -32,6 +27,91 @@ APP_CONFIG = {
         "normal_font": ('Segoe UI', 9),
         "large_font": ('Segoe UI', 12),
     },
+    "treeview": {
+        # Keep only a window of rows in the widget and fetch the rest page by page while scrolling
+        "virtual": True,
+        "page_size": 100,
+        # Maximum number of pages kept in the widget at once
+        "buffer_pages": 3,
+        # Fraction of the scroll range from the edge at which the next page is fetched
+        "prefetch_threshold": 0.1,
+    },
+    "database": {
+        # Connection profile, see Database._apply_connection_profile
+        # WAL lets the treeviews read while a ticket is being saved
+        "journal_mode": "WAL",
+        # Safe with WAL, commits do not wait for fsync of the database file
+        "synchronous": "NORMAL",
+        # Negative value is a size in KiB (16 MiB)
+        "cache_size": -16000,
+        "mmap_size": 64 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "foreign_keys": True,
+        # Milliseconds to wait for a lock held by another connection
+        "busy_timeout": 5000,
+        # Number of prepared statements kept by the sqlite3 module per connection
+        "cached_statements": 256,
+    },
+    "search": {
+        # Milliseconds without typing before the search is run
+        "debounce": 250,
+        # Shorter texts match too many rows to be useful
+        "min_length": 2,
+        "limit": 50,
+        # Only the newest matches are ranked when a text matches more rows
+        "candidates": 1000,
+    },
+    "startup": {
+        # Startup milestones of every run are appended to this JSON Lines file, see startup.py,
+        # a relative path is placed in the directory of the log file
+        "report": "startup_report.jsonl",
+    },
+    "window_pool": {
+        # Closed data windows kept hidden per window type and reused instead of building them again
+        "size": 2,
+    },
+    "logging": {
+        # Records are formatted and written by a background thread, see Logger.setup_logging
+        "file": "zortechapp.log",
+        # The file is rotated at this size, only backup_count old files are kept
+        "max_bytes": 2 * 1024 * 1024,
+        "backup_count": 3,
+        "format": "%(asctime)s - %(levelname)s - %(name)s - %(message)s",
+        # Level of all loggers not listed in "levels"
+        "level": "INFO",
+        "console_level": "WARNING",
+        # Levels per subsystem, logger names are '<module>.<class>', e.g. 'database' covers the whole package
+        # and 'gui_elements.TicketTreeview' a single class. Set one to DEBUG to trace it.
+        "levels": {
+            "database": "WARNING",
+            "gui_elements": "INFO",
+        },
+    },
+    "instrumentation": {
+        # Counts and latencies of the queries and DBProcessor methods, see database/instrumentation.py
+        "enabled": True,
+        # Queries taking at least this many milliseconds go to the slow query log
+        "slow_query_ms": 50,
+        # Log the EXPLAIN QUERY PLAN of slow queries
+        "explain": True,
+        # Number of the latest slow queries kept for the query statistics window
+        "slow_queries_kept": 50,
+    },
+    "validation": {
+        # Rules of the data entered in the windows and optionally of imported records, see validation.py
+        # Fields which have to be filled in
+        "required": ("last_name", "phone", "brand_name"),
+        # Fields checked only when filled in
+        "optional": ("vin", "year", "email"),
+        "patterns": {
+            'vin': r'^[A-HJ-NPR-Z0-9]{17}$',
+            'email': r'^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$',
+            'year': r'^[0-9]{4}$',
+            'phone': r'^[0-9]{9}$',
+            'brand_name': r'^[a-zA-Z0-9 ]+$',
+            'last_name': r'^[a-zA-Z]{2,}$',
+        },
+    },
 }
 
 TICKET_WINDOW_CONFIG = {
@@ -197,24 +277,59 @@ WINDOWS_SETTINGS = {
 
 
 class Logger:
+    # QueueListener writing the records of all threads, None until setup_logging() is called
+    listener = None
+
     @staticmethod
-    def setup_logging():
-        formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(name)s - %(message)s')
+    def setup_logging(config=None):
+        """
+        Log through a queue, so callers only enqueue records and the file and console I/O is done
+        by a background thread. The log file is rotated at config['max_bytes'].
+        :param config: Dictionary as APP_CONFIG['logging'], default APP_CONFIG['logging'].
+        :return: QueueListener object.
+        """
+        config = config or APP_CONFIG['logging']
+        if Logger.listener:
+            Logger.shutdown()
+        formatter = logging.Formatter(config['format'])
 
-        file_handler = logging.FileHandler('zortechapp.log')
-        file_handler.setLevel(logging.DEBUG)
+        file_handler = logging.handlers.RotatingFileHandler(config['file'], maxBytes=config['max_bytes'],
+                                                            backupCount=config['backup_count'], encoding='utf-8')
         file_handler.setFormatter(formatter)
 
         console_handler = logging.StreamHandler()
-        console_handler.setLevel(logging.DEBUG)
+        console_handler.setLevel(config['console_level'])
         console_handler.setFormatter(formatter)
 
+        log_queue = queue.SimpleQueue()
+        Logger.listener = logging.handlers.QueueListener(log_queue, file_handler, console_handler,
+                                                         respect_handler_level=True)
+        Logger.listener.start()
+
         root_logger = logging.getLogger()
-        root_logger.setLevel(logging.DEBUG)
-        root_logger.addHandler(file_handler)
-        root_logger.addHandler(console_handler)
+        for handler in root_logger.handlers[:]:
+            root_logger.removeHandler(handler)
+        root_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+        root_logger.setLevel(config['level'])
+        for name, level in config.get('levels', {}).items():
+            logging.getLogger(name).setLevel(level)
+
+        # Flush the records still in the queue when the application exits
+        atexit.unregister(Logger.shutdown)
+        atexit.register(Logger.shutdown)
+        return Logger.listener
 
-        root_logger.propagate = False
+    @staticmethod
+    def shutdown():
+        """
+        Write the queued records and stop the listener thread.
+        :return:
+        """
+        if Logger.listener:
+            Logger.listener.stop()
+            for handler in Logger.listener.handlers:
+                handler.close()
+            Logger.listener = None
 
     @staticmethod
     def get_logger(name):
@@ -222,6 +337,8 @@ class Logger:
 
 
 def popup(m_type, title, msg):
+    # Imported on first use, so headless code (services, CLI) does not load Tk
+    from tkinter import messagebox
     _type = {
         'info': messagebox.showinfo,
         'warning': messagebox.showwarning,
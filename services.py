@@ -0,0 +1,306 @@
+import datetime
+from database.query import Filter
+from entities import Car, Customer, Ticket, CarDAO, CustomerDAO, TicketDAO
+from misc import Entity
+from validation import VALIDATOR
+
+# Ticket status -> tickets.status value (1 is not done)
+TICKET_STATUSES = {'open': 1, 'closed': 0}
+
+
+def ticket_filter(status=None, start=None, end=None, customer=''):
+    """
+    Build a filter of the tickets listing.
+    :param status: tickets.status value, None for all tickets.
+    :param start: First day of the creation date range, datetime.date or None.
+    :param end: Last day of the creation date range, included, datetime.date or None.
+    :param customer: Prefix of the customer last name, first name or phone.
+    :return: Filter object or None if nothing is filtered.
+    """
+    _filter = Filter()
+    if status is not None:
+        _filter = _filter.equals('tickets.status', status)
+    # Creation dates are stored as 'YYYY-MM-DD HH:MM:SS', the end day is included
+    _filter = _filter.between('tickets.date_creation',
+                              start.isoformat() if start else None,
+                              (end + datetime.timedelta(days=1)).isoformat() if end else None)
+    customer = (customer or '').strip().lower()
+    if customer:
+        _filter = _filter.starts_with(('tickets.customer_last_name', 'tickets.customer_first_name',
+                                       'tickets.customer_phone'), customer)
+    return _filter or None
+
+
+def _text(data, key):
+    return (data.get(key) or '').strip()
+
+
+def _reference_id(database, table, name, required=False):
+    """
+    Resolve a brand, model or color name, names unknown to the reference cache after its refresh are errors,
+    a typo must not be saved as a car without a brand.
+    :param database: DBProcessor object.
+    :param table: 'brands', 'models' or 'colors'.
+    :param name: Name entered by the user.
+    :param required: An empty name is an error as well, otherwise it is stored as NULL.
+    :return: ID or None if name is empty.
+    :raises ValueError: If the name is unknown, or empty and required.
+    """
+    if not name:
+        if required:
+            raise ValueError(f"Missing {table[:-1]}")
+        return None
+    item_id = database.get_item_from_name(table, name)
+    if item_id is None:
+        raise ValueError(f"Unknown {table[:-1]} '{name}'")
+    return item_id
+
+
+def _car_references(database, data):
+    """
+    :param database: DBProcessor object.
+    :param data: Dictionary with brand_name, model_name and color_name.
+    :return: Dictionary with brand_id, model_id and color_id.
+    :raises ValueError: If the brand is missing, one of the names is unknown or the model is not one of the brand.
+    """
+    brand_name = _text(data, 'brand_name')
+    brand_id = _reference_id(database, 'brands', brand_name, required=True)
+    model_name = _text(data, 'model_name')
+    model_id = None
+    if model_name:
+        # Models are looked up within the brand, a known model of another brand is an error as well
+        model_id = database.get_model_id(brand_id, model_name)
+        if model_id is None:
+            raise ValueError(f"Unknown model '{model_name}' of brand '{brand_name}'")
+    return {
+        'brand_id': brand_id,
+        'model_id': model_id,
+        'color_id': _reference_id(database, 'colors', _text(data, 'color_name')),
+    }
+
+
+class TicketService(Entity):
+    def __init__(self, database):
+        """
+        Tickets use cases without any GUI, used by the windows, the CLI and scripts.
+        E.g. TicketService(DBProcessor()).create({'last_name': 'kowalski', 'phone': '500100200', ...})
+        :param database: DBProcessor object, the one of the worker thread when called from the GUI.
+        """
+        super().__init__()
+        self.database = database
+
+    @staticmethod
+    def validate(data):
+        """
+        :param data: Dictionary of ticket window field names and values.
+        :raises ValueError: If some of the fields are invalid.
+        """
+        invalid = VALIDATOR.invalid_fields(data)
+        if invalid:
+            raise ValueError(f"Invalid {', '.join(invalid)}")
+
+    def create(self, data):
+        """
+        Save customer, car and ticket in one atomic commit, existing customer and car are reused.
+        :param data: Dictionary of ticket window field names and values, e.g. last_name, brand_name, notes.
+        :return: ID of the new ticket.
+        :raises ValueError: If the brand is missing or a brand, model or color name is unknown.
+        """
+        # Set ticket status to 1 as it is not processed yet
+        status = data.get('status', 1)
+        # Resolved before anything is written
+        references = _car_references(self.database, data)
+        with self.database.transaction():
+            customer = Customer({
+                'first_name': _text(data, 'first_name').lower(),
+                'last_name': _text(data, 'last_name').lower(),
+                'phone': _text(data, 'phone').lower(),
+                'email': _text(data, 'email').lower()
+            }, self.database)
+            customer.add()
+
+            car = Car({
+                **references,
+                'vin': _text(data, 'vin'),
+                'year': _text(data, 'year'),
+                'customer_id': customer.get_id(),
+            }, self.database)
+            car.add()
+
+            ticket = Ticket({
+                'customer_id': customer.get_id(),
+                'car_id': car.get_id(),
+                'date_creation': data.get('date_creation') or
+                datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'date_modification': data.get('date_modification'),
+                'notes': data.get('notes', ''),
+                'status': status,
+            }, self.database)
+            ticket.add()
+        self.logger.info(f"* Ticket {ticket.id} created")
+        return ticket.id
+
+    def create_many(self, records, validate=True):
+        """
+        Create tickets in one transaction, either all of them are saved or none.
+        :param records: Iterable of dictionaries as passed to create().
+        :param validate: Check all records before anything is saved.
+        :return: List of IDs of the new tickets.
+        :raises ValueError: If some of the records are invalid, with their positions.
+        """
+        records = list(records)
+        if validate:
+            errors = VALIDATOR.validate_many(records)
+            if errors:
+                raise ValueError('; '.join(f"record {index + 1}: invalid {', '.join(fields)}"
+                                           for index, fields in errors))
+        with self.database.transaction():
+            return [self.create(record) for record in records]
+
+    def update(self, ticket_id, data, customer_id=None, car_id=None):
+        """
+        Update ticket with its customer and car in one atomic commit.
+        :param ticket_id: ID of the ticket.
+        :param data: Dictionary of ticket window field names and values.
+        :param customer_id: ID of the ticket customer, default the current one.
+        :param car_id: ID of the ticket car, default the current one.
+        :return:
+        :raises ValueError: If there is no such ticket, the brand is missing or a brand, model or color name is unknown.
+        """
+        current = None
+        if customer_id is None or car_id is None or data.get('status') is None:
+            current = self.database.get_item_from_id('tickets', ticket_id)
+            if not current:
+                raise ValueError(f"Ticket {ticket_id} does not exist")
+        references = _car_references(self.database, data)
+        with self.database.transaction():
+            customer = Customer({
+                'id': customer_id if customer_id is not None else current['customer_id'],
+                'first_name': _text(data, 'first_name').lower(),
+                'last_name': _text(data, 'last_name').lower(),
+                'phone': _text(data, 'phone'),
+                'email': _text(data, 'email').lower(),
+            }, self.database)
+            customer.update()
+
+            car = Car({
+                'id': car_id if car_id is not None else current['car_id'],
+                **references,
+                'vin': _text(data, 'vin'),
+                'year': _text(data, 'year'),
+                'customer_id': customer.get_id(),
+            }, self.database)
+            car.update()
+
+            ticket = Ticket({
+                'id': ticket_id,
+                'customer_id': customer.get_id(),
+                'car_id': car.get_id(),
+                'date_creation': data.get('date_creation'),
+                'date_modification': data.get('date_modification'),
+                'notes': data.get('notes', ''),
+                # The ticket windows have no status field, keep the current one
+                'status': data['status'] if data.get('status') is not None else current['status']
+            }, self.database)
+            ticket.update()
+        self.logger.info(f"* Ticket {ticket_id} updated")
+
+    def get(self, ticket_id):
+        """
+        :param ticket_id: ID of the ticket.
+        :return: TicketDAO with customer and car or None if ticket does not exist.
+        """
+        return TicketDAO.load(self.database, ticket_id)
+
+    def list(self, status=None, start=None, end=None, customer='', limit=None, order_by=None, direction='ASC'):
+        """
+        List tickets as shown in the tickets tab.
+        :param status: 'open', 'closed' or None for all tickets.
+        :param start: First day of the creation date range, datetime.date or None.
+        :param end: Last day of the creation date range, included, datetime.date or None.
+        :param customer: Prefix of the customer last name, first name or phone.
+        :param limit: Maximum number of rows.
+        :param order_by: Treeview column to sort by, default ID.
+        :param direction: 'ASC' or 'DESC'.
+        :return: List of tuples (id, date_creation, customer, car, notes, status)
+        """
+        where = ticket_filter(TICKET_STATUSES[status] if status else None, start, end, customer)
+        return self.database.get_all_items('tickets', where=where, limit=limit, order_by=order_by,
+                                           direction=direction)
+
+    def set_status(self, ticket_ids, status):
+        """
+        :param ticket_ids: IDs of the tickets.
+        :param status: 'open' or 'closed'.
+        :return: Number of updated tickets.
+        """
+        return self.database.set_tickets_status(ticket_ids, TICKET_STATUSES[status])
+
+    def toggle_status(self, ticket_id):
+        """
+        :param ticket_id: ID of the ticket.
+        :return: New status value.
+        """
+        return self.database.toggle_ticket_status(ticket_id)
+
+
+class CustomerService(Entity):
+    def __init__(self, database):
+        """
+        Customers and their cars use cases without any GUI.
+        :param database: DBProcessor object.
+        """
+        super().__init__()
+        self.database = database
+
+    def get(self, customer_id):
+        """
+        :param customer_id: ID of the customer.
+        :return: CustomerDAO with cars or None if customer does not exist.
+        """
+        return CustomerDAO.load(self.database, customer_id)
+
+    def get_car(self, car_id):
+        """
+        :param car_id: ID of the car.
+        :return: CarDAO with its owner or None if car does not exist.
+        """
+        return CarDAO.load(self.database, car_id)
+
+    def update(self, customer_id, data):
+        """
+        :param customer_id: ID of the customer.
+        :param data: Dictionary with first_name, last_name, email and phone.
+        :return:
+        """
+        self.database.update_customer({
+            'id': customer_id,
+            'first_name': _text(data, 'first_name').lower(),
+            'last_name': _text(data, 'last_name').lower(),
+            'email': _text(data, 'email').lower(),
+            'phone': _text(data, 'phone'),
+        })
+
+    def update_car(self, car_id, data):
+        """
+        :param car_id: ID of the car.
+        :param data: Dictionary with brand_name, model_name, color_name, year and vin.
+        :return:
+        :raises ValueError: If the brand is missing or a brand, model or color name is unknown.
+        """
+        self.database.update_car({
+            'id': car_id,
+            **_car_references(self.database, data),
+            'year': _text(data, 'year'),
+            'vin': _text(data, 'vin'),
+        })
+
+    def find(self, text, limit=50):
+        """
+        Full-text search of customers.
+        :param text: Searched text, e.g. beginning of the last name or phone.
+        :param limit: Maximum number of results.
+        :return: List of tuples (id, customer, phone)
+        """
+        return [(item_id, customer, phone) for table, item_id, customer, phone, *_ in
+                self.database.search(text, limit=limit) if table == 'customers']
@@ -0,0 +1,64 @@
+import datetime
+import json
+import logging
+import os
+import sys
+import time
+
+
+class StartupReport:
+    def __init__(self):
+        """
+        Milliseconds from the start of main.py to the startup milestones, e.g. imports done,
+        database opened, first paint. Imported first by main.py, so the clock starts before any other import.
+        """
+        self.start = time.perf_counter()
+        self.marks = {}
+        self.finished = False
+
+    def mark(self, name):
+        """
+        Record a milestone, only the first time it is reached.
+        :param name: Milestone name, e.g. 'first_paint'.
+        :return:
+        """
+        self.marks.setdefault(name, round((time.perf_counter() - self.start) * 1000, 1))
+
+    def report(self):
+        """
+        :return: Dictionary with the application version, build type and the milestones in milliseconds.
+        """
+        from misc import APP_CONFIG
+        return {
+            'version': APP_CONFIG.get('version'),
+            'date': datetime.datetime.now().isoformat(timespec='seconds'),
+            # Built with PyInstaller
+            'frozen': bool(getattr(sys, 'frozen', False)),
+            **self.marks,
+        }
+
+    def finish(self):
+        """
+        Log the report and append it to the JSON Lines file APP_CONFIG['startup']['report'], once.
+        :return:
+        """
+        if self.finished:
+            return
+        self.finished = True
+        from misc import APP_CONFIG
+        report = self.report()
+        logger = logging.getLogger(f"{__name__}.{self.__class__.__name__}")
+        logger.info(f"* Startup: {', '.join(f'{name} {ms} ms' for name, ms in self.marks.items())}")
+        path = APP_CONFIG.get('startup', {}).get('report')
+        if not path:
+            return
+        # Kept with the log file instead of the working directory
+        path = os.path.join(os.path.dirname(os.path.abspath(APP_CONFIG['logging']['file'])), path)
+        try:
+            with open(path, 'a', encoding='utf-8') as _file:
+                _file.write(json.dumps(report) + '\n')
+        except OSError as e:
+            logger.warning(f"Startup report could not be saved: {e}")
+
+
+STARTUP = StartupReport()
@@ -0,0 +1,99 @@
+"""
+Run from the repository root:
+    python -m pytest tests
+"""
+import csv
+import unittest
+from benchmarks.synthetic import scratch_directory
+from database.database import Database
+from database.importer import IMPORT_COLUMNS, Importer
+from validation import VALIDATOR
+
+RECORD = {'first_name': 'Jan', 'last_name': 'Kowalski', 'phone': '500100200', 'email': 'jan@example.com',
+          'brand_name': 'Audi', 'model_name': 'A4', 'color_name': 'black', 'year': '2010', 'vin': '',
+          'date_creation': '2024-01-02 10:00:00', 'notes': 'AC check', 'status': '1'}
+
+
+class ImporterTest(unittest.TestCase):
+    def setUp(self):
+        scratch = scratch_directory()
+        scratch.__enter__()
+        self.addCleanup(scratch.__exit__, None, None, None)
+        self.database = Database('database/zortech_database.db')
+        self.addCleanup(self.database.close)
+
+    def count(self, table):
+        return self.database.fetch_one(f"SELECT COUNT(*) FROM {table}")[0]
+
+    def test_customers_and_cars_are_deduplicated(self):
+        stats = Importer(self.database, chunk_size=2).run([
+            RECORD,
+            # Same customer in another case and with surrounding spaces, same brand: one more ticket only
+            dict(RECORD, last_name=' KOWALSKI ', notes='odgrzybianie'),
+            # Same customer with a car of another brand
+            dict(RECORD, brand_name='Volkswagen', model_name='Golf'),
+            # Another customer with the same name
+            dict(RECORD, phone='600100200'),
+        ])
+        self.assertEqual((stats['customers'], stats['cars'], stats['tickets']), (2, 3, 4))
+        self.assertEqual((self.count('customers'), self.count('cars'), self.count('tickets')), (2, 3, 4))
+        self.assertEqual(self.database.fetch_one("SELECT last_name FROM customers WHERE phone = '500100200'"),
+                         ('kowalski',))
+
+        # Identities already in the database are reused by the next import
+        stats = Importer(self.database).run([RECORD])
+        self.assertEqual((stats['customers'], stats['cars'], stats['tickets']), (0, 0, 1))
+
+    def test_customers_added_by_another_connection_during_the_import(self):
+        other = Database('database/zortech_database.db')
+        self.addCleanup(other.close)
+
+        def records():
+            yield RECORD
+            with other.transaction():
+                other.execute("INSERT INTO customers (last_name, phone) VALUES ('nowak', '700100200')")
+            yield dict(RECORD, last_name='nowak', phone='700100200')
+
+        stats = Importer(self.database, chunk_size=1).run(records())
+        self.assertEqual(stats['customers'], 1)
+        self.assertEqual(self.count('customers'), 2)
+
+    def test_invalid_records_are_skipped(self):
+        stats = Importer(self.database).run([
+            RECORD,
+            dict(RECORD, phone='600100200', status='open'),
+            dict(RECORD, last_name=''),
+            dict(RECORD, phone=None),
+        ])
+        self.assertEqual((stats['records'], stats['invalid'], stats['skipped'], stats['tickets']), (4, 1, 2, 1))
+        self.assertEqual(self.count('customers'), 1)
+
+    def test_validator_skips_invalid_records(self):
+        stats = Importer(self.database, validator=VALIDATOR).run([
+            RECORD,
+            dict(RECORD, phone='600100200', email='not an email'),
+            dict(RECORD, phone='12'),
+        ])
+        self.assertEqual((stats['invalid'], stats['customers']), (2, 1))
+
+    def test_unknown_names_are_added(self):
+        Importer(self.database).run([dict(RECORD, brand_name='Zzbrand', model_name='Zzmodel', color_name='Zzcolor')])
+        car = self.database.fetch_one(
+            "SELECT brands.name, models.name, models.brand_id = brands.id, colors.name FROM cars "
+            "JOIN brands ON cars.brand_id = brands.id JOIN models ON cars.model_id = models.id "
+            "JOIN colors ON cars.color_id = colors.id")
+        self.assertEqual(car, ('zzbrand', 'zzmodel', 1, 'zzcolor'))
+
+    def test_csv_file(self):
+        with open('records.csv', 'w', newline='', encoding='utf-8') as _file:
+            writer = csv.DictWriter(_file, IMPORT_COLUMNS)
+            writer.writeheader()
+            writer.writerows([RECORD, dict(RECORD, phone='600100200', status='')])
+        stats = Importer(self.database).import_file('records.csv')
+        self.assertEqual((stats['records'], stats['customers'], stats['tickets']), (2, 2, 2))
+        # A missing status is an open ticket
+        self.assertEqual(self.database.fetch_all("SELECT status FROM tickets ORDER BY id"), [(1,), (1,)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+"""
+Run from the repository root:
+    python -m pytest tests
+"""
+import os
+import sqlite3
+import unittest
+from benchmarks.synthetic import scratch_directory
+from database.database import Database
+
+PATH = 'database/zortech_database.db'
+
+
+class MigrationsTest(unittest.TestCase):
+    def setUp(self):
+        scratch = scratch_directory()
+        scratch.__enter__()
+        self.addCleanup(scratch.__exit__, None, None, None)
+        # Database as created before the migrations: schema only and user_version 0
+        connection = sqlite3.connect(PATH)
+        with open('database/database_schema.sql') as _schema:
+            connection.executescript(_schema.read())
+        connection.executescript("""
+            INSERT INTO customers (id, first_name, last_name, email, phone) VALUES
+                (1, 'jan', 'kowalski', 'jan@example.com', '500100200'),
+                (2, '', 'nowak', '', '600100200');
+            INSERT INTO cars (id, customer_id, brand_id, model_id, color_id, year, vin) VALUES
+                (1, 1, 3, 32, 1, 2010, ''),
+                -- Empty strings were saved instead of NULL for missing names
+                (2, 2, 3, '', '', '', '');
+            INSERT INTO tickets (id, date_creation, customer_id, car_id, notes, status) VALUES
+                (1, '2024-01-02 10:00:00', 1, 1, 'AC check', 1),
+                (2, '2024-01-03 10:00:00', 2, 2, NULL, 0),
+                (3, '2024-01-04 10:00:00', 2, '', '', 0);
+        """)
+        connection.commit()
+        connection.close()
+
+    def migrations(self):
+        return sorted(int(name.partition('_')[0]) for name in os.listdir('database/migrations'))
+
+    def test_baseline_database_is_migrated(self):
+        database = Database(PATH)
+        self.addCleanup(database.close)
+        self.assertEqual([version for version, _, _ in database.migration_report], self.migrations())
+        self.assertEqual(database.get_schema_version(), self.migrations()[-1])
+
+        self.assertEqual(database.fetch_all("PRAGMA foreign_key_check"), [])
+        self.assertEqual(database.fetch_one("SELECT car_id FROM tickets WHERE id = 3"), (None,))
+        self.assertEqual(database.fetch_one("SELECT model_id, color_id FROM cars WHERE id = 2"), (None, None))
+
+        # Listing tables are filled with the rows existing before the migration
+        for listing, source in (('ticket_listing', 'ticket_listing_source'), ('car_listing', 'car_listing_source')):
+            self.assertEqual(database.fetch_all(f"SELECT * FROM {listing} ORDER BY id"),
+                             database.fetch_all(f"SELECT * FROM {source} ORDER BY id"))
+        self.assertEqual(database.fetch_one("SELECT customer, car FROM ticket_listing WHERE id = 1"),
+                         ('jan - kowalski - 500100200', 'audi - s4'))
+        self.assertEqual(database.fetch_one("SELECT COUNT(*) FROM search_index")[0], 2 + 2 + 3)
+
+    def test_migrated_database_keeps_listings_up_to_date(self):
+        database = Database(PATH)
+        self.addCleanup(database.close)
+        with database.transaction():
+            database.execute("UPDATE customers SET last_name = 'kowalska' WHERE id = 1")
+            database.execute("UPDATE brands SET name = 'audi ag' WHERE id = 3")
+        self.assertEqual(database.fetch_one("SELECT customer, car FROM ticket_listing WHERE id = 1"),
+                         ('jan - kowalska - 500100200', 'audi ag - s4'))
+        self.assertEqual(database.fetch_one("SELECT brand, customer_last_name FROM car_listing WHERE id = 1"),
+                         ('audi ag', 'kowalska'))
+        self.assertEqual(database.fetch_one("SELECT version FROM reference_version")[0], 1)
+
+    def test_migrations_run_once(self):
+        Database(PATH).close()
+        database = Database(PATH)
+        self.addCleanup(database.close)
+        self.assertEqual(database.migration_report, [])
+        self.assertEqual(database.get_schema_version(), self.migrations()[-1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+"""
+Run from the repository root:
+    python -m pytest tests
+"""
+import unittest
+from benchmarks.synthetic import generate, scratch_directory
+from database.database_model import DBProcessor, LISTING_QUERIES, SORT_COLUMNS
+from database.query import Filter
+
+PAGE_SIZE = 37
+
+
+class KeysetPaginationTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # DBProcessor opens database/zortech_database.db, run it on a scratch database
+        scratch = scratch_directory()
+        scratch.__enter__()
+        cls.addClassCleanup(scratch.__exit__, None, None, None)
+        generate(600)
+        cls.database = DBProcessor(prune=False)
+        cls.addClassCleanup(cls.database.close)
+
+    def sort_values(self, table, order_by):
+        """
+        :return: Dictionary {id: value of the sort expression}
+        """
+        _, source = LISTING_QUERIES[table]
+        return dict(self.database.database.fetch_all(
+            f"SELECT {table}.id, {SORT_COLUMNS[table][order_by]} FROM {source}"))
+
+    def pages(self, table, order_by, direction, where=None):
+        ids = []
+        after_id = None
+        while True:
+            page = self.database.get_all_items(table, where=where, after_id=after_id, limit=PAGE_SIZE,
+                                               order_by=order_by, direction=direction)
+            self.assertLessEqual(len(page), PAGE_SIZE)
+            if not page:
+                return ids
+            ids.extend(row[0] for row in page)
+            after_id = page[-1][0]
+
+    def test_pages_follow_the_sort_order_of_every_column(self):
+        for table, columns in SORT_COLUMNS.items():
+            for order_by in columns:
+                values = self.sort_values(table, order_by)
+                for direction in ('ASC', 'DESC'):
+                    with self.subTest(table=table, order_by=order_by, direction=direction):
+                        ids = self.pages(table, order_by, direction)
+                        self.assertEqual(sorted(ids), sorted(values))
+                        keys = [(values[item_id], item_id) for item_id in ids]
+                        self.assertEqual(keys, sorted(keys, reverse=direction == 'DESC'))
+
+    def test_pages_before_an_item_are_the_rows_preceding_it(self):
+        for table, columns in SORT_COLUMNS.items():
+            for order_by in columns:
+                for direction in ('ASC', 'DESC'):
+                    with self.subTest(table=table, order_by=order_by, direction=direction):
+                        ids = [row[0] for row in self.database.get_all_items(table, order_by=order_by,
+                                                                             direction=direction)]
+                        middle = len(ids) // 2
+                        page = self.database.get_all_items(table, before_id=ids[middle], limit=PAGE_SIZE,
+                                                           order_by=order_by, direction=direction)
+                        self.assertEqual([row[0] for row in page], ids[middle - PAGE_SIZE:middle])
+
+    def test_filtered_pages(self):
+        where = Filter().equals('tickets.status', 1).starts_with(('tickets.customer_last_name',), 'kow')
+        expected = [row[0] for row in self.database.get_all_items('tickets', where=where, order_by='customer')]
+        self.assertTrue(expected)
+        self.assertEqual(self.pages('tickets', 'customer', 'ASC', where=where), expected)
+        for row in self.database.get_all_items('tickets', where=where):
+            self.assertEqual(row[-1], 1)
+
+    def test_pages_are_served_by_indexes(self):
+        fetch_all = self.database.database.fetch_all
+        queries = []
+
+        def _fetch_all(sql, params=(), **kwargs):
+            queries.append((sql, params))
+            return fetch_all(sql, params, **kwargs)
+
+        self.database.database.fetch_all = _fetch_all
+        self.addCleanup(delattr, self.database.database, 'fetch_all')
+        for table, columns in SORT_COLUMNS.items():
+            for order_by in columns:
+                with self.subTest(table=table, order_by=order_by):
+                    queries.clear()
+                    self.database.get_all_items(table, after_id=100, limit=PAGE_SIZE, order_by=order_by)
+                    sql, params = queries[-1]
+                    plan = [row[-1] for row in fetch_all(f"EXPLAIN QUERY PLAN {sql}", params)]
+                    self.assertFalse([step for step in plan if 'TEMP B-TREE' in step], plan)
+                    # The first page row is sought in the index, not found by walking it from the start
+                    self.assertTrue(plan[0].startswith('SEARCH'), plan)
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            self.database.get_all_items('brands')
+        with self.assertRaises(ValueError):
+            self.database.get_all_items('tickets', order_by='tickets.id; DROP TABLE tickets')
+        with self.assertRaises(ValueError):
+            self.database.get_all_items('tickets', direction='SIDEWAYS')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+"""
+Run from the repository root:
+    python -m pytest tests
+"""
+import sqlite3
+import unittest
+from database.query import Filter
+
+
+class FilterTest(unittest.TestCase):
+    def test_empty_filter(self):
+        self.assertFalse(Filter())
+        self.assertEqual(Filter().sql(), ('', []))
+        self.assertEqual(Filter().between('tickets.date_creation').sql(), ('', []))
+
+    def test_predicates_are_joined_with_and(self):
+        _filter = Filter().equals('tickets.status', 1).between('tickets.date_creation', '2024-01-01', '2024-01-08')
+        self.assertTrue(_filter)
+        self.assertEqual(_filter.sql(), (
+            "tickets.status = ? AND tickets.date_creation >= ? AND tickets.date_creation < ?",
+            [1, '2024-01-01', '2024-01-08']
+        ))
+
+    def test_sql_does_not_depend_on_values(self):
+        self.assertEqual(Filter().is_in('tickets.id', [1, 2]).sql(),
+                         ("tickets.id IN (SELECT value FROM json_each(?))", ['[1, 2]']))
+        self.assertEqual(Filter().is_in('tickets.id', range(100)).sql()[0],
+                         Filter().is_in('tickets.id', [1]).sql()[0])
+        self.assertEqual(Filter().starts_with('customers.last_name', 'kow').sql()[0],
+                         Filter().starts_with('customers.last_name', 'nowak').sql()[0])
+
+    def test_filters_are_immutable(self):
+        base = Filter().equals('tickets.status', 1)
+        base.equals('tickets.id', 5)
+        self.assertEqual(base.sql(), ("tickets.status = ?", [1]))
+
+    def test_starts_with_matches_any_column(self):
+        self.assertEqual(Filter().starts_with(('customers.last_name', 'customers.phone'), '50').sql(), (
+            "(customers.last_name LIKE ? ESCAPE '\\' OR customers.phone LIKE ? ESCAPE '\\')", ['50%', '50%']
+        ))
+
+    def test_starts_with_takes_wildcards_literally(self):
+        connection = sqlite3.connect(':memory:')
+        self.addCleanup(connection.close)
+        connection.executescript("""
+            CREATE TABLE customers (id INTEGER PRIMARY KEY, last_name TEXT);
+            INSERT INTO customers (last_name) VALUES ('50%_off'), ('50 off'), ('5_x'), ('Kowalski'), ('a\\b');
+        """)
+
+        def matches(prefix):
+            sql, params = Filter().starts_with('customers.last_name', prefix).sql()
+            return [row[0] for row in connection.execute(f"SELECT last_name FROM customers WHERE {sql}", params)]
+
+        self.assertEqual(matches('50%'), ['50%_off'])
+        self.assertEqual(matches('5_'), ['5_x'])
+        self.assertEqual(matches('a\\'), ['a\\b'])
+        # LIKE is case-insensitive for ASCII
+        self.assertEqual(matches('kow'), ['Kowalski'])
+
+    def test_invalid_columns_and_operators(self):
+        for column in ('tickets.status; DROP TABLE tickets', 'status = 1 OR 1', 'a.b.c', ''):
+            with self.assertRaises(ValueError):
+                Filter().equals(column, 1)
+        with self.assertRaises(ValueError):
+            Filter().starts_with(('customers.last_name', '1=1 OR customers.phone'), 'x')
+        with self.assertRaises(ValueError):
+            Filter().compare('tickets.status', 'LIKE', 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+"""
+Run from the repository root:
+    python -m pytest tests
+"""
+import unittest
+from benchmarks.synthetic import scratch_directory
+from database.database import Database
+from database.database_model import DBProcessor
+from database.importer import Importer
+from services import TicketService
+
+TICKET = {'first_name': 'jan', 'last_name': 'kowalski', 'phone': '500100200', 'email': '',
+          'brand_name': 'zzbrand', 'model_name': 'zzmodel', 'color_name': 'zzcolor', 'notes': 'AC check'}
+
+
+class WorkerReferenceCacheTest(unittest.TestCase):
+    def setUp(self):
+        # DBProcessor opens database/zortech_database.db, run it on a scratch database
+        scratch = scratch_directory()
+        scratch.__enter__()
+        self.addCleanup(scratch.__exit__, None, None, None)
+        self.database = DBProcessor(background=True)
+        self.addCleanup(self.database.close)
+
+    def test_names_added_by_another_connection_are_resolved_on_the_worker(self):
+        # The worker loads its reference cache before the brand, model and color exist
+        self.assertIsNone(self.database.submit('get_item_from_name', 'brands', 'zzbrand').result(timeout=10))
+
+        other = Database('database/zortech_database.db')
+        Importer(other).run([{'last_name': 'nowak', 'phone': '600100200', 'brand_name': 'zzbrand',
+                              'model_name': 'zzmodel', 'color_name': 'zzcolor'}])
+        other.close()
+
+        ticket_id = self.database.submit(lambda worker: TicketService(worker).create(TICKET)).result(timeout=10)
+        car = self.database.get_item_from_id(
+            'cars', self.database.get_item_from_id('tickets', ticket_id)['car_id'])
+        self.assertEqual(car['brand_id'], self.database.get_item_from_name('brands', 'zzbrand'))
+        self.assertEqual(car['model_id'], self.database.get_item_from_name('models', 'zzmodel'))
+        self.assertEqual(car['color_id'], self.database.get_item_from_name('colors', 'zzcolor'))
+        self.assertIsNotNone(car['brand_id'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+"""
+Run from the repository root:
+    python -m pytest tests
+"""
+import datetime
+import unittest
+from benchmarks.synthetic import scratch_directory
+from database.database_model import DBProcessor
+from services import TicketService, CustomerService, ticket_filter
+
+TICKET = {'first_name': 'jan', 'last_name': 'kowalski', 'phone': '500100200', 'email': '',
+          'brand_name': 'audi', 'model_name': 'a4', 'color_name': 'black', 'notes': 'AC check'}
+
+
+class TicketServiceTest(unittest.TestCase):
+    def setUp(self):
+        # DBProcessor opens database/zortech_database.db, run it on a scratch database
+        scratch = scratch_directory()
+        scratch.__enter__()
+        self.addCleanup(scratch.__exit__, None, None, None)
+        self.database = DBProcessor()
+        self.addCleanup(self.database.close)
+        self.service = TicketService(self.database)
+
+    def test_unknown_names_are_not_saved(self):
+        for field in ('brand_name', 'model_name', 'color_name'):
+            with self.assertRaises(ValueError):
+                self.service.create(dict(TICKET, **{field: 'zzunknown'}))
+        with self.assertRaises(ValueError):
+            self.service.create(dict(TICKET, brand_name=''))
+        self.assertEqual(self.database.get_all_items('tickets'), [])
+        self.assertEqual(self.database.get_all_items('customers'), [])
+
+    def test_model_of_another_brand_is_not_saved(self):
+        with self.assertRaises(ValueError):
+            self.service.create(dict(TICKET, brand_name='audi', model_name='golf'))
+        self.assertEqual(self.database.get_all_items('tickets'), [])
+
+        ticket_id = self.service.create(dict(TICKET, brand_name='volkswagen', model_name='golf'))
+        car_id = self.database.get_item_from_id('tickets', ticket_id)['car_id']
+        with self.assertRaises(ValueError):
+            CustomerService(self.database).update_car(car_id, dict(TICKET, brand_name='audi', model_name='golf'))
+        car = self.database.get_item_from_id('cars', car_id)
+        self.assertEqual(car['brand_id'], self.database.get_item_from_name('brands', 'volkswagen'))
+        self.assertEqual(self.database.get_item_from_id('models', car['model_id'])['name'], 'golf')
+
+    def test_invalid_fields_are_reported(self):
+        TicketService.validate(TICKET)
+        with self.assertRaisesRegex(ValueError, 'phone'):
+            TicketService.validate(dict(TICKET, phone='12'))
+        with self.assertRaisesRegex(ValueError, 'last_name'):
+            TicketService.validate(dict(TICKET, last_name=''))
+
+    def test_create_many_saves_all_or_nothing(self):
+        with self.assertRaisesRegex(ValueError, 'record 2: invalid phone'):
+            self.service.create_many([TICKET, dict(TICKET, phone='12')])
+        # Valid records with an unknown brand are rolled back together
+        with self.assertRaises(ValueError):
+            self.service.create_many([TICKET, dict(TICKET, last_name='nowak', brand_name='zzunknown')])
+        self.assertEqual(self.database.get_all_items('tickets'), [])
+
+        ticket_ids = self.service.create_many([TICKET, dict(TICKET, last_name='nowak')])
+        self.assertEqual(len(ticket_ids), 2)
+        self.assertEqual(len(self.database.get_all_items('customers')), 2)
+
+    def test_missing_ticket_is_not_updated(self):
+        with self.assertRaisesRegex(ValueError, 'does not exist'):
+            self.service.update(12345, TICKET)
+
+    def test_list_filters(self):
+        open_id = self.service.create(TICKET)
+        closed_id = self.service.create(dict(TICKET, last_name='nowak', phone='600100200', status=0))
+        self.assertEqual([row[0] for row in self.service.list(status='open')], [open_id])
+        self.assertEqual([row[0] for row in self.service.list(status='closed')], [closed_id])
+        self.assertEqual([row[0] for row in self.service.list(customer='NOW')], [closed_id])
+        self.assertEqual(self.service.list(end=datetime.date(2000, 1, 1)), [])
+
+    def test_ticket_filter(self):
+        self.assertIsNone(ticket_filter())
+        sql, params = ticket_filter(1, datetime.date(2024, 1, 1), datetime.date(2024, 1, 7), ' Kow ').sql()
+        self.assertEqual(params[:4], [1, '2024-01-01', '2024-01-08', 'kow%'])
+        self.assertIn('tickets.date_creation < ?', sql)
+
+    def test_unknown_names_are_not_updated(self):
+        ticket_id = self.service.create(TICKET)
+        car_id = self.database.get_item_from_id('tickets', ticket_id)['car_id']
+        with self.assertRaises(ValueError):
+            self.service.update(ticket_id, dict(TICKET, brand_name='zzunknown'))
+        with self.assertRaises(ValueError):
+            CustomerService(self.database).update_car(car_id, dict(TICKET, color_name='zzunknown'))
+        car = self.database.get_item_from_id('cars', car_id)
+        self.assertEqual(car['brand_id'], self.database.get_item_from_name('brands', 'audi'))
+        self.assertEqual(car['color_id'], self.database.get_item_from_name('colors', 'black'))
+
+
+if __name__ == '__main__':
+    unittest.main()
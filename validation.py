@@ -0,0 +1,80 @@
+import re
+from misc import APP_CONFIG, Entity
+
+
+class Validator(Entity):
+    def __init__(self, rules=None):
+        """
+        Field validator with the patterns compiled once.
+        A required field is invalid when empty, an optional one is checked only when filled in,
+        fields without a rule are always valid.
+        E.g. Validator().invalid_fields({'last_name': 'Kowalski', 'phone': '12345'}) -> ['phone', 'brand_name']
+        :param rules: Dictionary with required, optional and patterns, default APP_CONFIG['validation'].
+        """
+        super().__init__()
+        rules = self.app_config.get('validation', {}) if rules is None else rules
+        self.required = tuple(rules.get('required', ()))
+        self.optional = tuple(rules.get('optional', ()))
+        self.patterns = {field: re.compile(pattern) for field, pattern in rules.get('patterns', {}).items()}
+        for field in self.required + self.optional:
+            if field not in self.patterns:
+                raise ValueError(f"No pattern for validated field '{field}'")
+        self.fields = frozenset(self.required + self.optional)
+
+    def validate(self, field, value):
+        """
+        :param field: Field name, e.g. 'phone'.
+        :param value: Field value, converted to a string.
+        :return: bool
+        """
+        if field not in self.fields:
+            return True
+        value = '' if value is None else str(value)
+        if not value:
+            return field not in self.required
+        return self.patterns[field].match(value) is not None
+
+    def invalid_fields(self, record, required=None):
+        """
+        :param record: Dictionary of field names and values, missing fields are treated as empty.
+        :param required: Fields which have to be filled in, default the configured ones.
+        :return: List of invalid field names, empty if the record is valid.
+        """
+        required = self.required if required is None else required
+        invalid = []
+        for field, pattern in self.patterns.items():
+            value = record.get(field)
+            value = '' if value is None else str(value)
+            if not value:
+                if field in required:
+                    invalid.append(field)
+            elif field in self.fields or field in required:
+                if pattern.match(value) is None:
+                    invalid.append(field)
+        return invalid
+
+    def validate_many(self, records, required=None):
+        """
+        Validate records in bulk, e.g. rows of an imported file.
+        :param records: Iterable of dictionaries.
+        :param required: Fields which have to be filled in, default the configured ones.
+        :return: List of tuples (index, invalid field names) of the invalid records.
+        """
+        invalid_fields = self.invalid_fields
+        errors = []
+        for index, record in enumerate(records):
+            invalid = invalid_fields(record, required)
+            if invalid:
+                errors.append((index, invalid))
+        return errors
+
+
+# Compiled at import time with the application rules
+VALIDATOR = Validator(APP_CONFIG.get('validation', {}))
+
+
+def validate_many(records, required=None):
+    """
+    Validate records with the application rules, see Validator.validate_many.
+    """
+    return VALIDATOR.validate_many(records, required)
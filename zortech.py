@@ -0,0 +1,191 @@
+"""
+Command line interface to the tickets database, runs without a display and does not import Tk.
+
+Run from the application directory, e.g.:
+    python -m zortech tickets list --status open --from 2024-01-01
+    python -m zortech tickets create --last-name kowalski --phone 500100200 --brand audi --notes "AC check"
+    python -m zortech tickets create --file tickets.csv
+    python -m zortech tickets status closed 12 13 14
+    python -m zortech customers find kowal
+    python -m zortech --stats tickets list --status open > /dev/null
+"""
+import argparse
+import csv
+import datetime
+import json
+import logging
+import os
+import sys
+from database.database_model import DBProcessor
+from database.instrumentation import STATS
+from services import TicketService, CustomerService, TICKET_STATUSES
+
+TICKET_FIELDS = ('first_name', 'last_name', 'phone', 'email', 'brand_name', 'model_name', 'color_name',
+                 'year', 'vin', 'notes')
+TICKET_COLUMNS = ('id', 'date_creation', 'customer', 'car', 'notes', 'status')
+
+
+def _date(value):
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid date '{value}', expected YYYY-MM-DD") from None
+
+
+def _print_rows(rows, columns, as_json):
+    for row in rows:
+        if as_json:
+            print(json.dumps(dict(zip(columns, row)), ensure_ascii=False))
+        else:
+            print('\t'.join('' if value is None else str(value) for value in row))
+
+
+def read_records(path):
+    """
+    Read ticket records from a CSV file with a header row of TICKET_FIELDS or from a JSON Lines file.
+    :param path: Path to the file.
+    :return: List of dictionaries.
+    """
+    with open(path, newline='', encoding='utf-8-sig') as _file:
+        if os.path.splitext(path)[1].lower() in ('.jsonl', '.json'):
+            records = [json.loads(line) for line in _file if line.strip()]
+        else:
+            records = list(csv.DictReader(_file))
+    for record in records:
+        if record.get('status') not in (None, ''):
+            record['status'] = int(record['status'])
+        else:
+            record.pop('status', None)
+    return records
+
+
+def tickets_list(database, args):
+    rows = TicketService(database).list(status=args.status, start=args.date_from, end=args.date_to,
+                                        customer=args.customer, limit=args.limit)
+    _print_rows(rows, TICKET_COLUMNS, args.json)
+
+
+def tickets_show(database, args):
+    ticket = TicketService(database).get(args.id)
+    if not ticket:
+        raise ValueError(f"Ticket {args.id} does not exist")
+    data = {
+        'ticket': {key: getattr(ticket, key) for key in
+                   ('id', 'date_creation', 'date_modification', 'notes', 'status')},
+        'customer': ticket.customer.collected_data,
+        'car': ticket.car.collected_data,
+    }
+    print(json.dumps(data, ensure_ascii=False, indent=None if args.json else 2))
+
+
+def tickets_create(database, args):
+    service = TicketService(database)
+    if args.file:
+        ticket_ids = service.create_many(read_records(args.file))
+    else:
+        record = {field: getattr(args, field) for field in TICKET_FIELDS if getattr(args, field) is not None}
+        service.validate(record)
+        ticket_ids = [service.create(record)]
+    for ticket_id in ticket_ids:
+        print(ticket_id)
+
+
+def tickets_status(database, args):
+    count = TicketService(database).set_status(args.ids, args.status)
+    print(count)
+
+
+def customers_show(database, args):
+    customer = CustomerService(database).get(args.id)
+    if not customer:
+        raise ValueError(f"Customer {args.id} does not exist")
+    data = {'customer': customer.collected_data, 'cars': [car.collected_data for car in customer.cars]}
+    print(json.dumps(data, ensure_ascii=False, indent=None if args.json else 2))
+
+
+def customers_find(database, args):
+    _print_rows(CustomerService(database).find(args.text, limit=args.limit), ('id', 'customer', 'phone'), args.json)
+
+
+def search(database, args):
+    _print_rows(database.search(args.text, limit=args.limit),
+                ('type', 'id', 'customer', 'phone', 'car', 'vin', 'notes'), args.json)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='zortech', description='ZORTECH tickets database without the GUI.')
+    parser.add_argument('-v', '--verbose', action='store_true', help='log database operations')
+    parser.add_argument('--stats', action='store_true',
+                        help='print query and database method statistics as JSON to stderr after the command')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    tickets = commands.add_parser('tickets').add_subparsers(dest='action', required=True)
+
+    listing = tickets.add_parser('list', help='list tickets as the tickets tab does')
+    listing.add_argument('--status', choices=TICKET_STATUSES)
+    listing.add_argument('--from', dest='date_from', type=_date, help='first creation day, YYYY-MM-DD')
+    listing.add_argument('--to', dest='date_to', type=_date, help='last creation day, YYYY-MM-DD')
+    listing.add_argument('--customer', default='', help='prefix of the customer last name, first name or phone')
+    listing.add_argument('--limit', type=int)
+    listing.add_argument('--json', action='store_true', help='print JSON Lines')
+    listing.set_defaults(handler=tickets_list)
+
+    show = tickets.add_parser('show', help='show ticket with its customer and car')
+    show.add_argument('id', type=int)
+    show.add_argument('--json', action='store_true', help='print compact JSON')
+    show.set_defaults(handler=tickets_show)
+
+    create = tickets.add_parser('create', help='create a ticket, or many of them from a file in one transaction')
+    create.add_argument('--file', help=f"CSV file with a header row of {', '.join(TICKET_FIELDS)} "
+                                       f"(and optionally date_creation, status) or a JSON Lines file")
+    for field in TICKET_FIELDS:
+        flag = field.replace('_name', '') if field in ('brand_name', 'model_name', 'color_name') else field
+        create.add_argument(f"--{flag.replace('_', '-')}", dest=field)
+    create.set_defaults(handler=tickets_create)
+
+    status = tickets.add_parser('status', help='set status of tickets')
+    status.add_argument('status', choices=TICKET_STATUSES)
+    status.add_argument('ids', type=int, nargs='+', metavar='id')
+    status.set_defaults(handler=tickets_status)
+
+    customers = commands.add_parser('customers').add_subparsers(dest='action', required=True)
+
+    show = customers.add_parser('show', help='show customer with their cars')
+    show.add_argument('id', type=int)
+    show.add_argument('--json', action='store_true', help='print compact JSON')
+    show.set_defaults(handler=customers_show)
+
+    find = customers.add_parser('find', help='full-text search of customers')
+    find.add_argument('text')
+    find.add_argument('--limit', type=int, default=50)
+    find.add_argument('--json', action='store_true', help='print JSON Lines')
+    find.set_defaults(handler=customers_find)
+
+    text_search = commands.add_parser('search', help='full-text search of customers, cars and tickets')
+    text_search.add_argument('text')
+    text_search.add_argument('--limit', type=int, default=50)
+    text_search.add_argument('--json', action='store_true', help='print JSON Lines')
+    text_search.set_defaults(handler=search)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING,
+                        format='%(asctime)s - %(levelname)s - %(name)s - %(message)s')
+    # The change log is kept, a running GUI synchronizes its treeviews with it
+    database = DBProcessor(prune=False)
+    try:
+        args.handler(database, args)
+    except ValueError as e:
+        print(f"zortech: error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        database.close()
+        if args.stats:
+            print(json.dumps(STATS.snapshot(), indent=2), file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,7 +3,8 @@ block_cipher = None
 a = Analysis(['main.py'],
              pathex=['.'],
              binaries=[],
-             datas=[('database/*.sql', 'database')],
+             datas=[('database/*.sql', 'database'),
+                    ('database/migrations/*.sql', 'database/migrations')],
              hiddenimports=[],
              hookspath=[],
              runtime_hooks=[],
@@ -14,8 +15,11 @@ a = Analysis(['main.py'],
              noarchive=False)
 
 pyz = PYZ(a.pure, a.zipped_data, cipher=block_cipher)
-exe = EXE(pyz, a.scripts, a.binaries, a.zipfiles, a.datas,
+# One-folder build: binaries and data files are collected next to the executable
+# instead of being unpacked into a temporary directory on every start
+exe = EXE(pyz, a.scripts, [],
+          exclude_binaries=True,
           name='zortech', debug=False, bootloader_ignore_signals=False,
-          strip=False, upx=True, console=True, one_dir=True)
+          strip=False, upx=True, console=True)
 coll = COLLECT(exe, a.binaries, a.zipfiles, a.datas,
                strip=False, upx=True, name='zortech')